@@ -0,0 +1,88 @@
+import sys
+from news_processor import article_key
+from state_manager import parse_created_ms
+
+
+# Marks a field the feed did not send, as opposed to one it sent as null
+MISSING = object()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Article:
+    """Compact record of the article fields the pipeline uses.
+
+    Built while the feed is decoded, so the full JSON objects are not kept
+    around. ``created`` is in epoch milliseconds, and category, symbol and
+    trading pair strings are interned so all records share them. Supports the
+    read-only dict access (``article['title']``, ``article.get(...)``, ``in``)
+    the pipeline also uses on plain dict articles; a field the feed did not
+    send is missing and one it sent as null is None, as they would be in the dict.
+    """
+
+    __slots__ = ('key', 'id', 'created', 'category', 'symbols', 'trading_pairs', 'title', 'link')
+    FIELDS = __slots__[1:]
+
+    def __init__(self, key, id, created, category, symbols, trading_pairs, title, link):
+        self.key = key
+        self.id = id
+        self.created = created
+        self.category = category
+        self.symbols = symbols
+        self.trading_pairs = trading_pairs
+        self.title = title
+        self.link = link
+
+    @classmethod
+    def from_dict(cls, article):
+        symbols = article.get('symbols', MISSING)
+        if isinstance(symbols, str):
+            symbols = tuple(sys.intern(symbol) for symbol in symbols.replace(' ', '').split(','))
+        elif isinstance(symbols, list):
+            symbols = tuple(_intern(symbol) for symbol in symbols)
+        trading_pairs = article.get('trading_pairs', MISSING)
+        if isinstance(trading_pairs, list):
+            trading_pairs = tuple(_intern(pair) for pair in trading_pairs)
+        return cls(
+            # Computed from the original fields, so it matches the key of the same article as a dict
+            article_key(article),
+            article.get('id', MISSING),
+            parse_created_ms(article['created']),
+            _intern(article.get('category', MISSING)),
+            symbols,
+            trading_pairs,
+            article.get('title', MISSING),
+            article.get('link', MISSING),
+        )
+
+    def __getitem__(self, name):
+        value = getattr(self, name) if name in self.FIELDS else MISSING
+        if value is MISSING:
+            raise KeyError(name)
+        return value
+
+    def get(self, name, default=None):
+        value = getattr(self, name) if name in self.FIELDS else MISSING
+        return default if value is MISSING else value
+
+    def __contains__(self, name):
+        return name in self.FIELDS and getattr(self, name) is not MISSING
+
+    def __eq__(self, other):
+        if not isinstance(other, Article):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Article(id={self.get('id')!r}, created={self.created!r}, title={self.get('title')!r})"
+
+
+def decode_article(obj):
+    """``object_hook`` for feed JSON: articles become Article records, other objects stay dicts."""
+    if 'created' in obj and 'title' in obj:
+        return Article.from_dict(obj)
+    return obj
@@ -0,0 +1,318 @@
+"""Synthetic-load benchmark of the news-to-exclusion pipeline.
+
+Generates synthetic feeds and fleets of PassivBot configs, then times every
+stage (filter_news, extract_symbols, get_new_articles, update_single_config)
+and a full process_news cycle against a local stand-in feed server. Restarts
+are stubbed out. Reports p50/p99 latency, throughput and peak traced memory,
+and writes the results as JSON so runs can be compared across commits.
+
+    python benchmarks/bench_pipeline.py --articles 1000,10000,100000 --configs 1,50 \\
+        --output results.json --compare previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main  # noqa: E402
+from news_processor import extract_symbols, filter_news  # noqa: E402
+from passivbot_config_updater import update_single_config  # noqa: E402
+from state_manager import ProcessedArticleStore  # noqa: E402
+
+CATEGORIES = ["DELISTING", "TOKEN_SWAP", "LISTING", "MAINTENANCE", "OTHER"]
+QUOTES = ["USDT", "USDC", "BTC"]
+EXCLUSION_STRATEGY = {"remove_from_approved_coins": True, "add_to_ignored_coins": True}
+
+
+def coin_universe(size):
+    return [f"C{i:05d}" for i in range(size)]
+
+
+def synthetic_feed(count, coins, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    articles = []
+    for i in range(count):
+        created = start + timedelta(seconds=i * 30 + rng.randrange(30), milliseconds=rng.randrange(1000))
+        symbols = rng.sample(coins, rng.randint(1, 3))
+        articles.append({
+            "id": i,
+            "title": f"Exchange will delist {', '.join(symbols)}",
+            "category": rng.choice(CATEGORIES),
+            "symbols": ",".join(symbols),
+            "trading_pairs": [f"{symbol}/{rng.choice(QUOTES)}" for symbol in symbols],
+            "created": created.strftime("%Y-%m-%d %H:%M:%S.") + f"{created.microsecond // 1000:03d}Z",
+            "link": f"https://example.com/news/{i}",
+        })
+    return articles
+
+
+def synthetic_fleet(directory, count, coins, seed=7):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"bot_{i:03d}.json")
+        approved = [f"{coin}USDT" for coin in rng.sample(coins, len(coins) * 3 // 4)]
+        with open(path, "w") as f:
+            json.dump({"live": {"approved_coins": approved, "ignored_coins": []}}, f)
+        paths.append(path)
+    return paths
+
+
+def sentinel_config(endpoint, config_paths):
+    return {
+        "symbolscout_endpoint": endpoint,
+        "check_interval": 600,
+        "news_monitoring": {"categories": ["DELISTING", "TOKEN_SWAP"], "quote_currencies": ["USDT"]},
+        "passivbot": {
+            "passivbot_folder": os.path.dirname(config_paths[0]),
+            "trading_quote_currency": "USDT",
+            "symbol_exclusion_strategy": EXCLUSION_STRATEGY,
+            "mode": "tmuxp",
+            "tmuxp": {
+                "tmux_config_file": "unused.yml",
+                "tmux_session_name": "bench",
+                "stop_command": "true",
+                "start_command": "true",
+            },
+            "passivbot_config_files": [{"config_file": path} for path in config_paths],
+        },
+    }
+
+
+class FeedServer:
+    """Local stand-in for a SymbolScout endpoint serving a fixed feed."""
+
+    def __init__(self):
+        server = self
+        self.body = b'{"news": []}'
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/api/news/breaking"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class NoRestart:
+    """Restart scheduler stand-in: changed configs are never restarted."""
+
+    def request(self, changed_files):
+        pass
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def measure(name, run, setup=None, items=1, repeat=5, **params):
+    """Time ``run(state)`` ``repeat`` times, then once more under tracemalloc.
+
+    ``setup()`` builds a fresh state for each run outside the timing. ``run``
+    may return a list of per-item latencies to use instead of the run time.
+    """
+    latencies = []
+    durations = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        per_item = run(state)
+        durations.append(time.perf_counter() - started)
+        latencies.extend(per_item if per_item else [durations[-1]])
+
+    state = setup() if setup else None
+    tracemalloc.start()
+    try:
+        run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    median = percentile(durations, 0.5)
+    result = {
+        "stage": name,
+        **params,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "throughput_per_s": round(items / median, 1) if median else None,
+        "peak_memory_mb": round(peak / 2**20, 2),
+    }
+    print(
+        f"{name:<20} {json.dumps(params):<48} p50 {result['p50_ms']:>10.2f} ms  p99 {result['p99_ms']:>10.2f} ms  "
+        f"{result['throughput_per_s'] or 0:>12.0f}/s  peak {result['peak_memory_mb']:>8.2f} MB"
+    )
+    return result
+
+
+def bench_articles(count, coins, config, scratch, repeat):
+    feed = {"news": synthetic_feed(count, coins)}
+    results = []
+
+    results.append(measure(
+        "filter_news", lambda _: filter_news(feed, config) and None, items=count, repeat=repeat, articles=count,
+    ))
+
+    filtered = filter_news(feed, config)
+    quotes = config["news_monitoring"]["quote_currencies"]
+    results.append(measure(
+        "extract_symbols",
+        lambda _: [extract_symbols(article, quotes) for article in filtered] and None,
+        items=len(filtered), repeat=repeat, articles=count,
+    ))
+
+    def fresh_store():
+        path = os.path.join(tempfile.mkdtemp(dir=scratch), "processed.db")
+        return ProcessedArticleStore(path, legacy_state_file=None)
+
+    results.append(measure(
+        "get_new_articles", lambda store: store.get_new_articles(feed) and None, setup=fresh_store,
+        items=count, repeat=repeat, articles=count,
+    ))
+    return results
+
+
+def bench_fleet(count, coins, scratch, repeat, symbols_per_update=50):
+    symbols = set(random.Random(3).sample(coins, symbols_per_update))
+
+    def fresh_fleet():
+        directory = tempfile.mkdtemp(dir=scratch)
+        return synthetic_fleet(directory, count, coins)
+
+    def run(paths):
+        latencies = []
+        for path in paths:
+            started = time.perf_counter()
+            update_single_config(path, symbols, EXCLUSION_STRATEGY, "USDT")
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    return [measure(
+        "update_single_config", run, setup=fresh_fleet, items=count, repeat=repeat,
+        configs=count, coins=len(coins),
+    )]
+
+
+def bench_process_news(articles, configs, coins, server, scratch, repeat):
+    server.body = json.dumps({"news": synthetic_feed(articles, coins)}).encode()
+
+    def setup():
+        directory = tempfile.mkdtemp(dir=scratch)
+        paths = synthetic_fleet(directory, configs, coins)
+        store = ProcessedArticleStore(os.path.join(directory, "processed.db"), legacy_state_file=None)
+        return sentinel_config(server.url, paths), store
+
+    def run(state):
+        config, store = state
+        with patch("main.get_article_store", return_value=store):
+            if not main.process_news(config, NoRestart()):
+                raise RuntimeError("process_news failed")
+        store.close()
+
+    return [measure(
+        "process_news", run, setup=setup, items=articles, repeat=repeat,
+        articles=articles, configs=configs, coins=len(coins),
+    )]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_file):
+    with open(previous_file) as f:
+        previous = json.load(f)
+
+    def key(result):
+        return tuple(sorted((k, v) for k, v in result.items() if not k.endswith(("_ms", "_s", "_mb"))))
+
+    before = {key(result): result for result in previous["results"]}
+    print(f"\ncompared with {previous.get('commit')} (p50 ratio, <1 is faster):")
+    for result in results:
+        old = before.get(key(result))
+        if old and old["p50_ms"]:
+            params = {k: v for k, v in result.items() if k not in ("stage",) and not k.endswith(("_ms", "_s", "_mb"))}
+            print(f"  {result['stage']:<20} {json.dumps(params):<48} {result['p50_ms'] / old['p50_ms']:6.2f}x")
+
+
+def sizes(value):
+    return [int(size) for size in value.split(",")]
+
+
+def run_benchmarks():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=sizes, default=[1000, 10000, 100000], help="feed sizes, e.g. 1000,1000000")
+    parser.add_argument("--configs", type=sizes, default=[1, 50], help="fleet sizes, e.g. 1,500")
+    parser.add_argument("--coins", type=int, default=2000, help="coin universe; configs approve 3/4 of it")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    coins = coin_universe(args.coins)
+    scratch = tempfile.mkdtemp(prefix="symbolscout-bench-")
+    server = FeedServer()
+    results = []
+    try:
+        config = sentinel_config(server.url, ["unused.json"])
+        for count in args.articles:
+            results.extend(bench_articles(count, coins, config, scratch, args.repeat))
+        for count in args.configs:
+            results.extend(bench_fleet(count, coins, scratch, args.repeat))
+        for articles in args.articles:
+            for configs in args.configs:
+                results.extend(bench_process_news(articles, configs, coins, server, scratch, args.repeat))
+    finally:
+        server.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"coins": args.coins, "repeat": args.repeat},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    run_benchmarks()
@@ -0,0 +1,119 @@
+"""Startup benchmark: import time and time to the first fetch of a --once run.
+
+Runs ``main.py --once`` in a scratch directory against a local stand-in feed
+server and measures, from process launch, when the server sees the first
+request and when the process exits. Exits non-zero if the median time to the
+first fetch is over the budget.
+
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 150
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG = """\
+symbolscout_endpoint: "{endpoint}"
+check_interval: 600
+news_monitoring:
+  categories: ["DELISTING"]
+  quote_currencies: ["USDT"]
+passivbot:
+  passivbot_folder: "{folder}"
+  symbol_exclusion_strategy:
+    remove_from_approved_coins: true
+    add_to_ignored_coins: false
+  mode: "tmuxp"
+  tmuxp:
+    tmux_config_file: "{folder}/tmux.yml"
+    tmux_session_name: "passivbot_instances"
+    stop_command: "true"
+    start_command: "true"
+  passivbot_config_files:
+    - config_file: "{folder}/bybit_01.json"
+"""
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(time.monotonic())
+        body = b'{"news": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def timed_run(command, cwd, env, server=None):
+    """Returns (seconds to first request or None, seconds to exit)."""
+    if server is not None:
+        server.requests.clear()
+    started = time.monotonic()
+    result = subprocess.run(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    finished = time.monotonic()
+    if result.returncode != 0:
+        sys.exit(f"{' '.join(command)} exited with {result.returncode}:\n{result.stderr.decode()}")
+    first_fetch = server.requests[0] - started if server is not None and server.requests else None
+    return first_fetch, finished - started
+
+
+def summary(samples):
+    ordered = sorted(samples)
+    p90 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+    return f"median {statistics.median(samples) * 1000:7.1f} ms   p90 {p90 * 1000:7.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        with open(os.path.join(scratch, "config.yml"), "w") as f:
+            f.write(CONFIG.format(endpoint=f"http://127.0.0.1:{server.server_port}/news", folder=scratch))
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        python = [sys.executable]
+
+        interpreter, imports, first_fetch, once = [], [], [], []
+        for _ in range(args.runs):
+            interpreter.append(timed_run(python + ["-c", "pass"], scratch, env)[1])
+            imports.append(timed_run(python + ["-c", "import main"], scratch, env)[1])
+            fetch, total = timed_run(python + [os.path.join(ROOT, "main.py"), "--once"], scratch, env, server)
+            if fetch is None:
+                sys.exit("main.py --once exited without fetching the feed")
+            first_fetch.append(fetch)
+            once.append(total)
+
+    server.shutdown()
+
+    print(f"runs:                    {args.runs}")
+    print(f"interpreter startup:     {summary(interpreter)}")
+    print(f"import main:             {summary(imports)}")
+    print(f"--once, first fetch:     {summary(first_fetch)}")
+    print(f"--once, exit:            {summary(once)}")
+
+    median_ms = statistics.median(first_fetch) * 1000
+    if median_ms > args.budget_ms:
+        print(f"over budget: first fetch after {median_ms:.1f} ms, budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"within budget of {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
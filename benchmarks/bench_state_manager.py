@@ -0,0 +1,83 @@
+"""Micro-benchmark: selecting new articles and the next watermark.
+
+Compares the original two-pass strptime approach (get_new_articles followed by
+update_last_processed_timestamp's max()) with the single cached pass used by
+ProcessedArticleStore.
+
+    python benchmarks/bench_state_manager.py --articles 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state_manager import (  # noqa: E402
+    clear_created_cache,
+    get_new_articles,
+    parse_datetime,
+    scan_new_articles,
+    to_epoch_ms,
+)
+
+
+def synthetic_articles(count, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    articles = []
+    for i in range(count):
+        created = start + timedelta(seconds=rng.randrange(365 * 86400), milliseconds=rng.randrange(1000))
+        articles.append({
+            "id": i,
+            "created": created.strftime("%Y-%m-%d %H:%M:%S.") + f"{created.microsecond // 1000:03d}Z",
+        })
+    return articles
+
+
+def two_pass(news, last_processed_timestamp):
+    new_articles = get_new_articles(news, last_processed_timestamp)
+    latest = max(parse_datetime(article["created"]) for article in news["news"])
+    return new_articles, latest
+
+
+def single_pass(news, floor_ms):
+    return scan_new_articles(news["news"], floor_ms)
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    news = {"news": synthetic_articles(args.articles)}
+    watermark = datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+    baseline = best_of(args.repeat, two_pass, news, watermark)
+
+    clear_created_cache()
+    started = time.perf_counter()
+    single_pass(news, to_epoch_ms(watermark))
+    cold = time.perf_counter() - started
+    warm = best_of(args.repeat, single_pass, news, to_epoch_ms(watermark))
+
+    print(f"articles:                  {args.articles}")
+    print(f"two-pass strptime:         {baseline * 1000:8.1f} ms")
+    print(f"single pass, cold cache:   {cold * 1000:8.1f} ms  ({baseline / cold:5.1f}x)")
+    print(f"single pass, warm cache:   {warm * 1000:8.1f} ms  ({baseline / warm:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import copy
+import hashlib
 import yaml
 import os
 import string
 from schema import Schema, And, Use, Optional, Or
+from fleets import fleet_state_file
 
 
 class NestedTemplate(string.Template):
@@ -19,18 +22,90 @@ class NestedTemplate(string.Template):
         return result
 
 
-def load_yaml_with_substitutions(yaml_content, context):
-    def string_constructor(loader, node):
-        t = NestedTemplate(node.value)
-        return t.safe_substitute(context)
+class SubstitutionLoader(yaml.SafeLoader):
+    """SafeLoader that expands $VARIABLES in strings from ``self.context``.
+
+    The constructor and resolver are registered on this subclass once, so
+    yaml.SafeLoader itself is left untouched for other users such as tmuxp
+    config parsing.
+    """
+
+    context = {}
+
 
-    loader = yaml.SafeLoader
-    loader.add_constructor("tag:yaml.org,2002:str", string_constructor)
+def _substitute_string(loader, node):
+    return NestedTemplate(node.value).safe_substitute(loader.context)
 
-    token_re = NestedTemplate.pattern
-    loader.add_implicit_resolver("tag:yaml.org,2002:str", token_re, None)
 
-    return yaml.load(yaml_content, Loader=loader)
+SubstitutionLoader.add_constructor("tag:yaml.org,2002:str", _substitute_string)
+SubstitutionLoader.add_implicit_resolver("tag:yaml.org,2002:str", NestedTemplate.pattern, None)
+
+
+def load_yaml_with_substitutions(yaml_content, context):
+    loader = SubstitutionLoader(yaml_content)
+    loader.context = context
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+# Validated configs keyed on (path, content hash, referenced environment)
+_config_cache = {}
+
+
+def config_cache_key(config_file, yaml_content, context):
+    """Key for a config file's contents and the variables it refers to."""
+    names = sorted(
+        {
+            match.group("named") or match.group("braced")
+            for match in NestedTemplate.pattern.finditer(yaml_content)
+            if match.group("named") or match.group("braced")
+        }
+    )
+    environment = tuple((name, context.get(name)) for name in names)
+    content_hash = hashlib.sha256(yaml_content.encode("utf-8")).hexdigest()
+    return os.path.abspath(config_file), content_hash, environment
+
+
+NEWS_MONITORING_SCHEMA = {"categories": [str], "quote_currencies": [str]}
+
+PASSIVBOT_SCHEMA = {
+    "passivbot_folder": str,
+    Optional("trading_quote_currency"): str,
+    "symbol_exclusion_strategy": {
+        "remove_from_approved_coins": bool,
+        "add_to_ignored_coins": bool,
+    },
+    "mode": str,
+    Optional("restart_debounce_seconds"): And(Or(int, float), lambda n: n >= 0),
+    Optional("restart_min_interval_seconds"): And(Or(int, float), lambda n: n >= 0),
+    Optional("restart_timeout_seconds"): And(Or(int, float), lambda n: n > 0),
+    "tmuxp": {
+        "tmux_config_file": str,
+        "tmux_session_name": str,
+        "stop_command": str,
+        "start_command": str,
+        Optional("restart_scope"): Or("pane", "session"),
+    },
+    "passivbot_config_files": [{"config_file": str}],
+}
+
+
+def check_fleets(config):
+    """Checks across fleets that the schema cannot express."""
+    if "fleets" not in config:
+        if "passivbot" not in config:
+            raise ValueError("Missing key: 'passivbot' (or 'fleets')")
+        return
+    if "passivbot" in config or "state_file" in config:
+        raise ValueError("With 'fleets', 'passivbot' and 'state_file' belong in each fleet")
+    names = [fleet["name"] for fleet in config["fleets"]]
+    if len(set(names)) != len(names):
+        raise ValueError("Fleet names must be unique")
+    state_files = [fleet.get("state_file", fleet_state_file(fleet["name"])) for fleet in config["fleets"]]
+    if len(set(state_files)) != len(state_files):
+        raise ValueError("Fleets must not share a state_file")
 
 
 def load_and_validate_config(config_file="config.local.yml"):
@@ -45,6 +120,10 @@ def load_and_validate_config(config_file="config.local.yml"):
         # Add any additional variables you want to be available for substitution
         context["HOME"] = os.path.expanduser("~")
 
+        key = config_cache_key(config_file, yaml_content, context)
+        if key in _config_cache:
+            return copy.deepcopy(_config_cache[key])
+
         # First pass of substitution
         config = load_yaml_with_substitutions(yaml_content, context)
 
@@ -57,6 +136,16 @@ def load_and_validate_config(config_file="config.local.yml"):
             tmuxp_config = config["passivbot"]["tmuxp"]
             context.update(tmuxp_config)
 
+        # A fleet's own passivbot_folder and tmuxp variables apply within its block
+        for fleet in config.get("fleets") or []:
+            fleet_context = dict(context)
+            fleet_passivbot = fleet.get("passivbot") if isinstance(fleet, dict) else None
+            if isinstance(fleet_passivbot, dict):
+                if "passivbot_folder" in fleet_passivbot:
+                    fleet_context["passivbot_folder"] = fleet_passivbot["passivbot_folder"]
+                fleet_context.update(fleet_passivbot.get("tmuxp") or {})
+                fleet.update(load_yaml_with_substitutions(yaml.dump(fleet), fleet_context))
+
         # Perform a second pass of substitution for nested variables
         yaml_content = yaml.dump(config)
         config = load_yaml_with_substitutions(yaml_content, context)
@@ -64,25 +153,46 @@ def load_and_validate_config(config_file="config.local.yml"):
         # Validate the configuration
         schema = Schema(
             {
-                "symbolscout_endpoint": str,
-                "check_interval": And(int, lambda n: n > 0),
-                "news_monitoring": {"categories": [str], "quote_currencies": [str]},
-                "passivbot": {
-                    "passivbot_folder": str,
-                    Optional("trading_quote_currency"): str,
-                    "symbol_exclusion_strategy": {
-                        "remove_from_approved_coins": bool,
-                        "add_to_ignored_coins": bool,
-                    },
-                    "mode": str,
-                    "tmuxp": {
-                        "tmux_config_file": str,
-                        "tmux_session_name": str,
-                        "stop_command": str,
-                        "start_command": str,
-                    },
-                    "passivbot_config_files": [{"config_file": str}],
+                "symbolscout_endpoint": Or(str, And([str], len)),
+                Optional("endpoint_timeout"): And(Or(int, float), lambda n: n > 0),
+                Optional("stream_news"): bool,
+                Optional("stream_overlap_seconds"): And(Or(int, float), lambda n: n >= 0),
+                Optional("feed_newest_first"): bool,
+                Optional("feed_cache"): {
+                    "directory": str,
+                    Optional("max_age"): And(Or(int, float), lambda n: n >= 0),
+                },
+                Optional("watch_config"): bool,
+                Optional("metrics"): {
+                    Optional("port"): And(int, lambda n: 0 <= n < 65536),
+                    Optional("host"): str,
+                    Optional("summary_interval"): And(Or(int, float), lambda n: n > 0),
                 },
+                Optional("push"): {
+                    "port": And(int, lambda n: 0 <= n < 65536),
+                    Optional("host"): str,
+                    Optional("path"): str,
+                    Optional("token"): str,
+                },
+                "check_interval": And(int, lambda n: n > 0),
+                Optional("adaptive_polling"): bool,
+                Optional("poll_min_interval"): And(Or(int, float), lambda n: n > 0),
+                Optional("poll_max_interval"): And(Or(int, float), lambda n: n > 0),
+                Optional("scrape_interval"): And(Or(int, float), lambda n: n > 0),
+                "news_monitoring": NEWS_MONITORING_SCHEMA,
+                Optional("passivbot"): PASSIVBOT_SCHEMA,
+                Optional("state_file"): str,
+                Optional("fleets"): And(
+                    [
+                        {
+                            "name": And(str, len),
+                            Optional("state_file"): str,
+                            Optional("news_monitoring"): NEWS_MONITORING_SCHEMA,
+                            "passivbot": PASSIVBOT_SCHEMA,
+                        }
+                    ],
+                    len,
+                ),
                 Optional("notifications"): {
                     "apprise_urls": [str],
                     "notify_on": {
@@ -90,12 +200,20 @@ def load_and_validate_config(config_file="config.local.yml"):
                         "config_updates": bool,
                         "new_news": bool,
                     },
+                    Optional("queue_size"): And(int, lambda n: n > 0),
+                    Optional("overflow"): Or("drop_new", "drop_old"),
+                    Optional("digest"): bool,
+                    Optional("rate_limit_per_minute"): And(Or(int, float), lambda n: n > 0),
+                    Optional("rate_limit_burst"): And(int, lambda n: n > 0),
                 },
             }
         )
 
         validated_config = schema.validate(config)
-        return validated_config
+        check_fleets(validated_config)
+        _config_cache.clear()
+        _config_cache[key] = validated_config
+        return copy.deepcopy(validated_config)
     except Exception as e:
         print(f"Error in loading or validating configuration: {str(e)}")
         raise ValueError(f"Error in loading or validating configuration: {str(e)}")
\ No newline at end of file
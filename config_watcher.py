@@ -0,0 +1,103 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+
+CONFIG_FILE_NAMES = ("config.local.yml", "config.yml")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+# Editors often save by writing a temporary file and renaming it over the
+# original, so the directory is watched rather than the file itself.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+# How often the files are checked when inotify is unavailable
+POLL_INTERVAL = 5
+
+
+def _inotify_fd(directory):
+    """Return an inotify descriptor watching ``directory``, or None if unavailable."""
+    path = ctypes.util.find_library("c")
+    try:
+        libc = ctypes.CDLL(path, use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+
+    fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    if inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class ConfigWatcher:
+    """Reports when the sentinel's config file was written, replaced or removed.
+
+    Uses inotify on the config directory where available and falls back to
+    comparing the files' mtime, size and inode. ``changed()`` never blocks, so
+    it can be called on every tick of the main loop.
+    """
+
+    def __init__(self, directory=".", file_names=CONFIG_FILE_NAMES, use_inotify=True):
+        self.directory = os.path.abspath(directory)
+        self.file_names = set(file_names)
+        self.fd = _inotify_fd(self.directory) if use_inotify else None
+        self.signatures = self._signatures()
+
+    @property
+    def mode(self):
+        return "inotify" if self.fd is not None else "polling"
+
+    def _signatures(self):
+        signatures = {}
+        for name in self.file_names:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            signatures[name] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return signatures
+
+    def _read_events(self):
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if name in self.file_names:
+                    changed = True
+
+    def changed(self):
+        """True if a config file changed since the previous call."""
+        if self.fd is not None:
+            if not self._read_events():
+                return False
+        signatures = self._signatures()
+        if signatures == self.signatures:
+            return False
+        self.signatures = signatures
+        return True
+
+    def fileno(self):
+        """Descriptor that becomes readable on a change, or None when polling."""
+        return self.fd
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,185 @@
+import codecs
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+import requests
+from article import decode_article
+from logger import logger
+from news_fetcher import STREAM_CHUNK_SIZE, iter_json_array, select_new
+
+DEFAULT_FEED_CACHE_MAX_AGE = 60
+
+
+class FeedCacheEntry:
+    """A cached feed response mapped into memory: a JSON header line, then the body."""
+
+    def __init__(self, meta, data, offset):
+        self.meta = meta
+        self.data = data
+        self.offset = offset
+
+    def body(self):
+        return self.data[self.offset:]
+
+    def iter_text(self):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for start in range(self.offset, len(self.data), STREAM_CHUNK_SIZE):
+            yield decoder.decode(self.data[start:start + STREAM_CHUNK_SIZE])
+        yield decoder.decode(b"", final=True)
+
+    def close(self):
+        self.data.close()
+
+
+class FeedCache:
+    """Last response of each endpoint, shared on disk by the sentinels of one host.
+
+    An entry younger than ``max_age`` seconds is used instead of calling the
+    endpoint. Once it is older, the first process to take the entry's lock
+    refreshes it (with a conditional request on the entry's validators) while
+    the others wait for the lock and then read what it fetched. Entries are
+    replaced atomically, so readers never see a partial write.
+    """
+
+    def __init__(self, directory, max_age=DEFAULT_FEED_CACHE_MAX_AGE, clock=time.time):
+        self.directory = directory
+        self.max_age = max_age
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+    def entry_path(self, endpoint):
+        name = hashlib.sha256(endpoint.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"feed-{name}.json")
+
+    @contextmanager
+    def refresh_lock(self, endpoint):
+        with open(self.entry_path(endpoint) + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self, endpoint):
+        """The cached entry of ``endpoint``, or None if there is no usable one."""
+        try:
+            with open(self.entry_path(endpoint), "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        end = data.find(b"\n")
+        try:
+            meta = json.loads(data[:end]) if end >= 0 else None
+        except ValueError:
+            meta = None
+        if not isinstance(meta, dict) or meta.get("endpoint") != endpoint:
+            data.close()
+            return None
+        return FeedCacheEntry(meta, data, end + 1)
+
+    def write(self, endpoint, meta, body):
+        path = self.entry_path(endpoint)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(meta).encode("utf-8") + b"\n")
+                f.write(body)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def is_fresh(self, entry):
+        return 0 <= self.clock() - entry.meta["fetched_at"] < self.max_age
+
+    def refresh(self, fetcher, entry):
+        """Fetch ``fetcher``'s endpoint into the cache and return the new entry, or None."""
+        headers = {}
+        if entry is not None and entry.meta.get("etag"):
+            headers["If-None-Match"] = entry.meta["etag"]
+        if entry is not None and entry.meta.get("last_modified"):
+            headers["If-Modified-Since"] = entry.meta["last_modified"]
+        try:
+            response = fetcher.session.get(fetcher.endpoint, headers=headers, timeout=fetcher.timeout)
+            if response.status_code == 304 and entry is not None:
+                meta = dict(entry.meta, fetched_at=self.clock())
+                body = entry.body()
+            else:
+                response.raise_for_status()
+                body = response.content
+                meta = {
+                    "endpoint": fetcher.endpoint,
+                    "fetched_at": self.clock(),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "version": hashlib.sha256(body).hexdigest(),
+                }
+        except requests.RequestException as e:
+            logger.error(f"Error fetching news after {fetcher.max_retries} retries: {str(e)}")
+            return None
+        finally:
+            if entry is not None:
+                entry.close()
+        self.write(fetcher.endpoint, meta, body)
+        return self.read(fetcher.endpoint)
+
+    def fetch(self, fetcher, since=None, newest_first=False):
+        """Like ``fetcher.fetch``, but through the cache."""
+        generation = fetcher.generation
+        try:
+            entry = self.read(fetcher.endpoint)
+            if entry is None or not self.is_fresh(entry):
+                if entry is not None:
+                    entry.close()
+                with self.refresh_lock(fetcher.endpoint):
+                    # Another process may have refreshed it while we waited
+                    entry = self.read(fetcher.endpoint)
+                    if entry is None or not self.is_fresh(entry):
+                        entry = self.refresh(fetcher, entry)
+                        if entry is None:
+                            return None
+            else:
+                logger.info("Using the shared feed cache")
+            try:
+                return self.decode(fetcher, entry, since, newest_first, generation)
+            finally:
+                entry.close()
+        except Exception as e:
+            logger.error(f"Unexpected error fetching news through the feed cache: {str(e)}")
+            return None
+
+    def decode(self, fetcher, entry, since, newest_first, generation):
+        # A response this process has already read counts as a 304
+        if entry.meta["version"] == fetcher.cache_version:
+            logger.info("News feed not modified since last fetch")
+            return {"news": []}
+        if since is None:
+            news = json.loads(entry.body(), object_hook=decode_article)
+            logger.info(f"Successfully fetched {len(news['news'])} news articles")
+        else:
+            new_articles, scanned = select_new(iter_json_array(entry.iter_text(), "news"), since, newest_first)
+            news = {"news": new_articles}
+            logger.info(f"Successfully streamed {len(new_articles)} new news articles ({scanned} scanned)")
+        if generation == fetcher.generation:
+            fetcher.cache_version = entry.meta["version"]
+        return news
+
+
+_caches = {}
+
+
+def get_feed_cache(directory, max_age=DEFAULT_FEED_CACHE_MAX_AGE):
+    key = (directory, max_age)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = FeedCache(directory, max_age)
+        _caches[key] = cache
+    return cache
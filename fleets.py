@@ -0,0 +1,36 @@
+from state_manager import ARTICLE_STORE_FILE
+
+
+def fleet_state_file(name):
+    return f"processed_articles_{name}.db"
+
+
+def fleet_configs(config):
+    """The PassivBot fleets of ``config`` as (name, fleet config) pairs.
+
+    Without a ``fleets`` section the config describes a single fleet named
+    None. Otherwise every fleet gets a copy of the shared settings with its own
+    ``passivbot`` block, ``state_file`` and, if it has one, ``news_monitoring``.
+    """
+    if "fleets" not in config:
+        return [(None, config)]
+    shared = {key: value for key, value in config.items() if key != "fleets"}
+    fleets = []
+    for fleet in config["fleets"]:
+        fleet_config = dict(
+            shared,
+            passivbot=fleet["passivbot"],
+            state_file=fleet.get("state_file", fleet_state_file(fleet["name"])),
+        )
+        if "news_monitoring" in fleet:
+            fleet_config["news_monitoring"] = fleet["news_monitoring"]
+        fleets.append((fleet["name"], fleet_config))
+    return fleets
+
+
+def state_file(fleet_config):
+    return fleet_config.get("state_file", ARTICLE_STORE_FILE)
+
+
+def fleet_label(name):
+    return "" if name is None else f"[{name}] "
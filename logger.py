@@ -1,62 +1,245 @@
+import atexit
 import logging
-import apprise
-from config import load_and_validate_config
+import logging.handlers
+import queue
+import time
+
+DEFAULT_NOTIFICATION_QUEUE_SIZE = 1000
+# Stays clear of Discord's webhook limit of 30 requests per minute
+DEFAULT_RATE_LIMIT_PER_MINUTE = 20
+DEFAULT_RATE_LIMIT_BURST = 5
+# Notification types collected into the per-cycle digest, with their labels
+DIGEST_TYPES = {'News': 'new articles', 'Config Update': 'config updates'}
+
+class TokenBucket:
+    """Allows ``burst`` sends at once, refilled at ``rate_per_minute``."""
+
+    def __init__(self, rate_per_minute, burst, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+class NotificationChannel:
+    """One Apprise URL with its own rate limit.
+
+    Messages that arrive while the channel is out of tokens are held and sent
+    together with the next message that gets a token, so nothing is lost
+    during bursts.
+    """
+
+    def __init__(self, url, bucket):
+        # Imported here: apprise is slow to import and only needed when
+        # notifications are enabled
+        import apprise
+
+        self.url = url
+        self.apprise = apprise.Apprise()
+        self.apprise.add(url)
+        self.bucket = bucket
+        self.held = []
+
+    def send(self, title, body):
+        self.held.append((title, body))
+        if self.bucket.try_consume():
+            self._deliver()
+
+    def flush(self):
+        """Send held messages, waiting for the rate limit if necessary."""
+        if not self.held:
+            return
+        if not self.bucket.try_consume():
+            time.sleep(self.bucket.wait_time())
+            self.bucket.try_consume()
+        self._deliver()
+
+    def _deliver(self):
+        held, self.held = self.held, []
+        if len(held) == 1:
+            title, body = held[0]
+        else:
+            title = f"SymbolScout: {len(held)} notifications"
+            body = '\n\n'.join(f"{title}\n{body}" for title, body in held)
+        self.apprise.notify(title=title, body=body)
 
 class NotifyHandler(logging.Handler):
     def __init__(self, config):
         super().__init__()
-        self.apprise = apprise.Apprise()
-        for url in config['notifications']['apprise_urls']:
-            self.apprise.add(url)
-        self.notify_config = config['notifications']['notify_on']
+        notifications = config['notifications']
+        rate_per_minute = notifications.get('rate_limit_per_minute', DEFAULT_RATE_LIMIT_PER_MINUTE)
+        burst = notifications.get('rate_limit_burst', DEFAULT_RATE_LIMIT_BURST)
+        self.channels = [
+            NotificationChannel(url, TokenBucket(rate_per_minute, burst))
+            for url in notifications['apprise_urls']
+        ]
+        self.notify_config = notifications['notify_on']
+        self.digest_mode = notifications.get('digest', False)
+        self.digest = {}
 
-    def emit(self, record):
+    def notification_type(self, record):
         if record.levelno >= logging.ERROR and self.notify_config.get('errors', False):
-            self.notify('Error', record)
+            return 'Error'
         elif record.levelno == logging.INFO:
-            if 'started symbolscout integration' in record.msg.lower():
-                self.notify('Startup', record)
-            if 'config update' in record.msg.lower() and self.notify_config.get('config_updates', False):
-                self.notify('Config Update', record)
-            elif 'new article' in record.msg.lower() and self.notify_config.get('new_news', False):
-                self.notify('News', record)
+            message = str(record.msg).lower()
+            if 'started symbolscout integration' in message:
+                return 'Startup'
+            if 'config update' in message and self.notify_config.get('config_updates', False):
+                return 'Config Update'
+            elif 'new article' in message and self.notify_config.get('new_news', False):
+                return 'News'
+        return None
 
-    def notify(self, notification_type, record):
-        self.apprise.notify(
-            title=f"SymbolScout {notification_type}",
-            body=record.msg
-        )
-
-def setup_logger():
-    try:
-        config = load_and_validate_config()
-        logger = logging.getLogger('SymbolScout')
-        logger.setLevel(logging.INFO)
-
-        # Console handler
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
-
-        # Check if notifications are enabled
-        if 'notifications' in config and any(config['notifications']['notify_on'].values()):
-            # Notify handler
-            nh = NotifyHandler(config)
-            nh.setLevel(logging.INFO)
-            nh.setFormatter(formatter)
-            logger.addHandler(nh)
-            logger.info("Notification system initialized")
+    def emit(self, record):
+        if getattr(record, 'flush_notifications', False):
+            self.flush()
+            return
+        notification_type = self.notification_type(record)
+        if not notification_type:
+            return
+        if self.digest_mode and notification_type in DIGEST_TYPES:
+            self.digest.setdefault(notification_type, []).append(record.msg)
         else:
-            logger.info("Notifications are disabled")
+            self.notify(notification_type, record)
+
+    def notify(self, notification_type, record):
+        self.send(f"SymbolScout {notification_type}", record.msg)
+
+    def send(self, title, body):
+        for channel in self.channels:
+            channel.send(title, body)
+
+    def flush(self):
+        """Send the collected digest as one message per channel."""
+        if self.digest:
+            digest, self.digest = self.digest, {}
+            summary = ', '.join(
+                f"{len(digest[kind])} {DIGEST_TYPES[kind]}" for kind in DIGEST_TYPES if kind in digest
+            )
+            sections = [
+                f"{DIGEST_TYPES[kind].capitalize()}:\n" + '\n'.join(f"- {message}" for message in digest[kind])
+                for kind in DIGEST_TYPES if kind in digest
+            ]
+            self.send(f"SymbolScout Digest: {summary}", '\n\n'.join(sections))
+        for channel in self.channels:
+            channel.flush()
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the logging call.
+
+    When the queue is full the record is dropped, either the new one
+    ('drop_new') or the oldest queued one ('drop_old'), and counted.
+    """
+
+    def __init__(self, record_queue, overflow='drop_new'):
+        super().__init__(record_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.overflow == 'drop_old':
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+
+class NotificationDispatcher(logging.handlers.QueueListener):
+    """Delivers queued records to the notify handler on its own thread."""
+
+    def enqueue_sentinel(self):
+        # Block rather than drop: the sentinel must get through to stop the thread
+        self.queue.put(self._sentinel)
+
+_dispatcher = None
+
+def flush_notifications():
+    """Ask the dispatcher to send the digest collected so far.
+
+    The request travels through the notification queue, so it is handled after
+    every record logged before it.
+    """
+    if _dispatcher is not None:
+        record = logging.makeLogRecord({'msg': 'flush notifications', 'flush_notifications': True})
+        try:
+            _dispatcher.queue.put_nowait(record)
+        except queue.Full:
+            pass  # the digest goes out with the next flush
+
+def shutdown_notifications():
+    """Deliver the notifications still queued and stop the dispatcher thread."""
+    global _dispatcher
+    if _dispatcher is not None:
+        flush_notifications()
+        _dispatcher.stop()
+        _dispatcher = None
+
+logger = logging.getLogger('SymbolScout')
+logger.setLevel(logging.INFO)
+
+# Handlers attached by setup_logger, replaced when it is called again
+_handlers = []
+
+def setup_logger(config):
+    """Attach the console and notification handlers for ``config``."""
+    global _dispatcher
+    shutdown_notifications()
+    for handler in _handlers:
+        logger.removeHandler(handler)
+    _handlers.clear()
+
+    # Console handler
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+    _handlers.append(ch)
+
+    # Check if notifications are enabled
+    if 'notifications' in config and any(config['notifications']['notify_on'].values()):
+        # Notify handler, fed through a bounded queue so that logging calls
+        # on the hot path never wait on webhook round trips
+        nh = NotifyHandler(config)
+        nh.setLevel(logging.INFO)
+        nh.setFormatter(formatter)
+
+        notifications = config['notifications']
+        record_queue = queue.Queue(notifications.get('queue_size', DEFAULT_NOTIFICATION_QUEUE_SIZE))
+        qh = BoundedQueueHandler(record_queue, notifications.get('overflow', 'drop_new'))
+        qh.setLevel(logging.INFO)
+        qh.addFilter(lambda record: nh.notification_type(record) is not None)
+        logger.addHandler(qh)
+        _handlers.append(qh)
+
+        _dispatcher = NotificationDispatcher(record_queue, nh)
+        _dispatcher.start()
+        logger.info("Notification system initialized")
+    else:
+        logger.info("Notifications are disabled")
 
-        return logger
-    except Exception as e:
-        import traceback
-        print("Error in setup_logger:")
-        print(traceback.format_exc())
-        raise
+    return logger
 
-# Create and configure the logger
-logger = setup_logger()
\ No newline at end of file
+atexit.register(shutdown_notifications)
@@ -1,39 +1,138 @@
+import argparse
+import select
+import sys
 import time
-import schedule
+from datetime import timedelta
 from config import load_and_validate_config
-from news_fetcher import fetch_news
-from news_processor import extract_symbols, filter_news
-from passivbot_config_updater import update_passivbot_configs
-from state_manager import (
-    load_last_processed_timestamp,
-    get_new_articles,
-    update_last_processed_timestamp,
-)
-from logger import logger
-
-
-def process_news(config):
+from config_watcher import POLL_INTERVAL as CONFIG_POLL_INTERVAL, ConfigWatcher
+from news_fetcher import DEFAULT_ENDPOINT_TIMEOUT, DEFAULT_STREAM_OVERLAP, fetch_news, prune_fetchers, reset_validators
+from feed_cache import DEFAULT_FEED_CACHE_MAX_AGE, get_feed_cache
+from fleets import fleet_configs, fleet_label, state_file
+from news_processor import article_key, extract_symbols, filter_news
+from poll_scheduler import PollScheduler
+from push_listener import PushListener
+from passivbot_config_updater import expand_config_path, get_config_cache, restart_passivbot_instances, update_passivbot_configs
+from restart_scheduler import FleetRestartSchedulers
+from state_manager import get_article_store
+from logger import flush_notifications, logger, setup_logger
+from metrics import ARTICLES, DEFAULT_SUMMARY_INTERVAL, SYMBOLS_EXCLUDED, MetricsServer, summary, time_stage
+
+
+# Exit codes of a --once run
+EXIT_OK = 0
+EXIT_CYCLE_FAILED = 1
+EXIT_CONFIG_ERROR = 2
+
+
+def process_news(config, restart_scheduler=None, poll_scheduler=None):
+    """Run one news cycle. Returns False if it failed and should be retried.
+
+    The feed is fetched once and run through the pipeline of every fleet.
+    ``restart_scheduler`` is one scheduler for all fleets or a dict of them by
+    fleet name.
+    """
     try:
-        last_processed_timestamp = load_last_processed_timestamp()
-        logger.info(f"Last processed timestamp: {last_processed_timestamp}")
+        with time_stage("cycle"):
+            stores = fleet_stores(config)
+            for name, store in stores.items():
+                logger.info(f"{fleet_label(name)}Last processed timestamp: {store.last_processed_timestamp}")
+
+            with time_stage("fetch"):
+                news = fetch_news(
+                    config["symbolscout_endpoint"],
+                    endpoint_timeout=config.get("endpoint_timeout", DEFAULT_ENDPOINT_TIMEOUT),
+                    since=stream_start(config, stores) if config.get("stream_news", False) else None,
+                    newest_first=config.get("feed_newest_first", False),
+                    cache=feed_cache(config),
+                )
+
+            if not news:
+                logger.error("Failed to fetch news.")
+                return False
+
+            ARTICLES.inc(len(news["news"]), "fetched")
+            new_articles, failed = process_fleets(news, config, stores, restart_scheduler)
+            if poll_scheduler is not None:
+                poll_scheduler.observe(new_articles)
+            if failed:
+                reset_validators()
+            return not failed
+    except Exception as e:
+        # The articles of this cycle were not recorded, so make sure the next
+        # poll is not answered with a 304 that would hide them.
+        reset_validators()
+        logger.error(f"Error in process_news: {str(e)}")
+        return False
+    finally:
+        # In digest mode this cycle's notifications go out as one message
+        flush_notifications()
+
+
+def stream_start(config, stores):
+    # Streamed from the oldest point any fleet still needs
+    overlap = timedelta(seconds=config.get("stream_overlap_seconds", DEFAULT_STREAM_OVERLAP))
+    return min(store.stream_start(overlap) for store in stores.values())
+
+
+def feed_cache(config):
+    cache_config = config.get("feed_cache")
+    if not cache_config:
+        return None
+    return get_feed_cache(cache_config["directory"], cache_config.get("max_age", DEFAULT_FEED_CACHE_MAX_AGE))
 
-        news = fetch_news(config["symbolscout_endpoint"])
 
-        if not news:
-            logger.error("Failed to fetch news.")
-            return
+def fleet_stores(config):
+    return {name: get_article_store(state_file(fleet_config)) for name, fleet_config in fleet_configs(config)}
 
-        new_articles = get_new_articles(news, last_processed_timestamp)
 
-        if not new_articles:
-            logger.info("No articles to process.")
-            return
+def fleet_restart_scheduler(restart_scheduler, name):
+    if isinstance(restart_scheduler, dict):
+        return restart_scheduler.get(name)
+    return restart_scheduler
 
+
+def process_fleets(news, config, stores, restart_scheduler=None):
+    """Run ``news`` through the pipeline of every fleet, each with its own store.
+
+    A fleet that fails is logged and the others still run. Returns the
+    articles that were new to any fleet and the names of the fleets that failed.
+    """
+    new_articles = {}
+    failed = []
+    for name, fleet_config in fleet_configs(config):
+        if name is not None:
+            logger.info(f"Processing news for fleet {name}")
+        try:
+            articles = process_articles(
+                news, fleet_config, stores[name], fleet_restart_scheduler(restart_scheduler, name)
+            )
+            new_articles.update((article_key(article), article) for article in articles)
+        except Exception as e:
+            if name is None:
+                raise
+            logger.error(f"Error processing news for fleet {name}: {str(e)}")
+            failed.append(name)
+    return list(new_articles.values()), failed
+
+
+def process_articles(news, config, store, restart_scheduler=None):
+    """Run the articles of ``news`` not processed yet through the pipeline, and return them."""
+    with time_stage("dedupe"):
+        new_articles = store.get_new_articles(news)
+    ARTICLES.inc(len(new_articles), "new")
+
+    if not new_articles:
+        logger.info("No articles to process.")
+        return new_articles
+
+    with time_stage("filter"):
         filtered_news = filter_news({"news": new_articles}, config)
+    ARTICLES.inc(len(filtered_news), "kept")
 
-        quote_currencies = config["news_monitoring"]["quote_currencies"]
+    quote_currencies = config["news_monitoring"]["quote_currencies"]
 
-        symbols_to_exclude = set()
+    symbols_to_exclude = set()
+    with time_stage("extract"):
         for article in filtered_news:
             symbols = extract_symbols(article, quote_currencies)
             symbols_to_exclude.update(symbols)
@@ -41,66 +140,234 @@ def process_news(config):
                 f"New Article: {article['title']}\n  Category: {article['category']}\n  Symbols: {', '.join(symbols)}\n  Trading Pairs: {', '.join(article.get('trading_pairs', []))}\n {article['link']}"
             )
 
-        if symbols_to_exclude:
-            logger.info(f"Total symbols to exclude: {', '.join(symbols_to_exclude)}")
-            update_passivbot_configs(filtered_news, config, symbols_to_exclude)
-            logger.info("PassivBot configuration update completed")
-        else:
-            logger.info(
-                "No symbols to exclude. Skipping PassivBot configuration update."
-            )
-
-        update_last_processed_timestamp(news)
+    if symbols_to_exclude:
+        logger.info(f"Total symbols to exclude: {', '.join(symbols_to_exclude)}")
+        SYMBOLS_EXCLUDED.inc(len(symbols_to_exclude))
+        with time_stage("update"):
+            update_passivbot_configs(filtered_news, config, symbols_to_exclude, restart_scheduler)
+        logger.info("PassivBot configuration update completed")
+    else:
         logger.info(
-            f"Updated last processed timestamp to: {load_last_processed_timestamp()}"
+            "No symbols to exclude. Skipping PassivBot configuration update."
         )
+
+    with time_stage("store"):
+        store.mark_processed(new_articles)
+    logger.info(
+        f"Updated last processed timestamp to: {store.last_processed_timestamp}"
+    )
+    return new_articles
+
+
+def process_pushed_news(news, config, restart_scheduler=None):
+    """Process articles received by the push listener.
+
+    They are recorded in the same store as polled ones, so the next poll skips
+    them and picks up anything a failed push left unprocessed.
+    """
+    try:
+        logger.info(f"Received {len(news['news'])} pushed articles")
+        ARTICLES.inc(len(news["news"]), "pushed")
+        with time_stage("push"):
+            _, failed = process_fleets(news, config, fleet_stores(config), restart_scheduler)
+        return not failed
     except Exception as e:
-        logger.error(f"Error in process_news: {str(e)}")
+        logger.error(f"Error processing pushed news: {str(e)}")
+        return False
+    finally:
+        flush_notifications()
 
 
-def main():
-    logger.info("Started SymbolScout integration for PassivBot")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SymbolScout integration for PassivBot")
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="run a single check and exit (for cron jobs and systemd timers)",
+    )
+    return parser.parse_args(argv)
+
+
+def run_once(config):
+    """Run one cycle with restarts done inline, and return the exit code."""
+    return EXIT_OK if process_news(config) else EXIT_CYCLE_FAILED
 
-    config = load_and_validate_config()
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # The config is loaded once here and handed to the logger and the pipeline
+    try:
+        config = load_and_validate_config()
+    except ValueError:
+        config = None
     if not config:
         logger.error("Configuration loading or validation failed. Exiting.")
-        return
+        return EXIT_CONFIG_ERROR
 
-    # Run process_news once immediately
-    process_news(config)
+    setup_logger(config)
+    if args.once:
+        return run_once(config)
 
-    # Schedule future runs
-    schedule.every(config["check_interval"]).seconds.do(process_news, config)
+    logger.info("Started SymbolScout integration for PassivBot")
+    run_forever(config)
+    return EXIT_OK
 
-    logger.info(f"Scheduled to run every {config['check_interval']} seconds")
+
+def reload_config(config, restart_scheduler, poll_scheduler=None):
+    """Load the changed config file and apply it, returning the config to use.
+
+    Structures derived from the config (fetchers, filters, coin indexes) are
+    looked up by their settings on every cycle, so they are rebuilt only when
+    the settings they depend on change. An invalid file keeps the current config.
+    """
+    try:
+        new_config = load_and_validate_config()
+    except ValueError as e:
+        logger.error(f"Keeping the current configuration, the changed file is invalid: {str(e)}")
+        return config
+    if new_config == config:
+        return config
+
+    changed = sorted(key for key in set(config) | set(new_config) if config.get(key) != new_config.get(key))
+    if config.get("notifications") != new_config.get("notifications"):
+        setup_logger(new_config)
+    restart_scheduler.reconfigure(new_config)
+    if poll_scheduler is not None:
+        poll_scheduler.reconfigure(new_config)
+    prune_fetchers(new_config["symbolscout_endpoint"])
+    get_config_cache().prune_index({
+        expand_config_path(entry["config_file"])
+        for _, fleet_config in fleet_configs(new_config)
+        for entry in fleet_config["passivbot"]["passivbot_config_files"]
+    })
+    logger.info(f"Reloaded configuration ({', '.join(changed)} changed)")
+    return new_config
+
+
+def wait_for_events(timeout, watcher=None, listener=None):
+    """Sleep up to ``timeout`` seconds, waking early for a config change or pushed news."""
+    fds = []
+    if listener is not None:
+        fds.append(listener.fileno())
+    if watcher is not None:
+        if watcher.fileno() is not None:
+            fds.append(watcher.fileno())
+        else:
+            timeout = min(timeout, CONFIG_POLL_INTERVAL)
+    if fds:
+        select.select(fds, [], [], timeout)
+    else:
+        time.sleep(timeout)
+
+
+def run_forever(config):
+    # Restarts run on a background worker per fleet so a slow or hung process
+    # manager never holds up news polling or the other fleets
+    restart_scheduler = FleetRestartSchedulers(restart_passivbot_instances, config)
+    poll_scheduler = PollScheduler.from_config(config)
+
+    watcher = ConfigWatcher() if config.get("watch_config", True) else None
+    if watcher is not None:
+        logger.info(f"Watching the configuration file for changes ({watcher.mode})")
+
+    # Pushed news is processed as it arrives; polling continues as a fallback
+    # that picks up anything a push missed
+    listener = PushListener.from_config(config)
+    if listener is not None:
+        listener.start()
+
+    metrics_server = MetricsServer.from_config(config)
+    if metrics_server is not None:
+        metrics_server.start()
 
     last_log_time = time.time()
     log_interval = 60  # Log remaining time every 60 seconds
+    last_summary_time = last_log_time
+    restart_stats = restart_scheduler.stats()
+    finished_restarts = (restart_stats["executed"], restart_stats["failed"])
+
+    try:
+        while True:
+            if poll_scheduler.seconds_until_due() == 0:
+                process_news(config, restart_scheduler, poll_scheduler)
+                next_poll = poll_scheduler.schedule_next()
+                logger.info(
+                    f"Next check at {time.strftime('%H:%M:%S', time.localtime(next_poll))} "
+                    f"(interval {int(poll_scheduler.interval)}s, "
+                    f"scrape phase {'unknown' if poll_scheduler.phase() is None else int(poll_scheduler.phase())})"
+                )
+            restart_scheduler.run_due(config)
+
+            # Restarts finish between cycles; send what they reported
+            restart_stats = restart_scheduler.stats()
+            if (restart_stats["executed"], restart_stats["failed"]) != finished_restarts:
+                finished_restarts = (restart_stats["executed"], restart_stats["failed"])
+                flush_notifications()
+
+            current_time = time.time()
+            if current_time - last_log_time >= log_interval:
+                logger.info(
+                    f"Next update in {int(poll_scheduler.seconds_until_due())} seconds "
+                    f"(restarts pending: {restart_stats['pending']}, in progress: {restart_stats['in_flight']}, "
+                    f"executed: {restart_stats['executed']}, failed: {restart_stats['failed']})"
+                )
+                last_log_time = current_time
 
-    while True:
-        # Get the number of seconds until the next job
-        idle_seconds = schedule.idle_seconds()
+            summary_interval = None
+            if "metrics" in config:
+                summary_interval = config["metrics"].get("summary_interval", DEFAULT_SUMMARY_INTERVAL)
+                if current_time - last_summary_time >= summary_interval:
+                    logger.info(summary())
+                    last_summary_time = current_time
 
-        if idle_seconds is None:
-            logger.info("No more jobs scheduled. Exiting.")
-            break
+            # Sleep until something is due: the next poll, a pending restart,
+            # a status line, or (while restarts run) their completion
+            restart_stats = restart_scheduler.stats()
+            timeouts = [poll_scheduler.seconds_until_due(), last_log_time + log_interval - current_time]
+            if summary_interval is not None:
+                timeouts.append(last_summary_time + summary_interval - current_time)
+            restart_due = restart_scheduler.seconds_until_due()
+            if restart_due is not None:
+                timeouts.append(restart_due)
+            if restart_stats["in_flight"]:
+                timeouts.append(1)
+            timeout = max(min(timeouts), 0)
 
-        current_time = time.time()
-        if current_time - last_log_time >= log_interval:
-            logger.info(f"Next update in {int(idle_seconds)} seconds")
-            last_log_time = current_time
+            wait_for_events(timeout, watcher, listener)
 
-        # Sleep until the next job or for 1 second, whichever is shorter
-        time.sleep(min(idle_seconds, 1))
+            if listener is not None:
+                pushed = listener.drain()
+                if pushed:
+                    process_pushed_news(pushed, config, restart_scheduler)
 
-        schedule.run_pending()
+            # Swapped in between cycles, never while one is running
+            if watcher is not None and watcher.changed():
+                new_config = reload_config(config, restart_scheduler, poll_scheduler)
+                if new_config.get("push") != config.get("push"):
+                    if listener is not None:
+                        listener.close()
+                    listener = PushListener.from_config(new_config)
+                    if listener is not None:
+                        listener.start()
+                config = new_config
+    finally:
+        if watcher is not None:
+            watcher.close()
+        if listener is not None:
+            listener.close()
+        if metrics_server is not None:
+            metrics_server.close()
+        # Let restarts that were already handed off finish before exiting
+        restart_scheduler.shutdown()
 
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except Exception as e:
         if (logger):
             logger.error(f"An error occurred: {str(e)}")
         else:
-            print(f"An error occurred: {str(e)}")
\ No newline at end of file
+            print(f"An error occurred: {str(e)}")
+        sys.exit(EXIT_CYCLE_FAILED)
\ No newline at end of file
@@ -0,0 +1,224 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logger import logger
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_SUMMARY_INTERVAL = 3600
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 900, 1200, 1800, 3600, 7200, 21600, 86400)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, amount=1, label_value=None):
+        with self.lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def value(self, label_value=None):
+        with self.lock:
+            return self.values.get(label_value, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            values = dict(self.values) or {None: 0}
+        for label_value, value in sorted(values.items(), key=lambda item: str(item[0])):
+            labels = [(self.label, label_value)] if self.label else []
+            lines.append(f"{self.name}{format_labels(labels)} {format_value(value)}")
+        return lines
+
+
+class HistogramSeries:
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Prometheus-style histogram with cumulative buckets, optionally split by one label."""
+
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, value, label_value=None):
+        with self.lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = HistogramSeries(self.buckets)
+            series.counts[bisect.bisect_left(self.buckets, value)] += 1
+            series.sum += value
+            series.count += 1
+
+    def count(self, label_value=None):
+        with self.lock:
+            series = self.series.get(label_value)
+            return 0 if series is None else series.count
+
+    def quantile(self, q, label_value=None):
+        """Estimate of the ``q`` quantile, interpolated within buckets like histogram_quantile()."""
+        with self.lock:
+            series = self.series.get(label_value)
+            if series is None or series.count == 0:
+                return None
+            counts = list(series.counts)
+            total = series.count
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def label_values(self):
+        with self.lock:
+            return sorted(self.series, key=str)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            snapshot = [(label_value, list(s.counts), s.sum, s.count) for label_value, s in self.series.items()]
+        for label_value, counts, total, count in sorted(snapshot, key=lambda item: str(item[0])):
+            labels = [(self.label, label_value)] if self.label else []
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(labels + [("le", format_value(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "symbolscout_stage_duration_seconds",
+    "Time spent in each processing stage.",
+    label="stage",
+)
+EXCLUSION_LAG_SECONDS = Histogram(
+    "symbolscout_exclusion_lag_seconds",
+    "Time from an article's created timestamp until the config writes it caused completed.",
+    buckets=LAG_BUCKETS,
+)
+ARTICLES = Counter("symbolscout_articles_total", "Articles seen, by pipeline step.", label="step")
+SYMBOLS_EXCLUDED = Counter("symbolscout_symbols_excluded_total", "Symbols sent to the PassivBot config updater.")
+CONFIG_WRITES = Counter("symbolscout_config_writes_total", "PassivBot config files rewritten.")
+RESTARTS = Counter("symbolscout_restarts_total", "PassivBot restarts, by result.", label="result")
+
+METRICS = (STAGE_SECONDS, EXCLUSION_LAG_SECONDS, ARTICLES, SYMBOLS_EXCLUDED, CONFIG_WRITES, RESTARTS)
+
+
+@contextmanager
+def time_stage(stage):
+    """Record the time spent in the ``with`` block under ``stage``, even if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    """One-line overview of the stage timings and counters for the log."""
+
+    def ms(seconds):
+        return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+    stages = ", ".join(
+        f"{stage} n={STAGE_SECONDS.count(stage)} p50={ms(STAGE_SECONDS.quantile(0.5, stage))} "
+        f"p99={ms(STAGE_SECONDS.quantile(0.99, stage))}"
+        for stage in STAGE_SECONDS.label_values()
+    )
+    lag = EXCLUSION_LAG_SECONDS.quantile(0.5)
+    return (
+        f"Metrics: {stages or 'no cycles yet'}; "
+        f"articles new={ARTICLES.value('new')} kept={ARTICLES.value('kept')}, "
+        f"symbols excluded={SYMBOLS_EXCLUDED.value()}, config writes={CONFIG_WRITES.value()}, "
+        f"exclusion lag p50={'-' if lag is None else f'{lag:.0f}s'}"
+    )
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Serves ``/metrics`` for Prometheus on a background thread."""
+
+    def __init__(self, host=DEFAULT_METRICS_HOST, port=0):
+        self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @classmethod
+    def from_config(cls, config):
+        metrics_config = config.get("metrics") or {}
+        if "port" not in metrics_config:
+            return None
+        return cls(metrics_config.get("host", DEFAULT_METRICS_HOST), metrics_config["port"])
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+        logger.info(f"Serving metrics on {self.address}")
+
+    def close(self):
+        if self.thread is not None:
+            self.server.shutdown()
+        self.server.server_close()
@@ -1,34 +1,382 @@
+import codecs
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from logger import logger
+from article import decode_article
+from news_processor import article_key
+from state_manager import parse_created_ms, to_epoch_ms
 
-def fetch_news(endpoint, max_retries=3, backoff_factor=0.3):
-    # Create a retry strategy
-    retry_strategy = Retry(
-        total=max_retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=[500, 502, 503, 504],
-        allowed_methods=["GET"]
-    )
+DEFAULT_ENDPOINT_TIMEOUT = 15
+# How long to keep waiting for slower mirrors once one endpoint has answered
+MIRROR_GRACE_PERIOD = 1.0
+STREAM_CHUNK_SIZE = 16 * 1024
+# How far before the last processed article streaming starts, in seconds
+DEFAULT_STREAM_OVERLAP = 3600
 
-    # Create an HTTP adapter with the retry strategy
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-
-    # Create a session and mount the adapter
-    session = requests.Session()
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-
-    try:
-        response = session.get(endpoint, timeout=10)
-        response.raise_for_status()
-        news = response.json()
-        logger.info(f"Successfully fetched {len(news['news'])} news articles")
-        return news
-    except requests.RequestException as e:
-        logger.error(f"Error fetching news after {max_retries} retries: {str(e)}")
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected error fetching news: {str(e)}")
+# Articles are projected to compact Article records as they are decoded
+_decoder = json.JSONDecoder(object_hook=decode_article)
+
+
+class _JsonStream:
+    """Incremental reader over a stream of JSON text chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        for chunk in self.chunks:
+            if chunk:
+                # Drop what has already been consumed so the buffer stays small
+                self.buffer = self.buffer[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\n\r":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.more():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at position {self.pos} of JSON stream")
+        self.pos += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A value touching the end of the buffer may be a truncated number
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.more()
+
+
+def iter_json_array(chunks, key):
+    """Yield the items of the top-level ``key`` array one at a time."""
+    stream = _JsonStream(chunks)
+    stream.expect("{")
+    while True:
+        char = stream.peek()
+        if char == "}":
+            return
+        if char == ",":
+            stream.pos += 1
+            continue
+        name = stream.decode()
+        stream.expect(":")
+        if name != key:
+            stream.decode()
+            continue
+        stream.expect("[")
+        while True:
+            char = stream.peek()
+            if char == "]":
+                return
+            if char == ",":
+                stream.pos += 1
+                continue
+            yield stream.decode()
+
+
+def select_new(articles, since, newest_first=False):
+    """Articles created after ``since``, and the number of articles read to find them.
+
+    When the feed is known to be ordered newest first, reading stops at the
+    first article that is not newer than ``since``.
+    """
+    since_ms = to_epoch_ms(since)
+    new_articles = []
+    scanned = 0
+    for article in articles:
+        scanned += 1
+        if parse_created_ms(article["created"]) > since_ms:
+            new_articles.append(article)
+        elif newest_first:
+            break
+    return new_articles, scanned
+
+
+def iter_text(response):
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+class NewsFetcher:
+    """Long-lived HTTP client for a single news endpoint.
+
+    Keeps one pooled session alive between polls and remembers the
+    ETag/Last-Modified validators of the last response so unchanged feeds
+    come back as a bodyless 304.
+    """
+
+    def __init__(self, endpoint, max_retries=3, backoff_factor=0.3, timeout=10):
+        self.endpoint = endpoint
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.etag = None
+        self.last_modified = None
+        # Version of the shared feed cache entry this process read last
+        self.cache_version = None
+        # Bumped by reset_validators(), so requests started before it do not
+        # store validators for a response whose articles were never processed
+        self.generation = 0
+
+        # Create a retry strategy
+        retry_strategy = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=["GET"]
+        )
+
+        # Create an HTTP adapter with the retry strategy
+        adapter = HTTPAdapter(max_retries=retry_strategy)
+
+        # Create a session and mount the adapter
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def remember_validators(self, response, generation):
+        if generation == self.generation:
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+
+    def fetch(self, since=None, newest_first=False):
+        if since is not None:
+            return self.fetch_new(since, newest_first)
+        generation = self.generation
+        try:
+            response = self.session.get(
+                self.endpoint, headers=self.conditional_headers(), timeout=self.timeout
+            )
+            if response.status_code == 304:
+                logger.info("News feed not modified since last fetch")
+                return {"news": []}
+            response.raise_for_status()
+            news = response.json(object_hook=decode_article)
+            self.remember_validators(response, generation)
+            logger.info(f"Successfully fetched {len(news['news'])} news articles")
+            return news
+        except requests.RequestException as e:
+            logger.error(f"Error fetching news after {self.max_retries} retries: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error fetching news: {str(e)}")
+            return None
+
+    def fetch_new(self, since, newest_first=False):
+        """Stream the feed and keep only articles created after ``since``.
+
+        Articles are decoded one by one, so memory depends on the number of new
+        articles rather than on the size of the feed. When the feed is known to
+        be ordered newest first, reading stops at the first article that is
+        not newer than ``since``.
+        """
+        generation = self.generation
+        try:
+            with self.session.get(
+                self.endpoint,
+                headers=self.conditional_headers(),
+                timeout=self.timeout,
+                stream=True,
+            ) as response:
+                if response.status_code == 304:
+                    logger.info("News feed not modified since last fetch")
+                    return {"news": []}
+                response.raise_for_status()
+
+                new_articles, scanned = select_new(iter_json_array(iter_text(response), "news"), since, newest_first)
+
+                self.remember_validators(response, generation)
+            logger.info(
+                f"Successfully streamed {len(new_articles)} new news articles ({scanned} scanned)"
+            )
+            return {"news": new_articles}
+        except requests.RequestException as e:
+            logger.error(f"Error fetching news after {self.max_retries} retries: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error fetching news: {str(e)}")
+            return None
+
+    def reset_validators(self):
+        self.generation += 1
+        self.etag = None
+        self.last_modified = None
+        self.cache_version = None
+
+    def close(self):
+        self.session.close()
+
+
+_fetchers = {}
+
+
+def fetch_from(fetcher, since=None, newest_first=False, cache=None):
+    if cache is None:
+        return fetcher.fetch(since, newest_first)
+    return cache.fetch(fetcher, since, newest_first)
+
+
+def get_fetcher(endpoint, max_retries=3, backoff_factor=0.3):
+    key = (endpoint, max_retries, backoff_factor)
+    fetcher = _fetchers.get(key)
+    if fetcher is None:
+        fetcher = NewsFetcher(endpoint, max_retries, backoff_factor)
+        _fetchers[key] = fetcher
+    return fetcher
+
+
+def prune_fetchers(endpoints):
+    # Close the sessions of endpoints that were removed from the config; the
+    # remaining fetchers keep their connection pools and validators.
+    if isinstance(endpoints, str):
+        endpoints = [endpoints]
+    for key in [key for key in _fetchers if key[0] not in endpoints]:
+        _fetchers.pop(key).close()
+
+
+def reset_validators():
+    # Forget cached validators so the next poll downloads the full feed again,
+    # e.g. after a cycle failed before its articles were recorded as processed.
+    for fetcher in _fetchers.values():
+        fetcher.reset_validators()
+
+
+# Blocking fetches run here instead of the event loop's default executor, which
+# asyncio.run() would wait on and so let a hung mirror stall the whole cycle.
+_executor = ThreadPoolExecutor(thread_name_prefix="news-fetch")
+
+
+def merge_news(results):
+    merged = []
+    seen = set()
+    for news in results:
+        for article in news["news"]:
+            key = article_key(article)
+            if key not in seen:
+                seen.add(key)
+                merged.append(article)
+    return {"news": merged}
+
+
+async def fetch_news_async(
+    endpoints,
+    max_retries=3,
+    backoff_factor=0.3,
+    endpoint_timeout=DEFAULT_ENDPOINT_TIMEOUT,
+    grace_period=MIRROR_GRACE_PERIOD,
+    since=None,
+    newest_first=False,
+    cache=None,
+):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    tasks = {}
+    fetchers = {}
+    for endpoint in endpoints:
+        fetcher = get_fetcher(endpoint, max_retries, backoff_factor)
+        future = loop.run_in_executor(_executor, fetch_from, fetcher, since, newest_first, cache)
+        task = asyncio.ensure_future(asyncio.wait_for(future, endpoint_timeout))
+        tasks[task] = endpoint
+        fetchers[task] = fetcher
+
+    results = []
+    pending = set(tasks)
+    deadline = None
+    while pending:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        done, pending = await asyncio.wait(
+            pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not done:
+            break
+        for task in done:
+            try:
+                news = task.result()
+            except asyncio.TimeoutError:
+                logger.error(f"Timed out fetching news from {tasks[task]} after {endpoint_timeout} seconds")
+                # The request keeps running in its thread; its articles are
+                # dropped, so it must not leave validators behind either
+                fetchers[task].reset_validators()
+                continue
+            if news is not None:
+                results.append(news)
+        if results and deadline is None:
+            deadline = time.monotonic() + grace_period
+
+    for task in pending:
+        logger.info(f"Not waiting any longer for {tasks[task]}")
+        task.cancel()
+        fetchers[task].reset_validators()
+
+    if not results:
         return None
+
+    merged = merge_news(results)
+    logger.info(
+        f"Merged {len(merged['news'])} unique articles from {len(results)} of {len(tasks)} endpoints"
+    )
+    return merged
+
+
+def fetch_news(
+    endpoint,
+    max_retries=3,
+    backoff_factor=0.3,
+    endpoint_timeout=DEFAULT_ENDPOINT_TIMEOUT,
+    since=None,
+    newest_first=False,
+    cache=None,
+):
+    # With ``since`` set the feed is streamed and only newer articles are returned.
+    # With a FeedCache, responses are shared with the other sentinels on this host.
+    if isinstance(endpoint, str):
+        endpoint = [endpoint]
+    if len(endpoint) == 1:
+        return fetch_from(get_fetcher(endpoint[0], max_retries, backoff_factor), since, newest_first, cache)
+
+    # Only needed for mirrors; keeps single-endpoint and --once runs light
+    import asyncio
+
+    return asyncio.run(
+        fetch_news_async(
+            endpoint,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            endpoint_timeout=endpoint_timeout,
+            since=since,
+            newest_first=newest_first,
+            cache=cache,
+        )
+    )
@@ -1,13 +1,25 @@
+import hashlib
 from logger import logger
 
 
+def article_key(article):
+    # Article records carry the key computed from their original fields
+    key = getattr(article, 'key', None)
+    if key is not None:
+        return key
+    # Prefer the feed's own id; mirrors that omit it still agree on these fields
+    if article.get('id') is not None:
+        return str(article['id'])
+    content = '\x1f'.join(str(article.get(field, '')) for field in ('created', 'title', 'link'))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
 def extract_symbols(article, quote_currencies):
     symbols = set()
     
     # Extract from 'symbols' field
     if isinstance(article['symbols'], str):
         symbols.update(article['symbols'].replace(' ', '').split(','))
-    elif isinstance(article['symbols'], list):
+    elif isinstance(article['symbols'], (list, tuple)):
         symbols.update(article['symbols'])
     
     # Extract from trading pairs
@@ -19,28 +31,120 @@ def extract_symbols(article, quote_currencies):
     
     return symbols
 
-def filter_news(news, config):
-    all_news = news['news']
-    
-    categories = config['news_monitoring']['categories']
-    quote_currencies = config['news_monitoring']['quote_currencies']
+# Quote currencies recognised at the end of slash-less pairs such as "BTCUSDT",
+# in addition to the configured ones
+KNOWN_QUOTE_CURRENCIES = (
+    'USDT', 'USDC', 'FDUSD', 'TUSD', 'BUSD', 'USDE', 'DAI', 'USD',
+    'EUR', 'GBP', 'TRY', 'BRL', 'JPY', 'BTC', 'ETH', 'BNB',
+)
+PAIR_SEPARATORS = ('/', '-', '_')
+MAX_INDEXED_PAIRS = 100000
+
+def article_bases(article):
+    """The article's symbols as upper-case pair bases, longest first."""
+    symbols = article.get('symbols')
+    if isinstance(symbols, str):
+        symbols = symbols.replace(' ', '').split(',')
+    elif not isinstance(symbols, (list, tuple)):
+        return ()
+    bases = {symbol.upper() for symbol in symbols if isinstance(symbol, str) and symbol}
+    return tuple(sorted(bases, key=len, reverse=True))
+
+class ArticleFilter:
+    """Category and quote-currency filter compiled once from ``news_monitoring``."""
+
+    def __init__(self, categories, quote_currencies):
+        self.categories = frozenset(categories)
+        self.quote_currencies = frozenset(quote_currencies)
+        self.known_quotes = self.quote_currencies | frozenset(KNOWN_QUOTE_CURRENCIES)
+        # Longest first, so "BTCUSDT" resolves to USDT rather than USD
+        self.quote_suffixes = tuple(sorted(self.known_quotes, key=len, reverse=True))
+        self.pair_quotes = {}
+
+    @classmethod
+    def from_config(cls, config):
+        news_monitoring = config['news_monitoring']
+        return cls(news_monitoring['categories'], news_monitoring['quote_currencies'])
+
+    def pair_quote(self, pair, bases=()):
+        """Quote currency of ``pair``, or '' if it cannot be told.
+
+        A slash-less pair is split after the first of ``bases`` (the article's
+        symbols, longest first) it starts with, so "DOTUSD" of DOT is a USD
+        pair while "BTCFDUSD" of BTC is an FDUSD one. Without a matching base
+        the longest known quote it ends with is taken.
+        """
+        if bases:
+            normalized = pair.strip().upper()
+            if not any(separator in normalized for separator in PAIR_SEPARATORS):
+                for base in bases:
+                    quote = normalized[len(base):]
+                    if normalized.startswith(base) and quote in self.known_quotes:
+                        return quote
+        quote = self.pair_quotes.get(pair)
+        if quote is None:
+            quote = self._parse_pair_quote(pair)
+            if len(self.pair_quotes) >= MAX_INDEXED_PAIRS:
+                self.pair_quotes.clear()
+            self.pair_quotes[pair] = quote
+        return quote
 
-    logger.info(f"Filtering criteria - Categories: {categories}, Quote Currencies: {quote_currencies}")
+    def _parse_pair_quote(self, pair):
+        pair = pair.strip().upper()
+        for separator in PAIR_SEPARATORS:
+            if separator in pair:
+                # Drop settle currencies and contract suffixes ("XMR/USDT:USDT", "PEPE-USDT-SWAP")
+                quote = pair.split(separator, 1)[1]
+                for other in PAIR_SEPARATORS + (':',):
+                    quote = quote.split(other, 1)[0]
+                return quote
+        for suffix in self.quote_suffixes:
+            if pair.endswith(suffix) and len(pair) > len(suffix):
+                return suffix
+        return ''
+
+    def matches(self, article):
+        if self.categories and article['category'] not in self.categories:
+            return False
+
+        trading_pairs = article.get('trading_pairs')
+        if not trading_pairs or not self.quote_currencies:
+            return True  # If no trading pairs, only check category
+
+        bases = article_bases(article)
+        return any(self.pair_quote(pair, bases) in self.quote_currencies for pair in trading_pairs)
+
+    def filter(self, articles):
+        matches = self.matches
+        return [article for article in articles if matches(article)]
+
+# Every fleet can monitor its own categories and quote currencies; old
+# settings are dropped oldest first once there are more than this
+MAX_ARTICLE_FILTERS = 16
+_filters = {}
+
+def get_article_filter(config):
+    news_monitoring = config['news_monitoring']
+    key = (tuple(news_monitoring['categories']), tuple(news_monitoring['quote_currencies']))
+    article_filter = _filters.get(key)
+    if article_filter is None:
+        article_filter = ArticleFilter(*key)
+        if len(_filters) >= MAX_ARTICLE_FILTERS:
+            del _filters[next(iter(_filters))]
+        _filters[key] = article_filter
+    return article_filter
+
+def filter_news(news, config):
+    article_filter = get_article_filter(config)
 
-    def matches_criteria(article):
-        category_match = not categories or article['category'] in categories
-        
-        trading_pairs = article.get('trading_pairs', [])
-        if not trading_pairs:
-            return category_match  # If no trading pairs, only check category
-        
-        currency_match = not quote_currencies or any(currency in pair for pair in trading_pairs for currency in quote_currencies)
-        
-        return category_match and currency_match
+    logger.info(
+        f"Filtering criteria - Categories: {config['news_monitoring']['categories']}, "
+        f"Quote Currencies: {config['news_monitoring']['quote_currencies']}"
+    )
 
-    filtered_news = [article for article in all_news if matches_criteria(article)]
+    filtered_news = article_filter.filter(news['news'])
 
     for article in filtered_news:
         logger.info(f"Kept article: {article['title']} (Category: {article['category']})")
 
-    return filtered_news
\ No newline at end of file
+    return filtered_news
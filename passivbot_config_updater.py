@@ -1,7 +1,204 @@
 import json
 import os
+import re
 import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from logger import logger
+from metrics import CONFIG_WRITES, EXCLUSION_LAG_SECONDS, RESTARTS, time_stage
+from news_processor import extract_symbols
+from state_manager import parse_created_ms
+from tmux_manager import load_pane_targets, match_pane_targets, respawn_pane, run_command
+
+MAX_UPDATE_WORKERS = 8
+
+# Contract multipliers exchanges put in front of low-priced coins: 1000PEPE, 1000000MOG, 1MBABYDOGE
+MULTIPLIER_PREFIX = re.compile(r"^(?:10{2,}|1M)(?=[A-Z])")
+# Hyperliquid-style lowercase thousand prefix: kPEPE
+KILO_PREFIX = re.compile(r"^k(?=[A-Z])")
+
+
+def normalize_symbol(coin, quote_currency=None):
+    """Reduce a coin or market name to its bare base symbol.
+
+    Handles "PEPEUSDT", "PEPE/USDT:USDT", "PEPE-USDT-SWAP", "PEPE_USDT" as well
+    as multiplier prefixes, so "1000PEPEUSDT" and "kPEPE" both become "PEPE".
+    """
+    coin = KILO_PREFIX.sub("", coin.strip())
+    coin = coin.upper().split(":", 1)[0]
+    for separator in ("/", "-", "_"):
+        if separator in coin:
+            coin = coin.split(separator, 1)[0]
+            break
+    else:
+        if quote_currency and coin.endswith(quote_currency) and len(coin) > len(quote_currency):
+            coin = coin[: -len(quote_currency)]
+    return MULTIPLIER_PREFIX.sub("", coin)
+
+
+def build_coin_index(coins, quote_currency):
+    """Map normalized base symbols to the exact coin names listed in a config."""
+    index = {}
+    for coin in coins:
+        index.setdefault(normalize_symbol(coin, quote_currency), []).append(coin)
+    return index
+
+
+def expand_config_path(config_file_path):
+    return os.path.expanduser(os.path.expandvars(config_file_path))
+
+
+class CachedConfig:
+    def __init__(self, path, signature, config):
+        self.path = path
+        self.signature = signature
+        self.config = config
+        self.indexes = {}
+
+    def coin_indexes(self, quote_currency):
+        """Approved and ignored coin indexes of this file for ``quote_currency``."""
+        indexes = self.indexes.get(quote_currency)
+        if indexes is None:
+            live = self.config["live"]
+            indexes = (
+                build_coin_index(live["approved_coins"], quote_currency),
+                build_coin_index(live.get("ignored_coins", []), quote_currency),
+            )
+            self.indexes[quote_currency] = indexes
+        return indexes
+
+
+class PassivbotConfigCache:
+    """Parsed PassivBot configs kept in memory between cycles.
+
+    An entry is reused as long as the file's mtime, size and inode are
+    unchanged. The cache also maintains a reverse index from normalized coin
+    symbols to the files that approve or ignore them.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.approved_files = {}
+        self.ignored_files = {}
+        self.indexed = {}
+
+    @staticmethod
+    def signature(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self, path):
+        """Return the CachedConfig for ``path``, or None if the file is missing."""
+        try:
+            signature = self.signature(path)
+        except FileNotFoundError:
+            self.entries.pop(path, None)
+            return None
+        entry = self.entries.get(path)
+        if entry is None or entry.signature != signature:
+            with open(path, "r") as f:
+                entry = CachedConfig(path, signature, json.load(f))
+            self.entries[path] = entry
+        return entry
+
+    def store(self, path, config):
+        """Record a config this process just wrote to ``path``."""
+        self.entries[path] = CachedConfig(path, self.signature(path), config)
+
+    def _unindex(self, path):
+        entry, quote_currency = self.indexed.pop(path, (None, None))
+        if entry is None:
+            return
+        approved_index, ignored_index = entry.coin_indexes(quote_currency)
+        for reverse, index in ((self.approved_files, approved_index), (self.ignored_files, ignored_index)):
+            for base in index:
+                files = reverse.get(base)
+                if files is not None:
+                    files.discard(path)
+                    if not files:
+                        del reverse[base]
+
+    def refresh_index(self, quote_currencies):
+        """Bring the reverse index up to date for ``{path: quote_currency}``.
+
+        Other indexed files are kept, as they may belong to another fleet; see
+        prune_index for dropping files that are no longer configured.
+        """
+        for path, quote_currency in quote_currencies.items():
+            entry = self.get(path)
+            if self.indexed.get(path) == (entry, quote_currency):
+                continue
+            self._unindex(path)
+            if entry is None:
+                continue
+            approved_index, ignored_index = entry.coin_indexes(quote_currency)
+            for base in approved_index:
+                self.approved_files.setdefault(base, set()).add(path)
+            for base in ignored_index:
+                self.ignored_files.setdefault(base, set()).add(path)
+            self.indexed[path] = (entry, quote_currency)
+
+    def prune_index(self, paths):
+        """Drop the files that are not in ``paths`` from the reverse index."""
+        for path in [path for path in self.indexed if path not in paths]:
+            self._unindex(path)
+
+    def files_to_update(self, paths, symbols_to_exclude, exclusion_strategy):
+        """Subset of ``paths`` an exclusion of ``symbols_to_exclude`` would change."""
+        affected = set()
+        for symbol in symbols_to_exclude:
+            base = normalize_symbol(symbol)
+            if exclusion_strategy["remove_from_approved_coins"]:
+                affected.update(path for path in self.approved_files.get(base, ()) if path in paths)
+            if exclusion_strategy["add_to_ignored_coins"]:
+                ignoring = self.ignored_files.get(base, set())
+                affected.update(path for path in paths if path not in ignoring)
+        return affected
+
+
+_config_cache = PassivbotConfigCache()
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+def get_config_cache():
+    return _config_cache
+
+
+def file_lock(path):
+    with _file_locks_guard:
+        lock = _file_locks.get(path)
+        if lock is None:
+            lock = _file_locks[path] = threading.Lock()
+        return lock
+
+
+def write_json_atomic(path, data):
+    """Write ``data`` to ``path`` so readers see either the old or the new file.
+
+    The JSON goes to a temporary file in the same directory, is flushed to
+    disk and then renamed over the original with os.replace.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
 
 
 def determine_quote_currency(config_file_path, config):
@@ -11,8 +208,10 @@ def determine_quote_currency(config_file_path, config):
 
     # If not, try to derive it from the PassivBot config file
     try:
-        with open(config_file_path, "r") as f:
-            passivbot_config = json.load(f)
+        entry = get_config_cache().get(expand_config_path(config_file_path))
+        if entry is None:
+            raise FileNotFoundError(f"No such file: {config_file_path}")
+        passivbot_config = entry.config
 
         # Assume the first approved coin's suffix is the quote currency
         if passivbot_config["live"]["approved_coins"]:
@@ -33,143 +232,277 @@ def determine_quote_currency(config_file_path, config):
         return "USDT"
 
 
-def restart_passivbot_instances(config):
+def restart_changed_panes(config, changed_files, job=None):
+    """Respawn only the panes running ``changed_files``.
+
+    Returns False if the panes could not all be identified or restarted, in
+    which case the caller falls back to restarting the whole session.
+    """
+    tmuxp_config = config["passivbot"]["tmuxp"]
+    try:
+        targets = match_pane_targets(changed_files, load_pane_targets(tmuxp_config["tmux_config_file"]))
+    except Exception as e:
+        logger.error(f"Error reading tmuxp config {tmuxp_config['tmux_config_file']}: {str(e)}")
+        return False
+    if targets is None:
+        logger.info("Not every changed config file maps to a tmux pane")
+        return False
+
+    session_name = tmuxp_config["tmux_session_name"]
+    panes = set(targets.values())
+    try:
+        if len(panes) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_UPDATE_WORKERS, len(panes))) as executor:
+                list(executor.map(lambda target: respawn_pane(session_name, target, job), panes))
+        else:
+            for target in panes:
+                respawn_pane(session_name, target, job)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, IndexError, OSError) as e:
+        logger.error(f"Error restarting individual PassivBot panes: {str(e)}")
+        return False
+
+    logger.info(
+        f"Config Update: Restarted PassivBot instances for {', '.join(os.path.basename(f) for f in changed_files)}"
+    )
+    return True
+
+
+def restart_passivbot_instances(config, changed_files=None, job=None):
+    """Restart PassivBot after ``changed_files`` were updated.
+
+    Returns the config files whose instances were restarted: the changed ones
+    for a per-pane restart, every configured file for a session restart, and
+    an empty list if the restart failed. ``job`` (a RestartJob) bounds the
+    commands by its deadline and lets the restart be cancelled.
+    """
+    result = "failed"
+    try:
+        with time_stage("restart"):
+            restarted = _restart_passivbot_instances(config, changed_files, job)
+        if restarted:
+            result = "succeeded"
+        return restarted
+    finally:
+        RESTARTS.inc(label_value=result)
+
+
+def _restart_passivbot_instances(config, changed_files, job):
     tmuxp_config = config["passivbot"]["tmuxp"]
 
+    if changed_files and tmuxp_config.get("restart_scope", "pane") == "pane":
+        if restart_changed_panes(config, changed_files, job):
+            return list(changed_files)
+        logger.info("Falling back to restarting the whole PassivBot session")
+
     # Stop existing PassivBot instances
     try:
         logger.info(f"Executing stop command: {tmuxp_config['stop_command']}")
-        subprocess.run(tmuxp_config["stop_command"], shell=True, check=True)
+        run_command(tmuxp_config["stop_command"], job=job, shell=True)
         logger.info("Stopped existing PassivBot instances")
+    except subprocess.TimeoutExpired as e:
+        logger.error(f"Timed out stopping PassivBot instances: {str(e)}")
+        return []
     except subprocess.CalledProcessError as e:
         if "session not found" in str(e).lower():
             logger.info("No existing PassivBot session found to stop")
         else:
             logger.error(f"Error stopping PassivBot instances: {str(e)}")
-            return  # Exit the function if we can't stop existing instances
+            return []  # Exit the function if we can't stop existing instances
 
     # Start new PassivBot instances
     try:
         logger.info(
             f"Executing start command: {tmuxp_config['start_command']}"
         )
-        subprocess.run(tmuxp_config["start_command"], shell=True, check=True)
+        run_command(tmuxp_config["start_command"], job=job, shell=True)
         logger.info("Config Update: Successfully restarted PassivBot instances")
+    except subprocess.TimeoutExpired as e:
+        logger.error(f"Timed out starting PassivBot instances: {str(e)}")
+        return []
     except subprocess.CalledProcessError as e:
         error_message = f"Error restarting PassivBot instances: {str(e)}"
         logger.error(error_message)
+        return []
+
+    return [
+        expand_config_path(config_file["config_file"])
+        for config_file in config["passivbot"].get("passivbot_config_files", [])
+    ]
 
 
-def update_passivbot_configs(news_articles, config, symbols_to_exclude):
-    changes_made = False
+def update_passivbot_configs(news_articles, config, symbols_to_exclude, restart_scheduler=None):
+    cache = get_config_cache()
+    exclusion_strategy = config["passivbot"]["symbol_exclusion_strategy"]
+    quote_currencies = {}
     for config_file in config["passivbot"]["passivbot_config_files"]:
-        quote_currency = determine_quote_currency(config_file["config_file"], config)
-        if update_single_config(
-            config_file["config_file"],
-            symbols_to_exclude,
-            config["passivbot"]["symbol_exclusion_strategy"],
-            quote_currency,
-        ):
-            changes_made = True
-
-    if changes_made:
+        path = expand_config_path(config_file["config_file"])
+        if not os.path.exists(path):
+            logger.error(f"Config file does not exist: {path}")
+            continue
+        quote_currencies[path] = determine_quote_currency(path, config)
+
+    cache.refresh_index(quote_currencies)
+    affected = cache.files_to_update(quote_currencies, symbols_to_exclude, exclusion_strategy)
+    logger.info(
+        f"{len(affected)} of {len(quote_currencies)} PassivBot config files contain affected symbols"
+    )
+
+    def update(path):
+        return update_single_config(path, symbols_to_exclude, exclusion_strategy, quote_currencies[path])
+
+    paths = [path for path in quote_currencies if path in affected]
+    if len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(MAX_UPDATE_WORKERS, len(paths))) as executor:
+            results = list(executor.map(update, paths))
+    else:
+        results = [update(path) for path in paths]
+    changed_files = [path for path, changed in zip(paths, results) if changed]
+    applied_symbols = set().union(*results)
+    if applied_symbols:
+        # Only articles whose symbols actually changed a file count towards the lag
+        written_at = time.time()
+        for article in news_articles:
+            if "created" in article and extract_symbols(article, []) & applied_symbols:
+                EXCLUSION_LAG_SECONDS.observe(written_at - parse_created_ms(article["created"]) / 1000)
+
+    if changed_files and restart_scheduler is not None:
+        logger.info(
+            "Changes were made to PassivBot configurations. Scheduling restart..."
+        )
+        restart_scheduler.request(changed_files)
+    elif changed_files:
         logger.info(
             "Changes were made to PassivBot configurations. Restarting instances..."
         )
-        restart_passivbot_instances(config)
+        restarted = restart_passivbot_instances(config, changed_files)
+        not_restarted = sorted(set(changed_files) - set(restarted))
+        if not_restarted:
+            # The files are already updated, so a later run will not restart them either
+            logger.error(
+                f"PassivBot instances of {', '.join(not_restarted)} were not restarted "
+                "and still trade the excluded symbols; restart them manually"
+            )
     else:
         logger.info(
             "No changes were made to PassivBot configurations. Skipping restart."
         )
+    return changed_files
 
 
 def update_single_config(
     config_file_path, symbols_to_exclude, exclusion_strategy, quote_currency
 ):
+    """Exclude ``symbols_to_exclude`` from one config file.
+
+    Returns the symbols that changed the file, an empty set if none did.
+    """
     try:
-        config_file_path = os.path.expanduser(os.path.expandvars(config_file_path))
+        config_file_path = expand_config_path(config_file_path)
 
         logger.info(f"Attempting to update config file: {config_file_path}")
 
-        if not os.path.exists(config_file_path):
-            logger.error(f"Config file does not exist: {config_file_path}")
-            return False
+        with time_stage("config_update"), file_lock(config_file_path):
+            changed = _update_config_file(
+                config_file_path, symbols_to_exclude, exclusion_strategy, quote_currency
+            )
+        if changed:
+            CONFIG_WRITES.inc()
+        return changed
+    except Exception as e:
+        logger.error(
+            f"Error updating PassivBot config file {config_file_path}: {str(e)}"
+        )
+        return set()
+
 
-        with open(config_file_path, "r") as f:
-            passivbot_config = json.load(f)
+def _update_config_file(config_file_path, symbols_to_exclude, exclusion_strategy, quote_currency):
+    cache = get_config_cache()
+    entry = cache.get(config_file_path)
+    if entry is None:
+        logger.error(f"Config file does not exist: {config_file_path}")
+        return set()
 
-        original_config = json.dumps(passivbot_config)
+    # Work on a copy of the sections we modify so the cached config stays
+    # identical to the file if writing fails
+    passivbot_config = dict(entry.config)
+    passivbot_config["live"] = dict(entry.config["live"])
+    if "ignored_coins" in passivbot_config["live"]:
+        passivbot_config["live"]["ignored_coins"] = list(passivbot_config["live"]["ignored_coins"])
 
-        logger.info(f"Symbols to exclude: {', '.join(symbols_to_exclude)}")
-        logger.info(
-            f"Current approved_coins: {', '.join(passivbot_config['live']['approved_coins'])}"
-        )
-        logger.info(
-            f"Current ignored_coins: {', '.join(passivbot_config['live'].get('ignored_coins', []))}"
-        )
+    logger.info(f"Symbols to exclude: {', '.join(symbols_to_exclude)}")
+    logger.info(
+        f"Current approved_coins: {', '.join(passivbot_config['live']['approved_coins'])}"
+    )
+    logger.info(
+        f"Current ignored_coins: {', '.join(passivbot_config['live'].get('ignored_coins', []))}"
+    )
+
+    removed_coins = set()
+    added_to_ignored = set()
+    applied_symbols = set()
+
+    logger.info(f"Using quote currency: {quote_currency}")
 
-        removed_coins = set()
-        added_to_ignored = set()
-
-        logger.info(f"Using quote currency: {quote_currency}")
-
-        if exclusion_strategy["remove_from_approved_coins"]:
-            original_approved_coins = set(passivbot_config["live"]["approved_coins"])
-            for coin in original_approved_coins:
-                base_currency = coin.rstrip(quote_currency)
-                if base_currency in symbols_to_exclude:
-                    passivbot_config["live"]["approved_coins"].remove(coin)
-                    removed_coins.add(coin)
-                    logger.info(
-                        f"Removing {coin} from approved_coins (matches {base_currency})"
-                    )
-
-        if exclusion_strategy["add_to_ignored_coins"]:
-            if "ignored_coins" not in passivbot_config["live"]:
-                passivbot_config["live"]["ignored_coins"] = []
-
-            for symbol in symbols_to_exclude:
-                coin = f"{symbol}{quote_currency}"
-                if coin not in passivbot_config["live"]["ignored_coins"]:
-                    passivbot_config["live"]["ignored_coins"].append(coin)
-                    added_to_ignored.add(coin)
-                    logger.info(f"Adding {coin} to ignored_coins (matches {symbol})")
+    approved_index, ignored_index = entry.coin_indexes(quote_currency)
+    excluded_symbols = {normalize_symbol(symbol): symbol for symbol in symbols_to_exclude}
 
+    if exclusion_strategy["remove_from_approved_coins"]:
+        for base_currency, symbol in excluded_symbols.items():
+            for coin in approved_index.get(base_currency, []):
+                removed_coins.add(coin)
+                applied_symbols.add(symbol)
+                logger.info(
+                    f"Removing {coin} from approved_coins (matches {symbol})"
+                )
         if removed_coins:
-            logger.info(
-                f"Config Update: Removed from approved_coins in {os.path.basename(config_file_path)}: {', '.join(removed_coins)}"
-            )
-        else:
-            logger.info(
-                f"No coins removed from approved_coins in {os.path.basename(config_file_path)}"
-            )
+            passivbot_config["live"]["approved_coins"] = [
+                coin for coin in passivbot_config["live"]["approved_coins"]
+                if coin not in removed_coins
+            ]
 
-        if added_to_ignored:
-            logger.info(
-                f"Config Update: Added to ignored_coins in {os.path.basename(config_file_path)}: {', '.join(added_to_ignored)}"
-            )
-        else:
-            logger.info(
-                f"No coins added to ignored_coins in {os.path.basename(config_file_path)}"
-            )
+    if exclusion_strategy["add_to_ignored_coins"]:
+        if "ignored_coins" not in passivbot_config["live"]:
+            passivbot_config["live"]["ignored_coins"] = []
 
-        if json.dumps(passivbot_config) != original_config:
-            with open(config_file_path, "w") as f:
-                json.dump(passivbot_config, f, indent=4)
-            logger.info(f"Updated PassivBot config file: {config_file_path}")
-            logger.info(
-                f"Final approved_coins: {', '.join(passivbot_config['live']['approved_coins'])}"
-            )
-            logger.info(
-                f"Final ignored_coins: {', '.join(passivbot_config['live'].get('ignored_coins', []))}"
-            )
-            return True
-        else:
-            logger.info(f"No changes were necessary for {config_file_path}")
-            return False
+        for base_currency, symbol in excluded_symbols.items():
+            if base_currency in ignored_index:
+                continue
+            # Reuse the exact market names of the approved list, e.g. 1000PEPEUSDT
+            for coin in approved_index.get(base_currency, [f"{symbol}{quote_currency}"]):
+                passivbot_config["live"]["ignored_coins"].append(coin)
+                added_to_ignored.add(coin)
+                applied_symbols.add(symbol)
+                logger.info(f"Adding {coin} to ignored_coins (matches {symbol})")
 
-    except Exception as e:
-        logger.error(
-            f"Error updating PassivBot config file {config_file_path}: {str(e)}"
+    if removed_coins:
+        logger.info(
+            f"Config Update: Removed from approved_coins in {os.path.basename(config_file_path)}: {', '.join(removed_coins)}"
         )
-        return False
+    else:
+        logger.info(
+            f"No coins removed from approved_coins in {os.path.basename(config_file_path)}"
+        )
+
+    if added_to_ignored:
+        logger.info(
+            f"Config Update: Added to ignored_coins in {os.path.basename(config_file_path)}: {', '.join(added_to_ignored)}"
+        )
+    else:
+        logger.info(
+            f"No coins added to ignored_coins in {os.path.basename(config_file_path)}"
+        )
+
+    if removed_coins or added_to_ignored:
+        write_json_atomic(config_file_path, passivbot_config)
+        cache.store(config_file_path, passivbot_config)
+        logger.info(f"Updated PassivBot config file: {config_file_path}")
+        logger.info(
+            f"Final approved_coins: {', '.join(passivbot_config['live']['approved_coins'])}"
+        )
+        logger.info(
+            f"Final ignored_coins: {', '.join(passivbot_config['live'].get('ignored_coins', []))}"
+        )
+        return applied_symbols
+    else:
+        logger.info(f"No changes were necessary for {config_file_path}")
+        return set()
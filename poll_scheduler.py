@@ -0,0 +1,124 @@
+import math
+import time
+from state_manager import parse_created_ms
+
+DEFAULT_SCRAPE_INTERVAL = 600
+# How long after the expected scrape to poll, giving it time to publish
+SCRAPE_PUBLISH_DELAY = 30
+# Observations needed, and how tightly they must cluster, before polls are aligned
+MIN_PHASE_SAMPLES = 5
+MIN_PHASE_CONFIDENCE = 0.6
+# Weight kept by older observations for every new one
+PHASE_DECAY = 0.98
+BACKOFF_FACTOR = 2
+
+
+class PollScheduler:
+    """Decides when to poll the feed next.
+
+    Learns the upstream scrape phase from the ``created`` timestamps of new
+    articles (a circular mean of their offsets within ``scrape_interval``) and,
+    once the phase is clear, polls shortly after each expected scrape instead
+    of at an arbitrary point in the cycle. The poll interval drops to
+    ``min_interval`` while new articles keep arriving and grows back towards
+    ``max_interval`` while the feed is quiet.
+    """
+
+    def __init__(
+        self,
+        interval,
+        min_interval=None,
+        max_interval=None,
+        scrape_interval=DEFAULT_SCRAPE_INTERVAL,
+        adaptive=True,
+        clock=time.time,
+    ):
+        self.clock = clock
+        self.phase_x = 0.0
+        self.phase_y = 0.0
+        self.phase_weight = 0.0
+        self.samples = 0
+        self.interval = interval
+        self.configure(interval, min_interval, max_interval, scrape_interval, adaptive)
+        self.next_poll_at = None
+
+    @classmethod
+    def from_config(cls, config):
+        scheduler = cls(config["check_interval"])
+        scheduler.reconfigure(config)
+        return scheduler
+
+    def configure(
+        self, interval, min_interval=None, max_interval=None, scrape_interval=DEFAULT_SCRAPE_INTERVAL, adaptive=True
+    ):
+        # By default polls speed up to twice as often after news, and never
+        # slow down past the configured interval
+        self.base_interval = interval
+        self.min_interval = min(interval / 2 if min_interval is None else min_interval, interval)
+        self.max_interval = max(interval if max_interval is None else max_interval, interval)
+        self.scrape_interval = scrape_interval
+        self.adaptive = adaptive
+        if adaptive:
+            self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+        else:
+            self.interval = interval
+
+    def reconfigure(self, config):
+        """Apply the polling settings of a (reloaded) config, keeping what was learned."""
+        self.configure(
+            config["check_interval"],
+            min_interval=config.get("poll_min_interval"),
+            max_interval=config.get("poll_max_interval"),
+            scrape_interval=config.get("scrape_interval", DEFAULT_SCRAPE_INTERVAL),
+            adaptive=config.get("adaptive_polling", True),
+        )
+
+    def observe(self, new_articles):
+        """Record the outcome of a poll: the articles it found that were new."""
+        for article in new_articles:
+            try:
+                created = parse_created_ms(article["created"]) / 1000
+            except (KeyError, TypeError, ValueError):
+                continue
+            angle = 2 * math.pi * (created % self.scrape_interval) / self.scrape_interval
+            self.phase_x = self.phase_x * PHASE_DECAY + math.cos(angle)
+            self.phase_y = self.phase_y * PHASE_DECAY + math.sin(angle)
+            self.phase_weight = self.phase_weight * PHASE_DECAY + 1
+            self.samples += 1
+
+        if not self.adaptive:
+            self.interval = self.base_interval
+        elif new_articles:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * BACKOFF_FACTOR, self.max_interval)
+
+    def phase(self):
+        """Offset of the scrapes within ``scrape_interval`` in seconds, or None if unclear."""
+        if not self.adaptive or self.samples < MIN_PHASE_SAMPLES:
+            return None
+        if math.hypot(self.phase_x, self.phase_y) / self.phase_weight < MIN_PHASE_CONFIDENCE:
+            return None
+        angle = math.atan2(self.phase_y, self.phase_x) % (2 * math.pi)
+        return angle / (2 * math.pi) * self.scrape_interval
+
+    def schedule_next(self, now=None):
+        """Pick the time of the next poll after one that just ran, and return it."""
+        now = self.clock() if now is None else now
+        target = now + self.interval
+        phase = self.phase()
+        if phase is not None and self.interval >= self.scrape_interval:
+            # Move to the expected scrape nearest the target, at most half a
+            # scrape interval either way, so the request rate stays the same
+            slot = phase + SCRAPE_PUBLISH_DELAY
+            target = slot + round((target - slot) / self.scrape_interval) * self.scrape_interval
+            if target <= now:
+                target += self.scrape_interval
+        self.next_poll_at = target
+        return target
+
+    def seconds_until_due(self, now=None):
+        now = self.clock() if now is None else now
+        if self.next_poll_at is None:
+            return 0
+        return max(self.next_poll_at - now, 0)
@@ -0,0 +1,160 @@
+import hmac
+import json
+import os
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from article import Article
+from logger import logger
+
+DEFAULT_PUSH_HOST = "127.0.0.1"
+DEFAULT_PUSH_PATH = "/news"
+MAX_PUSH_BODY = 1024 * 1024
+# Fields the pipeline reads from every article
+REQUIRED_ARTICLE_FIELDS = ("created", "title", "category", "symbols", "link")
+
+
+def _is_string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+# Types the pipeline can handle, checked so a bad article is rejected up front
+ARTICLE_FIELD_TYPES = {
+    "created": lambda value: isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool)),
+    "category": lambda value: isinstance(value, str),
+    "symbols": lambda value: isinstance(value, str) or _is_string_list(value),
+    "trading_pairs": _is_string_list,
+}
+
+
+def parse_pushed_articles(payload):
+    """Articles from a pushed payload: ``{"news": [...]}``, a list or one article."""
+    if isinstance(payload, dict) and "news" in payload:
+        payload = payload["news"]
+    articles = payload if isinstance(payload, list) else [payload]
+    for article in articles:
+        if not isinstance(article, dict):
+            raise ValueError("articles must be JSON objects")
+        missing = [field for field in REQUIRED_ARTICLE_FIELDS if field not in article]
+        if missing:
+            raise ValueError(f"article is missing {', '.join(missing)}")
+        invalid = [
+            field for field, valid in ARTICLE_FIELD_TYPES.items() if field in article and not valid(article[field])
+        ]
+        if invalid:
+            raise ValueError(f"article has invalid {', '.join(invalid)}")
+    return [Article.from_dict(article) for article in articles]
+
+
+class PushRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        listener = self.server.listener
+        if self.path.split("?", 1)[0] != listener.path:
+            return self.reply(404, {"error": "not found"})
+        if not listener.authorized(self.headers):
+            return self.reply(401, {"error": "invalid token"})
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self.reply(400, {"error": "invalid Content-Length"})
+        if length > MAX_PUSH_BODY:
+            return self.reply(413, {"error": "payload too large"})
+        try:
+            articles = parse_pushed_articles(json.loads(self.rfile.read(length)))
+        except (ValueError, TypeError) as e:
+            return self.reply(400, {"error": str(e)})
+
+        listener.push(articles)
+        self.reply(202, {"accepted": len(articles)})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PushListener:
+    """Local HTTP endpoint that news can be pushed to instead of waiting for a poll.
+
+    Accepts POSTs of ``{"news": [...]}``, a list of articles or a single
+    article on ``path``. Articles are queued for the main loop, which can wait
+    on ``fileno()`` to wake up as soon as something arrives. With ``token`` set,
+    requests must send it as ``Authorization: Bearer <token>``.
+    """
+
+    def __init__(self, host=DEFAULT_PUSH_HOST, port=0, path=DEFAULT_PUSH_PATH, token=None):
+        self.path = path
+        self.token = token
+        self.articles = queue.Queue()
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        self.server = ThreadingHTTPServer((host, port), PushRequestHandler)
+        self.server.daemon_threads = True
+        self.server.listener = self
+        self.thread = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Listener for the ``push`` section of the config, or None if push is off."""
+        push_config = config.get("push")
+        if not push_config:
+            return None
+        return cls(
+            host=push_config.get("host", DEFAULT_PUSH_HOST),
+            port=push_config["port"],
+            path=push_config.get("path", DEFAULT_PUSH_PATH),
+            token=push_config.get("token"),
+        )
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="push-listener", daemon=True)
+        self.thread.start()
+        logger.info(f"Listening for pushed news on {self.address}")
+
+    def authorized(self, headers):
+        if not self.token:
+            return True
+        return hmac.compare_digest(headers.get("Authorization", ""), f"Bearer {self.token}")
+
+    def push(self, articles):
+        self.articles.put(articles)
+        os.write(self._wake_write, b"\0")
+
+    def fileno(self):
+        return self._wake_read
+
+    def drain(self):
+        """All articles pushed since the last call as ``{"news": [...]}``, or None."""
+        try:
+            while os.read(self._wake_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        articles = []
+        while True:
+            try:
+                articles.extend(self.articles.get_nowait())
+            except queue.Empty:
+                break
+        return {"news": articles} if articles else None
+
+    def close(self):
+        if self.thread is not None:
+            self.server.shutdown()
+        self.server.server_close()
+        os.close(self._wake_read)
+        os.close(self._wake_write)
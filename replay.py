@@ -0,0 +1,238 @@
+"""Replay recorded news through the pipeline against scratch copies of the configs.
+
+    python replay.py archive.jsonl [more archives or directories] [--speed 600]
+
+Archives are feed snapshots (``{"news": [...]}`` or a list of articles, as
+.json files or one per line in .jsonl files) or JSONL files with one article
+per line. Articles that are not grouped into snapshots are delivered in
+batches of ``--interval`` seconds of ``created`` time, as polling would have
+seen them. Restarts are recorded, never executed, and the real configs and
+processed-article state are left untouched.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from article import decode_article
+from config import load_and_validate_config
+from fleets import fleet_configs
+from logger import logger, setup_logger
+from main import EXIT_CONFIG_ERROR, EXIT_OK, process_fleets
+from metrics import ARTICLES
+from passivbot_config_updater import expand_config_path
+from state_manager import ProcessedArticleStore, parse_created_ms
+
+DEFAULT_REPLAY_INTERVAL = 600
+
+
+class RecordedRestarts:
+    """Restart scheduler stand-in that only records what would be restarted."""
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, changed_files):
+        self.requests.append(list(changed_files))
+
+
+def archive_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith((".json", ".jsonl"))
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def snapshot_articles(record):
+    """Articles of a snapshot record, or None if the record is a single article."""
+    if isinstance(record, dict) and isinstance(record.get("news"), list):
+        return record["news"]
+    if isinstance(record, list):
+        return record
+    return None
+
+
+def read_archive(path):
+    """Yield ('snapshot', articles) and ('article', article) records from ``path``."""
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line, object_hook=decode_article)
+                    articles = snapshot_articles(record)
+                    yield ("article", record) if articles is None else ("snapshot", articles)
+        else:
+            record = json.load(f, object_hook=decode_article)
+            articles = snapshot_articles(record)
+            yield ("article", record) if articles is None else ("snapshot", articles)
+
+
+def load_batches(paths, interval=DEFAULT_REPLAY_INTERVAL):
+    """Group the archives into the batches a poll would have returned, oldest first.
+
+    Returns a list of (time, articles) where time is in epoch seconds.
+    """
+    batches = []
+    loose = []
+    for path in archive_files(paths):
+        for kind, record in read_archive(path):
+            if kind == "snapshot":
+                created = [parse_created_ms(article["created"]) / 1000 for article in record]
+                batches.append((max(created, default=0), record))
+            else:
+                loose.append((parse_created_ms(record["created"]) / 1000, record))
+
+    loose.sort(key=lambda item: item[0])
+    window_end, window = None, []
+    for created, article in loose:
+        if window and created > window_end:
+            batches.append((window_end, window))
+            window = []
+        if not window:
+            window_end = created - created % interval + interval
+        window.append(article)
+    if window:
+        batches.append((window_end, window))
+
+    batches.sort(key=lambda batch: batch[0])
+    return batches
+
+
+def scratch_config(config, scratch_dir):
+    """Copy of ``config`` whose PassivBot config files are copies in ``scratch_dir``.
+
+    Returns the config and a mapping of scratch path to original path.
+    """
+    config = json.loads(json.dumps(config))
+    passivbot_configs = [fleet["passivbot"] for fleet in config.get("fleets", [])] or [config["passivbot"]]
+    originals = {}
+    entries = [entry for passivbot_config in passivbot_configs for entry in passivbot_config["passivbot_config_files"]]
+    for i, entry in enumerate(entries):
+        original = expand_config_path(entry["config_file"])
+        copy = os.path.join(scratch_dir, f"{i:03d}_{os.path.basename(original)}")
+        if os.path.exists(original):
+            shutil.copyfile(original, copy)
+        entry["config_file"] = copy
+        originals[copy] = original
+    return config, originals
+
+
+def coin_changes(original, replayed):
+    with open(original, "r") as f:
+        before = json.load(f)["live"]
+    with open(replayed, "r") as f:
+        after = json.load(f)["live"]
+    return {
+        "removed_from_approved_coins": sorted(set(before.get("approved_coins", [])) - set(after.get("approved_coins", []))),
+        "added_to_ignored_coins": sorted(set(after.get("ignored_coins", [])) - set(before.get("ignored_coins", []))),
+    }
+
+
+def replay(batches, config, speed=None, scratch_dir=None):
+    """Run ``batches`` through the pipeline and return a report.
+
+    ``speed`` is the speed-up over the recorded timeline (600 replays ten
+    minutes of news per second); None replays as fast as possible.
+    """
+    owns_scratch = scratch_dir is None
+    scratch_dir = scratch_dir or tempfile.mkdtemp(prefix="symbolscout-replay-")
+    try:
+        replay_config, originals = scratch_config(config, scratch_dir)
+        stores = {
+            name: ProcessedArticleStore(os.path.join(scratch_dir, f"processed_articles_{i}.db"), legacy_state_file=None)
+            for i, (name, _) in enumerate(fleet_configs(replay_config))
+        }
+        restarts = RecordedRestarts()
+        articles = 0
+        new_before, kept_before = ARTICLES.value("new"), ARTICLES.value("kept")
+
+        started = time.perf_counter()
+        for i, (batch_time, batch) in enumerate(batches):
+            if speed and i:
+                time.sleep(max(batch_time - batches[i - 1][0], 0) / speed)
+            articles += len(batch)
+            process_fleets({"news": batch}, replay_config, stores, restarts)
+        elapsed = time.perf_counter() - started
+        for store in stores.values():
+            store.close()
+
+        exclusions = {}
+        for replayed, original in originals.items():
+            if os.path.exists(original):
+                changes = coin_changes(original, replayed)
+                if any(changes.values()):
+                    exclusions[original] = changes
+        restarted = sorted({originals[path] for request in restarts.requests for path in request})
+        return {
+            "batches": len(batches),
+            "articles": articles,
+            "new_articles": ARTICLES.value("new") - new_before,
+            "matching_articles": ARTICLES.value("kept") - kept_before,
+            "elapsed_seconds": round(elapsed, 3),
+            "articles_per_second": round(articles / elapsed, 1) if elapsed else None,
+            "exclusions": exclusions,
+            "restart_requests": len(restarts.requests),
+            "restarted_configs": restarted,
+        }
+    finally:
+        if owns_scratch:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def print_report(report):
+    print(
+        f"Replayed {report['articles']} articles in {report['batches']} batches "
+        f"in {report['elapsed_seconds']:.2f}s ({report['articles_per_second'] or 0:.0f} articles/s), "
+        f"{report['new_articles']} new, {report['matching_articles']} matching the monitored categories"
+    )
+    if not report["exclusions"]:
+        print("No exclusions would have been made")
+    for path, changes in report["exclusions"].items():
+        print(f"{path}:")
+        if changes["removed_from_approved_coins"]:
+            print(f"  removed from approved_coins: {', '.join(changes['removed_from_approved_coins'])}")
+        if changes["added_to_ignored_coins"]:
+            print(f"  added to ignored_coins: {', '.join(changes['added_to_ignored_coins'])}")
+    print(f"{report['restart_requests']} restarts would have been requested")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archives", nargs="+", help="archive files or directories of archives")
+    parser.add_argument("--config", default="config.local.yml", help="sentinel config (falls back to config.yml)")
+    parser.add_argument("--speed", type=float, help="speed-up over the recorded timeline (default: as fast as possible)")
+    parser.add_argument(
+        "--interval", type=int, default=DEFAULT_REPLAY_INTERVAL,
+        help="seconds of news per batch for archives of loose articles",
+    )
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="log every pipeline step")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_and_validate_config(args.config)
+    except ValueError:
+        return EXIT_CONFIG_ERROR
+    if args.verbose:
+        setup_logger({key: value for key, value in config.items() if key != "notifications"})
+
+    batches = load_batches(args.archives, args.interval)
+    logger.info(f"Loaded {len(batches)} batches from {len(archive_files(args.archives))} archives")
+    report = replay(batches, config, speed=args.speed)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
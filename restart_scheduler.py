@@ -0,0 +1,351 @@
+import itertools
+import queue
+import subprocess
+import threading
+import time
+from fleets import fleet_configs
+from logger import logger
+from tmux_manager import RestartCancelled, kill_process_group
+
+DEFAULT_RESTART_TIMEOUT = 300
+# Least time before a restart that failed or timed out is tried again
+RESTART_RETRY_SECONDS = 60
+MAX_JOB_HISTORY = 100
+
+
+class RestartJob:
+    """A restart handed to the RestartExecutor, with its status and deadline."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    TIMED_OUT = "timed_out"
+    CANCELLED = "cancelled"
+
+    _ids = itertools.count(1)
+
+    def __init__(self, config, changed_files, timeout):
+        self.id = next(self._ids)
+        self.config = config
+        self.changed_files = list(changed_files)
+        self.timeout = timeout
+        self.status = self.QUEUED
+        self.restarted_files = []
+        self.deadline = None
+        self.started_at = None
+        self.finished_at = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        if self.deadline is None:
+            return self.timeout
+        return max(self.deadline - time.monotonic(), 0)
+
+    def attach(self, process):
+        with self._lock:
+            self._processes.add(process)
+
+    def detach(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+    def cancel(self):
+        """Cancel the job, killing any command it is currently running."""
+        self.cancelled.set()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            kill_process_group(process)
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+class RestartExecutor:
+    """Runs restarts one at a time on a background worker thread.
+
+    ``restart_func(config, changed_files, job)`` is given the job so every
+    command it runs is bounded by the job's deadline and can be killed by
+    cancelling it. The caller's thread never waits on the process manager.
+    """
+
+    def __init__(self, restart_func, timeout=DEFAULT_RESTART_TIMEOUT):
+        self.restart_func = restart_func
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.current = None
+        self.history = []
+        self.worker = threading.Thread(target=self._work, name="passivbot-restart", daemon=True)
+        self.worker.start()
+
+    def submit(self, config, changed_files, callback=None):
+        job = RestartJob(config, changed_files, self.timeout)
+        logger.info(f"Queued restart #{job.id} for {len(job.changed_files)} PassivBot instances")
+        self.queue.put((job, callback))
+        return job
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            job, callback = item
+            self._run(job)
+            if callback is not None:
+                try:
+                    callback(job)
+                except Exception as e:
+                    logger.error(f"Error in restart callback: {str(e)}")
+
+    def _run(self, job):
+        with self.lock:
+            self.current = job
+        job.started_at = time.monotonic()
+        job.deadline = job.started_at + job.timeout
+        try:
+            if job.cancelled.is_set():
+                raise RestartCancelled()
+            job.status = RestartJob.RUNNING
+            job.restarted_files = self.restart_func(job.config, job.changed_files, job) or []
+            if job.restarted_files:
+                job.status = RestartJob.SUCCEEDED
+            else:
+                # restart_func reports a command that ran out of time as a failed restart
+                job.status = RestartJob.TIMED_OUT if job.remaining() == 0 else RestartJob.FAILED
+        except RestartCancelled:
+            job.status = RestartJob.CANCELLED
+            logger.error(f"Restart #{job.id} was cancelled")
+        except subprocess.TimeoutExpired as e:
+            job.status = RestartJob.TIMED_OUT
+            logger.error(f"Restart #{job.id} timed out after {job.timeout} seconds: {str(e)}")
+        except Exception as e:
+            job.status = RestartJob.FAILED
+            logger.error(f"Restart #{job.id} failed: {str(e)}")
+        finally:
+            job.finished_at = time.monotonic()
+            with self.lock:
+                self.current = None
+                self.history.append(job)
+                del self.history[:-MAX_JOB_HISTORY]
+            job.done.set()
+
+    def cancel(self):
+        """Cancel the running restart and everything still queued."""
+        with self.lock:
+            jobs = [self.current] if self.current is not None else []
+        jobs.extend(job for job, _ in list(self.queue.queue) if job is not None)
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def status(self):
+        with self.lock:
+            current = self.current
+            counts = {}
+            for job in self.history:
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "running": None if current is None else current.id,
+            "queued": self.queue.qsize(),
+            "finished": counts,
+        }
+
+    def shutdown(self, wait=True):
+        """Stop the worker after the restarts already queued have run."""
+        self.queue.put(None)
+        if wait:
+            self.worker.join()
+
+
+
+class RestartScheduler:
+    """Coalesces PassivBot restarts requested over several cycles.
+
+    Changed config files are collected for ``debounce_seconds`` after the first
+    request and then restarted together. An instance (config file) is not
+    restarted again within ``min_interval_seconds`` of its previous restart;
+    it stays pending until the interval has passed. An instance whose restart
+    failed or timed out goes back to pending, as its config file was already
+    updated, and is retried after the minimum interval or RESTART_RETRY_SECONDS,
+    whichever is longer.
+    """
+
+    def __init__(
+        self, restart_func, debounce_seconds=0, min_interval_seconds=0, clock=time.monotonic, executor=None
+    ):
+        self.restart_func = restart_func
+        self.executor = executor
+        self.debounce_seconds = debounce_seconds
+        self.min_interval_seconds = min_interval_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.in_flight = set()
+        self.last_restart = {}
+        self.retry_at = {}
+        self.requested_count = 0
+        self.executed_count = 0
+        self.failed_count = 0
+
+    @classmethod
+    def from_config(cls, restart_func, config, executor=None):
+        scheduler = cls(restart_func, executor=executor)
+        scheduler.reconfigure(config)
+        return scheduler
+
+    def reconfigure(self, config):
+        """Apply the restart settings of a (reloaded) config; pending restarts are kept."""
+        passivbot_config = config["passivbot"]
+        with self.lock:
+            self.debounce_seconds = passivbot_config.get("restart_debounce_seconds", 0)
+            self.min_interval_seconds = passivbot_config.get("restart_min_interval_seconds", 0)
+        if self.executor is not None:
+            self.executor.timeout = passivbot_config.get("restart_timeout_seconds", DEFAULT_RESTART_TIMEOUT)
+
+    def request(self, changed_files):
+        now = self.clock()
+        with self.lock:
+            for path in changed_files:
+                self.pending.setdefault(path, now)
+                self.requested_count += 1
+        if changed_files:
+            logger.info(
+                f"Restart requested for {len(changed_files)} PassivBot instances ({len(self.pending)} pending)"
+            )
+
+    def _due_at(self, path):
+        return max(
+            self.last_restart.get(path, float("-inf")) + self.min_interval_seconds,
+            self.retry_at.get(path, float("-inf")),
+        )
+
+    def _ready(self, now):
+        if not self.pending or now - min(self.pending.values()) < self.debounce_seconds:
+            return []
+        return [path for path in self.pending if path not in self.in_flight and now >= self._due_at(path)]
+
+    def seconds_until_due(self):
+        """Seconds until pending restarts may run, or None if nothing is pending.
+
+        Instances that are still being restarted are left out: they cannot run
+        again before their restart finishes, however overdue they are.
+        """
+        now = self.clock()
+        with self.lock:
+            waiting = [path for path in self.pending if path not in self.in_flight]
+            if not waiting:
+                return None
+            window_due = min(self.pending.values()) + self.debounce_seconds
+            instance_due = min(self._due_at(path) for path in waiting)
+            return max(max(window_due, instance_due) - now, 0)
+
+    def run_due(self, config):
+        """Restart the pending instances that are due.
+
+        Without an executor the restart runs inline and the restarted files are
+        returned. With one, the restart is submitted to it and the submitted
+        files are returned right away.
+        """
+        now = self.clock()
+        with self.lock:
+            ready = self._ready(now)
+            for path in ready:
+                del self.pending[path]
+        if not ready:
+            return []
+
+        if self.executor is not None:
+            with self.lock:
+                self.in_flight.update(ready)
+            self.executor.submit(config, ready, callback=self._finished)
+            return ready
+
+        restarted = self.restart_func(config, ready) or []
+        self._record(ready, restarted)
+        return restarted
+
+    def _finished(self, job):
+        self._record(job.changed_files, job.restarted_files)
+
+    def _record(self, submitted, restarted):
+        now = self.clock()
+        failed = set(submitted) - set(restarted)
+        with self.lock:
+            self.in_flight.difference_update(submitted)
+            for path in restarted:
+                self.last_restart[path] = now
+                self.retry_at.pop(path, None)
+            for path in failed:
+                self.pending.setdefault(path, now)
+                self.retry_at[path] = now + max(self.min_interval_seconds, RESTART_RETRY_SECONDS)
+            if failed:
+                self.failed_count += 1
+            else:
+                self.executed_count += 1
+        if failed:
+            logger.error(f"Restart of {len(failed)} PassivBot instances did not complete, retrying later")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending": len(self.pending),
+                "in_flight": len(self.in_flight),
+                "requested": self.requested_count,
+                "executed": self.executed_count,
+                "failed": self.failed_count,
+            }
+
+
+class FleetRestartSchedulers(dict):
+    """A RestartScheduler per fleet, by fleet name, used like a single scheduler.
+
+    Every fleet gets its own RestartExecutor, so a slow or hung process manager
+    of one fleet never holds up the restarts of another.
+    """
+
+    def __init__(self, restart_func, config):
+        super().__init__()
+        self.restart_func = restart_func
+        self.reconfigure(config)
+
+    def reconfigure(self, config):
+        """Apply a (reloaded) config: new fleets are added, removed ones dropped."""
+        fleets = dict(fleet_configs(config))
+        for name in [name for name in self if name not in fleets]:
+            scheduler = self.pop(name)
+            scheduler.executor.shutdown(wait=False)
+            logger.info(f"Fleet {name} was removed, dropping its {scheduler.stats()['pending']} pending restarts")
+        for name, fleet_config in fleets.items():
+            if name in self:
+                self[name].reconfigure(fleet_config)
+            else:
+                executor = RestartExecutor(self.restart_func)
+                self[name] = RestartScheduler.from_config(self.restart_func, fleet_config, executor=executor)
+
+    def run_due(self, config):
+        started = []
+        for name, fleet_config in fleet_configs(config):
+            if name in self:
+                started.extend(self[name].run_due(fleet_config))
+        return started
+
+    def seconds_until_due(self):
+        due = [scheduler.seconds_until_due() for scheduler in self.values()]
+        return min((seconds for seconds in due if seconds is not None), default=None)
+
+    def stats(self):
+        totals = {"pending": 0, "in_flight": 0, "requested": 0, "executed": 0, "failed": 0}
+        for scheduler in self.values():
+            for key, value in scheduler.stats().items():
+                totals[key] += value
+        return totals
+
+    def shutdown(self):
+        """Let restarts that were already handed off finish."""
+        for scheduler in self.values():
+            scheduler.executor.shutdown()
@@ -1,9 +1,19 @@
 import json
 import os
-from datetime import datetime, timezone
+import sqlite3
+import threading
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from logger import logger
+from news_processor import article_key
 
 STATE_FILE = 'last_processed_state.json'
+ARTICLE_STORE_FILE = 'processed_articles.db'
+# Processed article ids are kept this long behind the newest processed article;
+# anything older than that is treated as processed without an id lookup.
+DEFAULT_RETENTION = timedelta(days=30)
+# Keys per IN (...) lookup, below SQLite's default host parameter limit
+SQL_BATCH_SIZE = 500
 
 def load_last_processed_timestamp(file_path=STATE_FILE):
     if os.path.exists(file_path):
@@ -38,4 +48,222 @@ def update_last_processed_timestamp(news):
             parse_datetime(article['created'])
             for article in news['news']
         )
-        save_last_processed_timestamp(latest_timestamp)
\ No newline at end of file
+        save_last_processed_timestamp(latest_timestamp)
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def to_epoch_ms(dt):
+    return int((dt - EPOCH).total_seconds() * 1000)
+
+def _days_from_civil(year, month, day):
+    # Days since 1970-01-01 in the proleptic Gregorian calendar
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+def _days_in_month(year, month):
+    if month == 2:
+        return 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28
+    return 30 if month in (4, 6, 9, 11) else 31
+
+def parse_created_ms(created):
+    """Epoch milliseconds of an article's ``created``: a feed timestamp or, on Article records, already an int."""
+    if isinstance(created, int):
+        return created
+    return _parse_created_ms(created)
+
+@lru_cache(maxsize=65536)
+def _parse_created_ms(dt_string):
+    """Parse a feed timestamp ("2024-10-08 04:10:23.613Z") to epoch milliseconds.
+
+    Slices the fixed layout directly instead of going through strptime, and
+    caches results since the same articles come back on every poll.
+    """
+    if (
+        len(dt_string) >= 21
+        and dt_string[4] == '-' and dt_string[7] == '-' and dt_string[10] == ' '
+        and dt_string[13] == ':' and dt_string[16] == ':' and dt_string[19] == '.'
+        and dt_string[-1] == 'Z'
+    ):
+        try:
+            year, month, day = int(dt_string[0:4]), int(dt_string[5:7]), int(dt_string[8:10])
+            hour, minute, second = int(dt_string[11:13]), int(dt_string[14:16]), int(dt_string[17:19])
+            millis = int((dt_string[20:-1] + '000')[:3])
+        except ValueError:
+            pass
+        else:
+            # Out-of-range fields fall through to strptime, which rejects them
+            if (
+                1 <= month <= 12 and 1 <= day <= _days_in_month(year, month)
+                and hour < 24 and minute < 60 and second < 60
+            ):
+                days = _days_from_civil(year, month, day)
+                return (days * 86400 + hour * 3600 + minute * 60 + second) * 1000 + millis
+    return to_epoch_ms(parse_datetime(dt_string))
+
+def clear_created_cache():
+    """Forget the cached feed timestamps, e.g. to time a cold parse."""
+    _parse_created_ms.cache_clear()
+
+def scan_new_articles(articles, floor_ms):
+    """Single pass over the feed: keep articles newer than ``floor_ms``.
+
+    Returns the kept articles with their parsed ``created`` times, plus the
+    newest ``created`` time among them (or None when nothing was kept).
+    """
+    kept = []
+    newest = None
+    for article in articles:
+        created = parse_created_ms(article['created'])
+        if created > floor_ms:
+            kept.append((article, created))
+            if newest is None or created > newest:
+                newest = created
+    return kept, newest
+
+MIN_EPOCH_MS = to_epoch_ms(datetime.min.replace(tzinfo=timezone.utc))
+
+
+class ProcessedArticleStore:
+    """Index of processed articles backed by SQLite in WAL mode.
+
+    Every processed article is recorded by its id (or content hash), so articles
+    sharing a timestamp or published out of order are still processed exactly
+    once. Entries older than ``retention`` behind the newest processed article
+    are evicted; articles from before that floor count as processed.
+    """
+
+    def __init__(self, file_path=ARTICLE_STORE_FILE, retention=DEFAULT_RETENTION, legacy_state_file=STATE_FILE):
+        self.file_path = file_path
+        self.retention_ms = int(retention.total_seconds() * 1000)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(file_path, check_same_thread=False)
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS processed_articles "
+                "(key TEXT PRIMARY KEY, created INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS processed_articles_created ON processed_articles (created)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS store_state (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+        state = dict(self.conn.execute("SELECT name, value FROM store_state"))
+        if not state:
+            state = self._initial_state(legacy_state_file)
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO store_state (name, value) VALUES (?, ?)", state.items()
+                )
+        self.floor = state['floor']
+        self.watermark = state['watermark']
+        self._pending = {}
+
+    def _initial_state(self, legacy_state_file):
+        # Carry over the watermark of the single-timestamp state file, if any
+        if legacy_state_file and os.path.exists(legacy_state_file):
+            legacy_timestamp = to_epoch_ms(load_last_processed_timestamp(legacy_state_file))
+            logger.info(f"Migrating last processed timestamp from {legacy_state_file}")
+            return {'floor': legacy_timestamp, 'watermark': legacy_timestamp}
+        return {'floor': MIN_EPOCH_MS, 'watermark': MIN_EPOCH_MS}
+
+    @property
+    def last_processed_timestamp(self):
+        return EPOCH + timedelta(milliseconds=self.watermark)
+
+    @property
+    def floor_timestamp(self):
+        return EPOCH + timedelta(milliseconds=self.floor)
+
+    def stream_start(self, overlap):
+        """Where streaming the feed starts: ``overlap`` before the watermark, but not below the floor.
+
+        Articles in the overlap that were already processed are deduplicated
+        by get_new_articles, so it only catches articles published late.
+        """
+        overlap_ms = int(overlap.total_seconds() * 1000)
+        return EPOCH + timedelta(milliseconds=max(self.floor, self.watermark - overlap_ms))
+
+    def _processed_keys(self, keys):
+        found = set()
+        with self.lock:
+            for start in range(0, len(keys), SQL_BATCH_SIZE):
+                batch = keys[start:start + SQL_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                found.update(
+                    row[0] for row in self.conn.execute(
+                        f"SELECT key FROM processed_articles WHERE key IN ({placeholders})", batch
+                    )
+                )
+        return found
+
+    def get_new_articles(self, news):
+        kept, _ = scan_new_articles(news['news'], self.floor)
+        keys = [article_key(article) for article, _ in kept]
+        processed = self._processed_keys(keys) if keys else set()
+
+        new_articles = []
+        # Remembered for mark_processed so the same articles are not parsed and hashed again
+        self._pending = {}
+        for (article, created), key in zip(kept, keys):
+            if key not in processed and key not in self._pending:
+                self._pending[key] = created
+                new_articles.append(article)
+        return new_articles
+
+    def mark_processed(self, articles):
+        rows = []
+        for article in articles:
+            key = article_key(article)
+            created = self._pending.get(key)
+            if created is None:
+                created = parse_created_ms(article['created'])
+            rows.append((key, created))
+        self._pending = {}
+        if not rows:
+            return
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO processed_articles (key, created) VALUES (?, ?)", rows
+                )
+                self.watermark = max(self.watermark, max(created for _, created in rows))
+                floor = max(self.floor, self.watermark - self.retention_ms)
+                evicted = floor > self.floor
+                if evicted:
+                    self.floor = floor
+                    self.conn.execute("DELETE FROM processed_articles WHERE created <= ?", (floor,))
+                self.conn.executemany(
+                    "UPDATE store_state SET value = ? WHERE name = ?",
+                    [(self.floor, 'floor'), (self.watermark, 'watermark')],
+                )
+            if evicted:
+                # Hand the pages freed by eviction back to the filesystem
+                self.conn.execute("PRAGMA incremental_vacuum").fetchall()
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM processed_articles").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_stores = {}
+
+
+def get_article_store(file_path=ARTICLE_STORE_FILE):
+    store = _stores.get(file_path)
+    if store is None:
+        store = ProcessedArticleStore(file_path)
+        _stores[file_path] = store
+    return store
@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import main
+from article import Article, decode_article
+from news_processor import ArticleFilter, article_key, extract_symbols
+from state_manager import ProcessedArticleStore
+
+FEED = """
+{"news": [
+    {"id": 7, "title": "Binance Will Delist XRP", "category": "DELISTING", "symbols": "XRP, ADA",
+     "trading_pairs": ["XRP/USDT", "ADA/USDT"], "created": "2024-10-08 04:10:23.613Z",
+     "link": "https://test.com/news/7", "body": "long article text", "source": {"name": "Binance"}},
+    {"title": "Binance Will Delist ADA", "category": "DELISTING", "symbols": ["ADA"],
+     "created": "2024-10-08 04:12:00.000Z", "link": "https://test.com/news/ada"}
+]}
+"""
+
+
+class TestArticle(unittest.TestCase):
+    def setUp(self):
+        self.raw = json.loads(FEED)["news"]
+        self.news = json.loads(FEED, object_hook=decode_article)
+
+    def test_decoded_into_compact_records(self):
+        first, second = self.news["news"]
+        self.assertIsInstance(first, Article)
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertEqual(first.created, 1728360623613)
+        self.assertEqual(first.symbols, ("XRP", "ADA"))
+        self.assertEqual(first.trading_pairs, ("XRP/USDT", "ADA/USDT"))
+        self.assertNotIn("body", first)
+        # Interned, so every record shares the same strings
+        self.assertIs(first.category, second.category)
+        self.assertIs(first.symbols[1], second.symbols[0])
+
+    def test_key_matches_the_dict_article(self):
+        for raw, article in zip(self.raw, self.news["news"]):
+            self.assertEqual(article_key(article), article_key(raw))
+
+    def test_dict_access(self):
+        article = self.news["news"][1]
+        self.assertEqual(article["title"], "Binance Will Delist ADA")
+        self.assertIn("created", article)
+        self.assertNotIn("trading_pairs", article)
+        self.assertEqual(article.get("trading_pairs", []), [])
+        with self.assertRaises(KeyError):
+            article["id"]
+
+    def test_null_fields_are_present(self):
+        text = (
+            '{"id": null, "title": null, "category": "DELISTING", "symbols": "XRP", "trading_pairs": null,'
+            ' "created": "2024-10-08 04:10:23.613Z", "link": null}'
+        )
+        article = json.loads(text, object_hook=decode_article)
+
+        self.assertIsNone(article["link"])
+        self.assertIsNone(article["title"])
+        self.assertIn("link", article)
+        self.assertIsNone(article.get("trading_pairs", []))
+        self.assertEqual(article_key(article), article_key(json.loads(text)))
+
+    @patch("main.update_passivbot_configs")
+    def test_null_fields_run_through_the_pipeline(self, mock_update_configs):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        store = ProcessedArticleStore(os.path.join(temp_dir, "processed.db"), legacy_state_file=None)
+        self.addCleanup(store.close)
+        news = json.loads(
+            '{"news": [{"id": 9, "title": "Binance Will Delist XRP", "category": "DELISTING", "symbols": "XRP",'
+            ' "trading_pairs": ["XRP/USDT"], "created": "2024-10-08 04:10:23.613Z", "link": null}]}',
+            object_hook=decode_article,
+        )
+        config = {"news_monitoring": {"categories": ["DELISTING"], "quote_currencies": ["USDT"]}}
+
+        main.process_articles(news, config, store)
+
+        mock_update_configs.assert_called_once()
+        self.assertEqual(mock_update_configs.call_args.args[2], {"XRP"})
+        self.assertEqual(store.count(), 1)
+
+    def test_pipeline_treats_records_like_dicts(self):
+        article_filter = ArticleFilter(["DELISTING"], ["USDT"])
+        for raw, article in zip(self.raw, self.news["news"]):
+            self.assertEqual(extract_symbols(article, ["USDT"]), extract_symbols(raw, ["USDT"]))
+            self.assertEqual(article_filter.matches(article), article_filter.matches(raw))
+
+
+if __name__ == "__main__":
+    unittest.main()
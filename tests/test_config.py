@@ -1,7 +1,59 @@
 import unittest
 import tempfile
 import os
-from config import load_and_validate_config
+import yaml
+from unittest.mock import patch
+from config import load_and_validate_config, load_yaml_with_substitutions
+
+VALID_CONFIG = """
+symbolscout_endpoint: "https://symbolscout.farkaslabs.xyz/api/news/breaking"
+check_interval: 600
+news_monitoring:
+    categories: ["DELISTING"]
+    quote_currencies: ["USDT"]
+passivbot:
+    passivbot_folder: "$SYMBOLSCOUT_TEST_FOLDER"
+    symbol_exclusion_strategy:
+        remove_from_approved_coins: true
+        add_to_ignored_coins: false
+    mode: "tmuxp"
+    tmuxp:
+        tmux_config_file: "./passivbot-tmux-sessions-example.yml"
+        tmux_session_name: "passivbot_instances"
+        stop_command: "true"
+        start_command: "true"
+    passivbot_config_files:
+        - config_file: "${passivbot_folder}/configs/bybit_01.json"
+"""
+
+FLEETS_CONFIG = """
+symbolscout_endpoint: "https://symbolscout.farkaslabs.xyz/api/news/breaking"
+check_interval: 600
+news_monitoring:
+    categories: ["DELISTING"]
+    quote_currencies: ["USDT"]
+fleets:
+    - name: bybit
+      passivbot: &passivbot
+          passivbot_folder: "/opt/bybit"
+          symbol_exclusion_strategy:
+              remove_from_approved_coins: true
+              add_to_ignored_coins: false
+          mode: "tmuxp"
+          tmuxp:
+              tmux_config_file: "./passivbot-tmux-sessions-example.yml"
+              tmux_session_name: "passivbot_instances"
+              stop_command: "true"
+              start_command: "true"
+          passivbot_config_files:
+              - config_file: "${passivbot_folder}/configs/bybit_01.json"
+    - name: binance
+      state_file: binance.db
+      news_monitoring: {categories: [DELISTING, TOKEN_SWAP], quote_currencies: [USDC]}
+      passivbot:
+          <<: *passivbot
+          passivbot_folder: "/opt/binance"
+"""
 
 
 class TestConfig(unittest.TestCase):
@@ -81,6 +133,61 @@ class TestConfig(unittest.TestCase):
         with self.assertRaises(ValueError):
             load_and_validate_config(self.config_path)
 
+    def test_config_is_cached_until_file_or_environment_changes(self):
+        with open(self.config_path, "w") as f:
+            f.write(VALID_CONFIG)
+
+        with patch.dict(os.environ, {"SYMBOLSCOUT_TEST_FOLDER": "/opt/pb"}):
+            with patch("config.load_yaml_with_substitutions", wraps=load_yaml_with_substitutions) as parse:
+                config = load_and_validate_config(self.config_path)
+                self.assertEqual(
+                    config["passivbot"]["passivbot_config_files"][0]["config_file"], "/opt/pb/configs/bybit_01.json"
+                )
+                self.assertEqual(parse.call_count, 2)
+
+                # Callers get their own copy of the cached config
+                config["check_interval"] = 1
+                self.assertEqual(load_and_validate_config(self.config_path)["check_interval"], 600)
+                self.assertEqual(parse.call_count, 2)
+
+                # A referenced environment variable changed
+                os.environ["SYMBOLSCOUT_TEST_FOLDER"] = "/srv/pb"
+                config = load_and_validate_config(self.config_path)
+                self.assertEqual(config["passivbot"]["passivbot_folder"], "/srv/pb")
+                self.assertEqual(parse.call_count, 4)
+
+                # The file changed
+                with open(self.config_path, "a") as f:
+                    f.write("endpoint_timeout: 5\n")
+                self.assertEqual(load_and_validate_config(self.config_path)["endpoint_timeout"], 5)
+                self.assertEqual(parse.call_count, 6)
+
+    def test_fleets(self):
+        with open(self.config_path, "w") as f:
+            f.write(FLEETS_CONFIG)
+        fleets = load_and_validate_config(self.config_path)["fleets"]
+        self.assertEqual(
+            [fleet["passivbot"]["passivbot_config_files"][0]["config_file"] for fleet in fleets],
+            ["/opt/bybit/configs/bybit_01.json", "/opt/binance/configs/bybit_01.json"],
+        )
+
+        with open(self.config_path, "w") as f:
+            f.write(FLEETS_CONFIG.replace("name: binance", "name: bybit"))
+        with self.assertRaises(ValueError):
+            load_and_validate_config(self.config_path)
+
+        with open(self.config_path, "w") as f:
+            f.write(VALID_CONFIG + "fleets: []\n")
+        with self.assertRaises(ValueError):
+            load_and_validate_config(self.config_path)
+
+    def test_safe_loader_is_not_modified(self):
+        with open(self.config_path, "w") as f:
+            f.write(VALID_CONFIG)
+        load_and_validate_config(self.config_path)
+        self.assertEqual(yaml.safe_load("value: $HOME"), {"value": "$HOME"})
+        self.assertNotIn(None, yaml.SafeLoader.yaml_implicit_resolvers)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from config_watcher import ConfigWatcher
+
+
+class TestConfigWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.config_path = os.path.join(self.temp_dir.name, "config.yml")
+        self.write(self.config_path, "check_interval: 600\n")
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def make_watcher(self, use_inotify):
+        watcher = ConfigWatcher(self.temp_dir.name, use_inotify=use_inotify)
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def check_changes(self, watcher):
+        self.assertFalse(watcher.changed())
+
+        self.write(self.config_path, "check_interval: 300\n")
+        self.assertTrue(watcher.changed())
+        self.assertFalse(watcher.changed())
+
+        # Saved through a temporary file renamed over the config
+        replacement = os.path.join(self.temp_dir.name, "config.yml.tmp")
+        self.write(replacement, "check_interval: 900\n")
+        os.replace(replacement, self.config_path)
+        self.assertTrue(watcher.changed())
+
+        # A local override appearing is a change too
+        self.write(os.path.join(self.temp_dir.name, "config.local.yml"), "check_interval: 60\n")
+        self.assertTrue(watcher.changed())
+
+        self.write(os.path.join(self.temp_dir.name, "notes.txt"), "unrelated\n")
+        self.assertFalse(watcher.changed())
+
+    def test_inotify(self):
+        watcher = self.make_watcher(use_inotify=True)
+        if watcher.mode != "inotify":
+            self.skipTest("inotify is not available")
+        self.check_changes(watcher)
+
+    def test_polling_fallback(self):
+        watcher = self.make_watcher(use_inotify=False)
+        self.assertEqual(watcher.mode, "polling")
+        self.check_changes(watcher)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from feed_cache import FeedCache
+from news_fetcher import NewsFetcher
+
+NEWS = {
+    "news": [
+        {"id": 2, "title": "Binance Will Delist ETH", "created": "2024-10-08 05:00:00.000Z"},
+        {"id": 1, "title": "Binance Will Delist XRP", "created": "2024-10-08 04:00:00.000Z"},
+    ]
+}
+
+
+def ids(news):
+    return [article["id"] for article in news["news"]]
+
+
+class ConditionalFeedServer:
+    """Local stand-in for a SymbolScout endpoint that answers 304 to a matching ETag."""
+
+    def __init__(self, payload, delay=0):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                time.sleep(server.delay)
+                if self.headers.get("If-None-Match") == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = json.dumps(server.payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.payload = payload
+        self.delay = delay
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/api/news/breaking"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFeedCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.server = ConditionalFeedServer(NEWS)
+        self.addCleanup(self.server.close)
+        self.clock = FakeClock()
+
+    def make_process(self):
+        """A cache and fetcher as a separate sentinel process would have them."""
+        fetcher = NewsFetcher(self.server.url)
+        self.addCleanup(fetcher.close)
+        return FeedCache(self.directory, max_age=60, clock=self.clock), fetcher
+
+    def test_fresh_entry_is_shared(self):
+        cache_a, fetcher_a = self.make_process()
+        cache_b, fetcher_b = self.make_process()
+
+        self.assertEqual(ids(cache_a.fetch(fetcher_a)), [2, 1])
+        self.assertEqual(ids(cache_b.fetch(fetcher_b)), [2, 1])
+        self.assertEqual(self.server.requests, 1)
+
+        # A response a process has already read counts as not modified
+        self.assertEqual(cache_a.fetch(fetcher_a), {"news": []})
+        fetcher_a.reset_validators()
+        self.assertEqual(ids(cache_a.fetch(fetcher_a)), [2, 1])
+        self.assertEqual(self.server.requests, 1)
+
+    def test_stale_entry_is_revalidated(self):
+        cache, fetcher = self.make_process()
+        cache.fetch(fetcher)
+
+        self.clock.now += 60
+        self.assertEqual(cache.fetch(fetcher), {"news": []})
+        self.assertEqual(self.server.requests, 2)
+        entry = cache.read(self.server.url)
+        self.addCleanup(entry.close)
+        self.assertEqual(entry.meta["fetched_at"], self.clock.now)
+        self.assertEqual(json.loads(entry.body()), NEWS)
+
+    def test_one_process_refreshes_while_the_others_wait(self):
+        self.server.delay = 0.2
+        processes = [self.make_process() for _ in range(5)]
+
+        with ThreadPoolExecutor(len(processes)) as executor:
+            results = list(executor.map(lambda process: process[0].fetch(process[1]), processes))
+
+        self.assertEqual([ids(news) for news in results], [[2, 1]] * len(processes))
+        self.assertEqual(self.server.requests, 1)
+
+    def test_streamed_from_the_mapped_entry(self):
+        cache, fetcher = self.make_process()
+        since = datetime(2024, 10, 8, 4, 30, tzinfo=timezone.utc)
+
+        news = cache.fetch(fetcher, since=since, newest_first=True)
+
+        self.assertEqual([article["id"] for article in news["news"]], [2])
+
+    def test_unusable_entry_is_refetched(self):
+        cache, fetcher = self.make_process()
+        with open(cache.entry_path(self.server.url), "w") as f:
+            f.write("not a cache entry")
+
+        self.assertEqual(ids(cache.fetch(fetcher)), [2, 1])
+        self.assertEqual(self.server.requests, 1)
+
+    def test_failed_refresh(self):
+        cache, fetcher = self.make_process()
+        self.server.close()
+        fetcher.session.adapters["http://"].max_retries.total = 0
+
+        self.assertIsNone(cache.fetch(fetcher))
+        self.assertFalse(os.path.exists(cache.entry_path(self.server.url)))
+
+
+if __name__ == "__main__":
+    unittest.main()
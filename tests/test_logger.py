@@ -0,0 +1,142 @@
+import logging
+import queue
+import time
+import unittest
+from unittest.mock import MagicMock
+from logger import BoundedQueueHandler, NotificationDispatcher, NotifyHandler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def notify_config(urls=("json://localhost",), **options):
+    flags = {"errors": True, "config_updates": True, "new_news": True}
+    flags.update({key: options.pop(key) for key in list(options) if key in flags})
+    return {"notifications": {"apprise_urls": list(urls), "notify_on": flags, **options}}
+
+
+def mock_channels(handler):
+    for channel in handler.channels:
+        channel.apprise = MagicMock()
+    return [channel.apprise for channel in handler.channels]
+
+
+def make_record(message, level=logging.INFO):
+    return logging.LogRecord("SymbolScout", level, __file__, 0, message, None, None)
+
+
+class TestNotifyHandler(unittest.TestCase):
+    def test_notification_type(self):
+        handler = NotifyHandler(notify_config(new_news=False))
+        self.assertEqual(handler.notification_type(make_record("Config Update: Removed XRPUSDT")), "Config Update")
+        self.assertEqual(handler.notification_type(make_record("boom", logging.ERROR)), "Error")
+        self.assertIsNone(handler.notification_type(make_record("New Article: XRP delisting")))
+        self.assertIsNone(handler.notification_type(make_record("Kept article: XRP")))
+
+    def test_digest_collects_news_and_sends_errors_immediately(self):
+        handler = NotifyHandler(notify_config(digest=True))
+        (sender,) = mock_channels(handler)
+
+        handler.handle(make_record("New Article: XRP delisting"))
+        handler.handle(make_record("New Article: DOGE delisting"))
+        handler.handle(make_record("Config Update: Removed XRPUSDT"))
+        handler.handle(make_record("boom", logging.ERROR))
+        self.assertEqual(sender.notify.call_args.kwargs["title"], "SymbolScout Error")
+        self.assertEqual(sender.notify.call_count, 1)
+
+        handler.flush()
+        self.assertEqual(sender.notify.call_count, 2)
+        digest = sender.notify.call_args.kwargs
+        self.assertEqual(digest["title"], "SymbolScout Digest: 2 new articles, 1 config updates")
+        self.assertIn("- New Article: DOGE delisting", digest["body"])
+        self.assertIn("Config updates:\n- Config Update: Removed XRPUSDT", digest["body"])
+
+        handler.flush()
+        self.assertEqual(sender.notify.call_count, 2)
+
+    def test_channels_are_rate_limited_separately(self):
+        handler = NotifyHandler(
+            notify_config(urls=["json://a", "json://b"], rate_limit_per_minute=60, rate_limit_burst=2)
+        )
+        first, second = mock_channels(handler)
+        clock = FakeClock()
+        handler.channels[0].bucket = TokenBucket(60, 2, clock=clock)
+
+        for i in range(4):
+            handler.handle(make_record(f"New Article: {i}"))
+
+        self.assertEqual(second.notify.call_count, 2)
+        self.assertEqual(first.notify.call_count, 2)
+
+        # Held messages go out together once a token is available, none are lost
+        clock.now += 1
+        handler.handle(make_record("New Article: 4"))
+        self.assertEqual(first.notify.call_count, 3)
+        self.assertEqual(first.notify.call_args.kwargs["title"], "SymbolScout: 3 notifications")
+        for i in range(2, 5):
+            self.assertIn(f"New Article: {i}", first.notify.call_args.kwargs["body"])
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(30, 2, clock=clock)
+        self.assertTrue(bucket.try_consume())
+        self.assertTrue(bucket.try_consume())
+        self.assertFalse(bucket.try_consume())
+        self.assertEqual(bucket.wait_time(), 2)
+
+        clock.now += 2
+        self.assertTrue(bucket.try_consume())
+        clock.now += 60
+        self.assertEqual(bucket.wait_time(), 0)
+        self.assertAlmostEqual(bucket.tokens, 2)
+
+
+class TestNotificationQueue(unittest.TestCase):
+    def test_drop_new_when_full(self):
+        record_queue = queue.Queue(2)
+        handler = BoundedQueueHandler(record_queue)
+        for message in ["a", "b", "c"]:
+            handler.handle(make_record(message))
+
+        self.assertEqual(handler.dropped, 1)
+        self.assertEqual([record_queue.get_nowait().msg for _ in range(2)], ["a", "b"])
+
+    def test_drop_old_when_full(self):
+        record_queue = queue.Queue(2)
+        handler = BoundedQueueHandler(record_queue, overflow="drop_old")
+        for message in ["a", "b", "c"]:
+            handler.handle(make_record(message))
+
+        self.assertEqual(handler.dropped, 1)
+        self.assertEqual([record_queue.get_nowait().msg for _ in range(2)], ["b", "c"])
+
+    def test_logging_does_not_wait_for_delivery(self):
+        notify_handler = NotifyHandler(notify_config())
+        (sender,) = mock_channels(notify_handler)
+        sender.notify.side_effect = lambda **kwargs: time.sleep(0.2)
+
+        record_queue = queue.Queue(10)
+        queue_handler = BoundedQueueHandler(record_queue)
+        dispatcher = NotificationDispatcher(record_queue, notify_handler)
+        dispatcher.start()
+
+        started = time.monotonic()
+        for i in range(3):
+            queue_handler.handle(make_record(f"New Article: {i}"))
+        self.assertLess(time.monotonic() - started, 0.1)
+
+        # Stopping flushes everything still queued
+        dispatcher.stop()
+        self.assertEqual(sender.notify.call_count, 3)
+        self.assertEqual(sender.notify.call_args.kwargs["body"], "New Article: 2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,11 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import main
+from state_manager import ProcessedArticleStore
 import json
 import tempfile
 import os
+import shutil
 from datetime import datetime, timezone
 
 
@@ -27,16 +29,12 @@ class TestMain(unittest.TestCase):
     @patch("main.fetch_news")
     @patch("main.filter_news")
     @patch("main.update_passivbot_configs")
-    @patch("main.load_last_processed_timestamp")
-    @patch("main.update_last_processed_timestamp")
-    @patch("main.get_new_articles")
+    @patch("main.get_article_store")
     @patch("main.extract_symbols")
     def test_process_news(
         self,
         mock_extract_symbols,
-        mock_get_new_articles,
-        mock_update_timestamp,
-        mock_load_timestamp,
+        mock_get_article_store,
         mock_update_configs,
         mock_filter_news,
         mock_fetch_news,
@@ -75,16 +73,17 @@ class TestMain(unittest.TestCase):
                     "symbols": "XRP",
                     "trading_pairs": ["XRPUSDT"],
                     "created": "2024-10-08 04:10:23.613Z",
+                    "link": "https://test.com/news/xrp-delisting",
                 }
             ]
         }
         mock_fetch_news.return_value = mock_news
 
-        # Mock load_last_processed_timestamp
-        mock_load_timestamp.return_value = datetime(2024, 1, 1, tzinfo=timezone.utc)
-
-        # Mock get_new_articles
-        mock_get_new_articles.return_value = mock_news["news"]
+        # Mock the processed article store
+        mock_store = MagicMock()
+        mock_store.last_processed_timestamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        mock_store.get_new_articles.return_value = mock_news["news"]
+        mock_get_article_store.return_value = mock_store
 
         # Mock filter_news to return the same news
         mock_filter_news.return_value = mock_news["news"]
@@ -96,12 +95,147 @@ class TestMain(unittest.TestCase):
         main.process_news(mock_config)
 
         # Assertions
-        mock_fetch_news.assert_called_once_with("https://test.com/api")
-        mock_get_new_articles.assert_called_once()
+        mock_fetch_news.assert_called_once()
+        self.assertEqual(mock_fetch_news.call_args.args, ("https://test.com/api",))
+        self.assertIsNone(mock_fetch_news.call_args.kwargs["since"])
+        mock_store.get_new_articles.assert_called_once_with(mock_news)
         mock_filter_news.assert_called_once()
         mock_extract_symbols.assert_called()
         mock_update_configs.assert_called_once()
-        mock_update_timestamp.assert_called_once()
+        mock_store.mark_processed.assert_called_once_with(mock_news["news"])
+
+    @patch("main.fetch_news", return_value=None)
+    @patch("main.get_article_store")
+    def test_process_news_reports_fetch_failure(self, mock_get_article_store, mock_fetch_news):
+        config = {"symbolscout_endpoint": "https://test.com/api"}
+        self.assertFalse(main.process_news(config))
+
+        mock_fetch_news.return_value = {"news": []}
+        mock_get_article_store.return_value.get_new_articles.return_value = []
+        self.assertTrue(main.process_news(config))
+
+
+class TestFleets(unittest.TestCase):
+    ARTICLE = {
+        "id": 7,
+        "title": "Binance Will Delist XRP",
+        "category": "DELISTING",
+        "symbols": "XRP",
+        "trading_pairs": ["XRPUSDT"],
+        "created": "2024-10-08 04:10:23.613Z",
+        "link": "https://test.com/news/xrp-delisting",
+    }
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+        def fleet(name):
+            return {
+                "name": name,
+                "state_file": os.path.join(self.temp_dir, f"{name}.db"),
+                "passivbot": {"passivbot_config_files": [{"config_file": f"{name}.json"}]},
+            }
+
+        self.config = {
+            "symbolscout_endpoint": "https://test.com/api",
+            "news_monitoring": {"categories": ["DELISTING"], "quote_currencies": ["USDT"]},
+            "fleets": [fleet("a"), fleet("b")],
+        }
+        self.stores = {}
+
+        def store(path):
+            if path not in self.stores:
+                self.stores[path] = ProcessedArticleStore(path, legacy_state_file=None)
+                self.addCleanup(self.stores[path].close)
+            return self.stores[path]
+
+        patcher = patch("main.get_article_store", side_effect=store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("main.reset_validators")
+    @patch("main.update_passivbot_configs")
+    @patch("main.fetch_news")
+    def test_one_fetch_fans_out_to_every_fleet(self, mock_fetch_news, mock_update_configs, mock_reset_validators):
+        mock_fetch_news.return_value = {"news": [self.ARTICLE]}
+        scheduler = {"a": MagicMock(), "b": MagicMock()}
+
+        def update(articles, config, symbols, restart_scheduler):
+            if config["passivbot"]["passivbot_config_files"][0]["config_file"] == "b.json":
+                raise OSError("disk full")
+
+        mock_update_configs.side_effect = update
+        poll_scheduler = MagicMock()
+
+        # Fleet b failed, so the cycle is retried without hiding its articles
+        self.assertFalse(main.process_news(self.config, scheduler, poll_scheduler))
+        mock_fetch_news.assert_called_once()
+        self.assertEqual(mock_update_configs.call_count, 2)
+        self.assertIs(mock_update_configs.call_args_list[0].args[3], scheduler["a"])
+        self.assertIs(mock_update_configs.call_args_list[1].args[3], scheduler["b"])
+        self.assertEqual([store.count() for store in self.stores.values()], [1, 0])
+        mock_reset_validators.assert_called_once()
+        poll_scheduler.observe.assert_called_once_with([self.ARTICLE])
+
+        # Only fleet b still has the article to process
+        mock_update_configs.side_effect = None
+        self.assertTrue(main.process_news(self.config, scheduler))
+        self.assertEqual(mock_update_configs.call_count, 3)
+        self.assertIs(mock_update_configs.call_args.args[3], scheduler["b"])
+        self.assertEqual([store.count() for store in self.stores.values()], [1, 1])
+
+
+class TestOnce(unittest.TestCase):
+    @patch("main.setup_logger")
+    @patch("main.run_forever")
+    @patch("main.process_news")
+    @patch("main.load_and_validate_config")
+    def test_exit_codes(self, mock_load_config, mock_process_news, mock_run_forever, mock_setup_logger):
+        config = {"check_interval": 600}
+        mock_load_config.return_value = config
+
+        mock_process_news.return_value = True
+        self.assertEqual(main.main(["--once"]), main.EXIT_OK)
+        # Restarts run inline, without a scheduler
+        mock_process_news.assert_called_once_with(config)
+
+        mock_process_news.return_value = False
+        self.assertEqual(main.main(["--once"]), main.EXIT_CYCLE_FAILED)
+
+        mock_load_config.side_effect = ValueError("invalid")
+        self.assertEqual(main.main(["--once"]), main.EXIT_CONFIG_ERROR)
+        mock_run_forever.assert_not_called()
+
+
+class TestReloadConfig(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            "symbolscout_endpoint": "https://test.com/api",
+            "check_interval": 600,
+            "passivbot": {"restart_debounce_seconds": 0, "passivbot_config_files": [{"config_file": "/bots/a.json"}]},
+        }
+        self.scheduler = MagicMock()
+
+    @patch("main.get_config_cache")
+    @patch("main.prune_fetchers")
+    @patch("main.setup_logger")
+    @patch("main.load_and_validate_config")
+    def test_changed_config_is_applied(self, mock_load_config, mock_setup_logger, mock_prune_fetchers, mock_cache):
+        new_config = dict(self.config, passivbot=dict(self.config["passivbot"], restart_debounce_seconds=60))
+        mock_load_config.return_value = new_config
+
+        self.assertIs(main.reload_config(self.config, self.scheduler), new_config)
+        self.scheduler.reconfigure.assert_called_once_with(new_config)
+        mock_prune_fetchers.assert_called_once_with("https://test.com/api")
+        mock_cache.return_value.prune_index.assert_called_once_with({"/bots/a.json"})
+        # Notification settings did not change, so the handlers are kept
+        mock_setup_logger.assert_not_called()
+
+    @patch("main.load_and_validate_config", side_effect=ValueError("invalid"))
+    def test_invalid_config_is_ignored(self, mock_load_config):
+        self.assertIs(main.reload_config(self.config, self.scheduler), self.config)
+        self.scheduler.reconfigure.assert_not_called()
 
 
 if __name__ == "__main__":
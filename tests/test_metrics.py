@@ -0,0 +1,72 @@
+import unittest
+import requests
+import metrics
+from metrics import Counter, Histogram, MetricsServer, time_stage
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_interpolate_within_buckets(self):
+        histogram = Histogram("test_seconds", "Test.", buckets=(1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count(), 4)
+        self.assertEqual(histogram.quantile(0.5), 1.5)
+        self.assertEqual(histogram.quantile(1), 4)
+        self.assertIsNone(histogram.quantile(0.5, "other"))
+
+    def test_render_prometheus_text(self):
+        histogram = Histogram("test_seconds", "Test.", buckets=(1, 2), label="stage")
+        histogram.observe(0.5, "fetch")
+        histogram.observe(5, "fetch")
+
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP test_seconds Test.",
+                "# TYPE test_seconds histogram",
+                'test_seconds_bucket{stage="fetch",le="1"} 1',
+                'test_seconds_bucket{stage="fetch",le="2"} 1',
+                'test_seconds_bucket{stage="fetch",le="+Inf"} 2',
+                'test_seconds_sum{stage="fetch"} 5.5',
+                'test_seconds_count{stage="fetch"} 2',
+            ],
+        )
+
+    def test_counter(self):
+        counter = Counter("test_total", "Test.", label="step")
+        counter.inc(3, "new")
+        counter.inc(label_value="new")
+        self.assertEqual(counter.value("new"), 4)
+        self.assertEqual(counter.render()[-1], 'test_total{step="new"} 4')
+
+
+class TestMetrics(unittest.TestCase):
+    def test_stage_is_timed_when_it_raises(self):
+        before = metrics.STAGE_SECONDS.count("test_stage")
+        with self.assertRaises(RuntimeError):
+            with time_stage("test_stage"):
+                raise RuntimeError("boom")
+        self.assertEqual(metrics.STAGE_SECONDS.count("test_stage"), before + 1)
+        self.assertIn("test_stage n=", metrics.summary())
+
+    def test_metrics_endpoint(self):
+        server = MetricsServer(port=0)
+        server.start()
+        self.addCleanup(server.close)
+        metrics.ARTICLES.inc(2, "fetched")
+
+        response = requests.get(server.address)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn("# TYPE symbolscout_stage_duration_seconds histogram", response.text)
+        self.assertIn('symbolscout_articles_total{step="fetched"}', response.text)
+        self.assertEqual(requests.get(server.address.replace("/metrics", "/other")).status_code, 404)
+
+    def test_from_config(self):
+        self.assertIsNone(MetricsServer.from_config({}))
+        self.assertIsNone(MetricsServer.from_config({"metrics": {"summary_interval": 60}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,31 +1,228 @@
+import asyncio
+import json
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
-from news_fetcher import fetch_news
+import news_fetcher
+from datetime import datetime, timezone
+from news_fetcher import fetch_news, fetch_news_async, iter_json_array, merge_news, NewsFetcher
 import requests
 
+
+class FeedServer:
+    """Local stand-in for a SymbolScout endpoint serving a fixed payload."""
+
+    def __init__(self, payload, delay=0, etag=None):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.delay)
+                body = json.dumps(server.payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if server.etag:
+                    self.send_header("ETag", server.etag)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except ConnectionError:
+                    pass  # client stopped reading early
+
+            def log_message(self, format, *args):
+                pass
+
+        self.payload = payload
+        self.delay = delay
+        self.etag = etag
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/api/news/breaking"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
 class TestNewsFetcher(unittest.TestCase):
-    @patch('requests.get')
-    def test_successful_fetch(self, mock_get):
+    def setUp(self):
+        news_fetcher._fetchers.clear()
+
+    def make_response(self, status_code=200, payload=None, headers=None):
         mock_response = unittest.mock.Mock()
-        mock_response.json.return_value = {
+        mock_response.status_code = status_code
+        mock_response.headers = headers or {}
+        mock_response.json.return_value = payload
+        mock_response.raise_for_status.return_value = None
+        return mock_response
+
+    @patch('requests.Session.get')
+    def test_successful_fetch(self, mock_get):
+        mock_get.return_value = self.make_response(payload={
             'news': [
                 {'title': 'Test News 1'},
                 {'title': 'Test News 2'}
             ]
-        }
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+        })
 
         news = fetch_news('https://test-endpoint.com')
         self.assertIsNotNone(news)
         self.assertEqual(len(news['news']), 2)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_failed_fetch(self, mock_get):
         mock_get.side_effect = requests.RequestException('Network error')
 
         news = fetch_news('https://test-endpoint.com')
         self.assertIsNone(news)
 
+    @patch('requests.Session.get')
+    def test_fetcher_reused_across_calls(self, mock_get):
+        mock_get.return_value = self.make_response(payload={'news': []})
+
+        fetch_news('https://test-endpoint.com')
+        fetcher = news_fetcher.get_fetcher('https://test-endpoint.com')
+        fetch_news('https://test-endpoint.com')
+
+        self.assertIs(fetcher, news_fetcher.get_fetcher('https://test-endpoint.com'))
+        self.assertEqual(len(news_fetcher._fetchers), 1)
+
+    def test_prune_fetchers_keeps_configured_endpoints(self):
+        kept = news_fetcher.get_fetcher('https://a.example')
+        news_fetcher.get_fetcher('https://b.example')
+
+        news_fetcher.prune_fetchers(['https://a.example'])
+
+        self.assertEqual(list(news_fetcher._fetchers.values()), [kept])
+
+    @patch('requests.Session.get')
+    def test_conditional_get(self, mock_get):
+        fetcher = NewsFetcher('https://test-endpoint.com')
+        mock_get.return_value = self.make_response(
+            payload={'news': [{'title': 'Test News 1'}]},
+            headers={'ETag': '"abc"', 'Last-Modified': 'Tue, 08 Oct 2024 04:10:23 GMT'},
+        )
+        fetcher.fetch()
+        self.assertEqual(mock_get.call_args.kwargs['headers'], {})
+
+        not_modified = self.make_response(status_code=304)
+        mock_get.return_value = not_modified
+        news = fetcher.fetch()
+
+        self.assertEqual(news, {'news': []})
+        not_modified.json.assert_not_called()
+        self.assertEqual(
+            mock_get.call_args.kwargs['headers'],
+            {'If-None-Match': '"abc"', 'If-Modified-Since': 'Tue, 08 Oct 2024 04:10:23 GMT'},
+        )
+
+        fetcher.reset_validators()
+        self.assertEqual(fetcher.conditional_headers(), {})
+
+    def test_merge_news_deduplicates(self):
+        first = {'news': [{'id': 1, 'title': 'A'}, {'id': 2, 'title': 'B'}]}
+        second = {'news': [{'id': 2, 'title': 'B'}, {'id': 3, 'title': 'C'}]}
+        merged = merge_news([first, second])
+        self.assertEqual([article['id'] for article in merged['news']], [1, 2, 3])
+
+    def test_concurrent_fetch_merges_endpoints(self):
+        primary = FeedServer({'news': [{'id': 1, 'title': 'A'}, {'id': 2, 'title': 'B'}]})
+        mirror = FeedServer({'news': [{'id': 2, 'title': 'B'}, {'id': 3, 'title': 'C'}]})
+        try:
+            news = fetch_news([primary.url, mirror.url])
+        finally:
+            primary.close()
+            mirror.close()
+        self.assertEqual(sorted(article['id'] for article in news['news']), [1, 2, 3])
+
+    def test_slow_mirror_does_not_delay_cycle(self):
+        fast = FeedServer({'news': [{'id': 1, 'title': 'A'}]})
+        slow = FeedServer({'news': [{'id': 2, 'title': 'B'}]}, delay=3)
+        executor = ThreadPoolExecutor()
+        try:
+            with patch('news_fetcher._executor', executor):
+                started = time.monotonic()
+                news = fetch_news([fast.url, slow.url], endpoint_timeout=5)
+                elapsed = time.monotonic() - started
+        finally:
+            # Let the abandoned request finish before the servers go away
+            executor.shutdown(wait=True)
+            fast.close()
+            slow.close()
+        self.assertLess(elapsed, 2.5)
+        self.assertEqual([article['id'] for article in news['news']], [1])
+
+    def test_abandoned_mirror_keeps_no_validators(self):
+        fast = FeedServer({'news': [{'id': 1, 'title': 'A'}]})
+        slow = FeedServer({'news': [{'id': 2, 'title': 'B'}]}, delay=1.5, etag='"v1"')
+        executor = ThreadPoolExecutor()
+        try:
+            with patch('news_fetcher._executor', executor):
+                asyncio.run(fetch_news_async([fast.url, slow.url], grace_period=0.1))
+            executor.shutdown(wait=True)
+        finally:
+            fast.close()
+            slow.close()
+        # The mirror answered after its articles were dropped, so its next
+        # request must not be conditional on that response
+        slow_fetcher = news_fetcher.get_fetcher(slow.url)
+        self.assertIsNone(slow_fetcher.etag)
+        self.assertEqual(slow_fetcher.conditional_headers(), {})
+
+    @patch('requests.Session.get')
+    def test_all_endpoints_failing(self, mock_get):
+        mock_get.side_effect = requests.RequestException('Network error')
+        news = fetch_news(['https://a.test', 'https://b.test'])
+        self.assertIsNone(news)
+
+    def test_iter_json_array_across_chunk_boundaries(self):
+        payload = json.dumps({
+            'last_updated': 12345,
+            'meta': {'note': '"news": [ignored]'},
+            'news': [{'id': i, 'title': f'Article {i} \u00e9'} for i in range(20)],
+        })
+        chunks = [payload[i:i + 7] for i in range(0, len(payload), 7)]
+        articles = list(iter_json_array(chunks, 'news'))
+        self.assertEqual([article['id'] for article in articles], list(range(20)))
+        self.assertEqual(articles[3]['title'], 'Article 3 \u00e9')
+
+    def test_streaming_fetch_keeps_only_new_articles(self):
+        created = ["2024-10-08 04:10:23.613Z", "2024-10-08 04:00:00.000Z", "2024-10-08 03:00:00.000Z"]
+        server = FeedServer({'news': [{'id': i, 'created': c} for i, c in enumerate(created)]})
+        since = datetime(2024, 10, 8, 3, 30, tzinfo=timezone.utc)
+        try:
+            news = fetch_news(server.url, since=since)
+        finally:
+            server.close()
+        self.assertEqual([article['id'] for article in news['news']], [0, 1])
+
+    def test_streaming_fetch_stops_at_watermark(self):
+        since = datetime(2024, 10, 8, 3, 30, tzinfo=timezone.utc)
+        old_articles = ({'id': i, 'created': "2024-10-08 03:00:00.000Z"} for i in range(1, 10000))
+
+        def chunks():
+            yield b'{"news": [{"id": 0, "created": "2024-10-08 04:10:23.613Z"}'
+            for article in old_articles:
+                yield b', ' + json.dumps(article).encode()
+            yield b']}'
+
+        response = unittest.mock.MagicMock()
+        response.status_code = 200
+        response.encoding = 'utf-8'
+        response.headers = {}
+        response.iter_content.return_value = chunks()
+        response.__enter__.return_value = response
+
+        with patch('requests.Session.get', return_value=response):
+            news = NewsFetcher('https://test-endpoint.com').fetch(since, newest_first=True)
+
+        self.assertEqual([article['id'] for article in news['news']], [0])
+        # Reading stopped right after the first already-processed article
+        self.assertGreater(len(list(old_articles)), 9990)
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
-from news_processor import filter_news, extract_symbols
+import news_processor
+from news_processor import filter_news, extract_symbols, get_article_filter, ArticleFilter
 
 class TestNewsProcessor(unittest.TestCase):
     def setUp(self):
@@ -95,5 +96,64 @@ class TestNewsProcessor(unittest.TestCase):
         symbols = extract_symbols(article, quote_currencies)
         self.assertEqual(symbols, {'BTC', 'ORN', 'LUMIA'})
 
+    def test_quote_currency_requires_exact_match(self):
+        config = {
+            'news_monitoring': {
+                'categories': [],
+                'quote_currencies': ['USD']
+            }
+        }
+        news = {
+            'news': [
+                {'category': 'DELISTING', 'title': 'A', 'trading_pairs': ['ABC/USDT', 'ABCUSDT']},
+                {'category': 'DELISTING', 'title': 'B', 'trading_pairs': ['ABCUSD']},
+                {'category': 'DELISTING', 'title': 'C', 'trading_pairs': ['ABC/USD']},
+            ]
+        }
+        filtered_news = filter_news(news, config)
+        self.assertEqual([article['title'] for article in filtered_news], ['B', 'C'])
+
+    def test_pair_quote(self):
+        article_filter = ArticleFilter([], ['USDT', 'USD'])
+        self.assertEqual(article_filter.pair_quote('XMR/USDT'), 'USDT')
+        self.assertEqual(article_filter.pair_quote('XMR/USDT:USDT'), 'USDT')
+        self.assertEqual(article_filter.pair_quote('PEPE-USDT-SWAP'), 'USDT')
+        self.assertEqual(article_filter.pair_quote('BTCUSD'), 'USD')
+        self.assertEqual(article_filter.pair_quote('TUSDUSDT'), 'USDT')
+        self.assertEqual(article_filter.pair_quote('XMREUR'), 'EUR')
+
+        # Slash-less pairs are split after the article's base symbol
+        article_filter = ArticleFilter(['DELISTING'], ['USDT', 'USDC', 'USD'])
+        for pair, base in (('DOTUSD', 'DOT'), ('FETUSD', 'FET'), ('BATUSD', 'BAT')):
+            self.assertEqual(article_filter.pair_quote(pair, (base,)), 'USD')
+        for pair, base, quote in (('BTCFDUSD', 'BTC', 'FDUSD'), ('ETHBUSD', 'ETH', 'BUSD'), ('XRPTUSD', 'XRP', 'TUSD')):
+            self.assertEqual(article_filter.pair_quote(pair, (base,)), quote)
+            self.assertFalse(article_filter.matches({'category': 'DELISTING', 'symbols': base, 'trading_pairs': [pair]}))
+        self.assertTrue(
+            article_filter.matches({'category': 'DELISTING', 'symbols': 'DOT', 'trading_pairs': ['DOTUSD']})
+        )
+        # Without a matching base the longest known quote is taken
+        self.assertEqual(article_filter.pair_quote('BTCFDUSD'), 'FDUSD')
+        self.assertEqual(article_filter.pair_quote('BTCDOMUSDT', ('BTC',)), 'USDT')
+
+    def test_article_filters_cached_per_setting(self):
+        news_processor._filters.clear()
+        fleet_a = {'news_monitoring': {'categories': ['DELISTING'], 'quote_currencies': ['USDT']}}
+        fleet_b = {'news_monitoring': {'categories': ['DELISTING'], 'quote_currencies': ['USDC']}}
+        filter_a = get_article_filter(fleet_a)
+        filter_b = get_article_filter(fleet_b)
+        self.assertIs(get_article_filter(fleet_a), filter_a)
+        self.assertIs(get_article_filter(fleet_b), filter_b)
+
+        for i in range(news_processor.MAX_ARTICLE_FILTERS):
+            get_article_filter({'news_monitoring': {'categories': [str(i)], 'quote_currencies': []}})
+        self.assertEqual(len(news_processor._filters), news_processor.MAX_ARTICLE_FILTERS)
+        self.assertIsNot(get_article_filter(fleet_a), filter_a)
+
+    def test_batch_filter(self):
+        article_filter = ArticleFilter(['DELISTING', 'TOKEN_SWAP'], ['USDT'])
+        filtered_news = article_filter.filter(self.sample_news['news'])
+        self.assertEqual([article['symbols'] for article in filtered_news], ['XEM,WAVES', 'XMR', 'BTC,USDT'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -2,7 +2,19 @@ import unittest
 import json
 import tempfile
 import os
-from passivbot_config_updater import update_passivbot_configs
+import shutil
+import subprocess
+from unittest.mock import patch, MagicMock
+import metrics
+from passivbot_config_updater import (
+    PassivbotConfigCache,
+    build_coin_index,
+    normalize_symbol,
+    restart_passivbot_instances,
+    update_passivbot_configs,
+    update_single_config,
+    write_json_atomic,
+)
 
 
 class TestPassivbotConfigUpdater(unittest.TestCase):
@@ -19,8 +31,35 @@ class TestPassivbotConfigUpdater(unittest.TestCase):
             json.dump(self.sample_config, f)
 
     def tearDown(self):
-        os.remove(self.config_path)
-        os.rmdir(self.temp_dir)
+        shutil.rmtree(self.temp_dir)
+
+    def make_config(self, approved_coins, ignored_coins=None, name="bot.json"):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w") as f:
+            json.dump({"live": {"approved_coins": approved_coins, "ignored_coins": ignored_coins or []}}, f)
+        return path
+
+    @patch("passivbot_config_updater.restart_passivbot_instances")
+    def test_write_metrics(self, mock_restart):
+        config = {
+            "passivbot": {
+                "passivbot_config_files": [{"config_file": self.config_path}],
+                "trading_quote_currency": "USDT",
+                "symbol_exclusion_strategy": {"remove_from_approved_coins": True, "add_to_ignored_coins": False},
+            }
+        }
+        articles = [
+            {"symbols": "XRP", "created": "2024-10-08 04:10:23.613Z"},
+            # Listed in no config file, so excluding it changed nothing
+            {"symbols": "DOGE", "created": "2024-10-01 04:10:23.613Z"},
+        ]
+        writes = metrics.CONFIG_WRITES.value()
+        lags = metrics.EXCLUSION_LAG_SECONDS.count()
+
+        update_passivbot_configs(articles, config, {"XRP", "DOGE"})
+
+        self.assertEqual(metrics.CONFIG_WRITES.value(), writes + 1)
+        self.assertEqual(metrics.EXCLUSION_LAG_SECONDS.count(), lags + 1)
 
     def test_remove_from_approved_coins(self):
         news_articles = [{"symbols": "XRP,ADA", "category": "DELISTING"}]
@@ -85,6 +124,242 @@ class TestPassivbotConfigUpdater(unittest.TestCase):
             len(updated_config["live"]["approved_coins"]), 4
         )  # No change in approved coins
 
+    def test_normalize_symbol(self):
+        self.assertEqual(normalize_symbol("USDCUSDT", "USDT"), "USDC")
+        self.assertEqual(normalize_symbol("TUSDUSDT", "USDT"), "TUSD")
+        self.assertEqual(normalize_symbol("1000PEPEUSDT", "USDT"), "PEPE")
+        self.assertEqual(normalize_symbol("1000000MOGUSDT", "USDT"), "MOG")
+        self.assertEqual(normalize_symbol("1MBABYDOGEUSDT", "USDT"), "BABYDOGE")
+        self.assertEqual(normalize_symbol("kPEPE"), "PEPE")
+        self.assertEqual(normalize_symbol("KAVAUSDT", "USDT"), "KAVA")
+        self.assertEqual(normalize_symbol("1INCHUSDT", "USDT"), "1INCH")
+        self.assertEqual(normalize_symbol("PEPE/USDT:USDT"), "PEPE")
+        self.assertEqual(normalize_symbol("PEPE-USDT-SWAP"), "PEPE")
+
+    def test_build_coin_index(self):
+        index = build_coin_index(["1000PEPEUSDT", "PEPE/USDT:USDT", "BTCUSDT"], "USDT")
+        self.assertEqual(index["PEPE"], ["1000PEPEUSDT", "PEPE/USDT:USDT"])
+        self.assertEqual(index["BTC"], ["BTCUSDT"])
+
+    def test_exclusion_matches_exact_base(self):
+        approved = ["USDCUSDT", "TUSDUSDT", "1000PEPEUSDT", "BTCUSDT"]
+        with open(self.config_path, "w") as f:
+            json.dump({"live": {"approved_coins": approved, "ignored_coins": []}}, f)
+        strategy = {"remove_from_approved_coins": True, "add_to_ignored_coins": True}
+
+        changed = update_single_config(self.config_path, {"USDC", "PEPE"}, strategy, "USDT")
+
+        with open(self.config_path, "r") as f:
+            updated_config = json.load(f)
+        self.assertTrue(changed)
+        self.assertEqual(updated_config["live"]["approved_coins"], ["TUSDUSDT", "BTCUSDT"])
+        self.assertCountEqual(updated_config["live"]["ignored_coins"], ["USDCUSDT", "1000PEPEUSDT"])
+
+        self.assertFalse(update_single_config(self.config_path, {"USDC", "PEPE"}, strategy, "USDT"))
+
+    def test_config_cache_reuses_parsed_file(self):
+        cache = PassivbotConfigCache()
+        with patch("passivbot_config_updater.json.load", wraps=json.load) as mock_load:
+            first = cache.get(self.config_path)
+            second = cache.get(self.config_path)
+            self.assertIs(first, second)
+            self.assertEqual(mock_load.call_count, 1)
+
+            with open(self.config_path, "w") as f:
+                json.dump({"live": {"approved_coins": ["BTCUSDT"], "ignored_coins": []}}, f)
+            third = cache.get(self.config_path)
+            self.assertEqual(mock_load.call_count, 2)
+            self.assertEqual(third.config["live"]["approved_coins"], ["BTCUSDT"])
+
+        os.remove(self.config_path)
+        self.assertIsNone(cache.get(self.config_path))
+
+    def test_reverse_index_selects_affected_files(self):
+        xrp_bot = self.make_config(["XRPUSDT", "BTCUSDT"], name="xrp.json")
+        eth_bot = self.make_config(["ETHUSDT"], ["XRPUSDT"], name="eth.json")
+        cache = PassivbotConfigCache()
+        quotes = {xrp_bot: "USDT", eth_bot: "USDT"}
+        cache.refresh_index(quotes)
+
+        remove = {"remove_from_approved_coins": True, "add_to_ignored_coins": False}
+        ignore = {"remove_from_approved_coins": False, "add_to_ignored_coins": True}
+        self.assertEqual(cache.files_to_update(quotes, {"XRP"}, remove), {xrp_bot})
+        self.assertEqual(cache.files_to_update(quotes, {"XRP"}, ignore), {xrp_bot})
+        self.assertEqual(cache.files_to_update(quotes, {"ADA"}, remove), set())
+
+        self.make_config(["ETHUSDT", "ADAUSDT"], ["XRPUSDT"], name="eth.json")
+        cache.refresh_index(quotes)
+        self.assertEqual(cache.files_to_update(quotes, {"ADA"}, remove), {eth_bot})
+        self.assertEqual(cache.files_to_update(quotes, {"XRP"}, remove), {xrp_bot})
+
+    def test_reverse_index_kept_for_each_fleet(self):
+        fleet_a = {self.make_config(["XRPUSDT"], name="a.json"): "USDT"}
+        fleet_b = {self.make_config(["XRPUSDT"], name="b.json"): "USDT"}
+        cache = PassivbotConfigCache()
+        remove = {"remove_from_approved_coins": True, "add_to_ignored_coins": False}
+
+        cache.refresh_index(fleet_a)
+        cache.refresh_index(fleet_b)
+        self.assertEqual(set(cache.indexed), set(fleet_a) | set(fleet_b))
+        self.assertEqual(cache.files_to_update(fleet_a, {"XRP"}, remove), set(fleet_a))
+        self.assertEqual(cache.files_to_update(fleet_b, {"XRP"}, remove), set(fleet_b))
+
+        cache.prune_index(fleet_b)
+        self.assertEqual(set(cache.indexed), set(fleet_b))
+        self.assertEqual(cache.approved_files, {"XRP": set(fleet_b)})
+
+    def test_unaffected_files_are_not_touched(self):
+        untouched = self.make_config(["BTCUSDT"], name="untouched.json")
+        config = {
+            "passivbot": {
+                "passivbot_config_files": [{"config_file": self.config_path}, {"config_file": untouched}],
+                "trading_quote_currency": "USDT",
+                "symbol_exclusion_strategy": {
+                    "remove_from_approved_coins": True,
+                    "add_to_ignored_coins": False,
+                },
+            }
+        }
+        with patch("passivbot_config_updater.update_single_config", return_value=set()) as mock_update:
+            update_passivbot_configs([], config, {"XRP"})
+
+        mock_update.assert_called_once()
+        self.assertEqual(mock_update.call_args.args[0], self.config_path)
+
+    def test_write_json_atomic(self):
+        os.chmod(self.config_path, 0o640)
+        write_json_atomic(self.config_path, {"live": {"approved_coins": ["BTCUSDT"]}})
+
+        with open(self.config_path, "r") as f:
+            self.assertEqual(json.load(f), {"live": {"approved_coins": ["BTCUSDT"]}})
+        self.assertEqual(os.stat(self.config_path).st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(self.temp_dir), ["test_config.json"])
+
+    def test_failed_write_keeps_original(self):
+        with open(self.config_path, "r") as f:
+            original = f.read()
+        with self.assertRaises(TypeError):
+            write_json_atomic(self.config_path, {"live": {"approved_coins": {object()}}})
+
+        with open(self.config_path, "r") as f:
+            self.assertEqual(f.read(), original)
+        self.assertEqual(os.listdir(self.temp_dir), ["test_config.json"])
+
+    def test_updates_many_files_in_parallel(self):
+        paths = [self.make_config(["XRPUSDT", f"COIN{i}USDT"], name=f"bot_{i}.json") for i in range(12)]
+        config = {
+            "passivbot": {
+                "passivbot_config_files": [{"config_file": path} for path in paths],
+                "trading_quote_currency": "USDT",
+                "symbol_exclusion_strategy": {
+                    "remove_from_approved_coins": True,
+                    "add_to_ignored_coins": True,
+                },
+            }
+        }
+        with patch("passivbot_config_updater.restart_passivbot_instances") as mock_restart:
+            update_passivbot_configs([], config, {"XRP"})
+
+        mock_restart.assert_called_once()
+        for i, path in enumerate(paths):
+            with open(path, "r") as f:
+                live = json.load(f)["live"]
+            self.assertEqual(live["approved_coins"], [f"COIN{i}USDT"])
+            self.assertEqual(live["ignored_coins"], ["XRPUSDT"])
+
+    def restart_config(self, tmux_config_file, restart_scope="pane"):
+        return {
+            "passivbot": {
+                "tmuxp": {
+                    "tmux_config_file": tmux_config_file,
+                    "tmux_session_name": "passivbot_instances",
+                    "stop_command": "dummy_stop",
+                    "start_command": "dummy_start",
+                    "restart_scope": restart_scope,
+                },
+            }
+        }
+
+    @patch("passivbot_config_updater.restart_passivbot_instances")
+    def test_restart_handed_to_scheduler(self, mock_restart):
+        config = {
+            "passivbot": {
+                "passivbot_config_files": [{"config_file": self.config_path}],
+                "trading_quote_currency": "USDT",
+                "symbol_exclusion_strategy": {
+                    "remove_from_approved_coins": True,
+                    "add_to_ignored_coins": False,
+                },
+            }
+        }
+        scheduler = MagicMock()
+
+        changed_files = update_passivbot_configs([], config, {"XRP"}, scheduler)
+
+        self.assertEqual(changed_files, [self.config_path])
+        scheduler.request.assert_called_once_with([self.config_path])
+        mock_restart.assert_not_called()
+
+    @patch("passivbot_config_updater.run_command")
+    @patch("passivbot_config_updater.respawn_pane")
+    def test_restart_only_changed_panes(self, mock_respawn, mock_run):
+        tmux_config = os.path.join(self.temp_dir, "tmux.yml")
+        with open(tmux_config, "w") as f:
+            f.write(
+                "session_name: passivbot_instances\n"
+                "windows:\n"
+                "- window_name: bots\n"
+                f"  shell_command_before: cd {self.temp_dir}\n"
+                "  panes:\n"
+                "    - python3 src/passivbot.py other.json\n"
+                "    - python3 src/passivbot.py test_config.json\n"
+            )
+
+        restart_passivbot_instances(self.restart_config(tmux_config), [self.config_path])
+
+        mock_respawn.assert_called_once()
+        self.assertEqual(mock_respawn.call_args.args[1].pane_position, 1)
+        mock_run.assert_not_called()
+
+    @patch("passivbot_config_updater.run_command")
+    @patch("passivbot_config_updater.respawn_pane")
+    def test_restart_falls_back_to_session(self, mock_respawn, mock_run):
+        restart_passivbot_instances(self.restart_config("missing.yml"), [self.config_path])
+        mock_respawn.assert_not_called()
+        self.assertEqual([call.args[0] for call in mock_run.call_args_list], ["dummy_stop", "dummy_start"])
+
+        mock_run.reset_mock()
+        restart_passivbot_instances(self.restart_config("missing.yml", "session"), [self.config_path])
+        self.assertEqual([call.args[0] for call in mock_run.call_args_list], ["dummy_stop", "dummy_start"])
+
+    @patch("passivbot_config_updater.run_command", side_effect=subprocess.TimeoutExpired("dummy_stop", 120))
+    @patch("passivbot_config_updater.respawn_pane", side_effect=subprocess.TimeoutExpired("respawn-pane", 120))
+    def test_restart_timeout_fails_cleanly(self, mock_respawn, mock_run):
+        tmux_config = os.path.join(self.temp_dir, "tmux.yml")
+        with open(tmux_config, "w") as f:
+            f.write(
+                "session_name: passivbot_instances\n"
+                "windows:\n"
+                "- window_name: bots\n"
+                f"  shell_command_before: cd {self.temp_dir}\n"
+                "  panes:\n"
+                "    - python3 src/passivbot.py test_config.json\n"
+            )
+        config = self.restart_config(tmux_config)
+        config["passivbot"].update({
+            "passivbot_config_files": [{"config_file": self.config_path}],
+            "trading_quote_currency": "USDT",
+            "symbol_exclusion_strategy": {"remove_from_approved_coins": True, "add_to_ignored_coins": False},
+        })
+
+        with self.assertLogs("SymbolScout", level="ERROR") as logs:
+            changed_files = update_passivbot_configs([], config, {"XRP"})
+
+        self.assertEqual(changed_files, [self.config_path])
+        mock_respawn.assert_called_once()
+        self.assertEqual([call.args[0] for call in mock_run.call_args_list], ["dummy_stop"])
+        self.assertTrue(any("were not restarted" in line for line in logs.output))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from datetime import datetime, timezone
+from poll_scheduler import SCRAPE_PUBLISH_DELAY, PollScheduler
+
+
+def article_at(timestamp):
+    created = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return {"created": created.strftime("%Y-%m-%d %H:%M:%S.") + f"{created.microsecond // 1000:03d}Z"}
+
+
+class TestPollScheduler(unittest.TestCase):
+    def setUp(self):
+        self.start = datetime(2024, 10, 8, tzinfo=timezone.utc).timestamp()
+
+    def test_fixed_interval_until_phase_is_known(self):
+        scheduler = PollScheduler(600, clock=lambda: self.start)
+        self.assertEqual(scheduler.seconds_until_due(), 0)
+        self.assertIsNone(scheduler.phase())
+        self.assertEqual(scheduler.schedule_next(), self.start + 600)
+        self.assertEqual(scheduler.seconds_until_due(), 600)
+
+    def test_polls_align_with_learned_scrape_phase(self):
+        scheduler = PollScheduler(600)
+        # Scrapes publish around 02:00 past every ten-minute mark, give or take a few seconds
+        scheduler.observe([article_at(self.start + n * 600 + 120 + (n % 3) * 5) for n in range(10)])
+        self.assertAlmostEqual(scheduler.phase(), 125, delta=1)
+
+        scheduler.observe([])
+        now = self.start + 7 * 600 + 400
+        next_poll = scheduler.schedule_next(now)
+        self.assertAlmostEqual(next_poll, self.start + 8 * 600 + 125 + SCRAPE_PUBLISH_DELAY, delta=1)
+        self.assertGreater(next_poll, now)
+
+    def test_scattered_timestamps_are_not_aligned(self):
+        scheduler = PollScheduler(600)
+        scheduler.observe([article_at(self.start + n * 137) for n in range(20)])
+        self.assertIsNone(scheduler.phase())
+
+    def test_faster_while_news_flows_and_back_off_when_quiet(self):
+        scheduler = PollScheduler(600, min_interval=120, max_interval=1800)
+        scheduler.observe([article_at(self.start)])
+        self.assertEqual(scheduler.interval, 120)
+
+        intervals = []
+        for _ in range(5):
+            scheduler.observe([])
+            intervals.append(scheduler.interval)
+        self.assertEqual(intervals, [240, 480, 960, 1800, 1800])
+
+    def test_defaults_never_slower_than_check_interval(self):
+        scheduler = PollScheduler.from_config({"check_interval": 600})
+        self.assertEqual((scheduler.min_interval, scheduler.max_interval), (300, 600))
+        for _ in range(3):
+            scheduler.observe([])
+        self.assertEqual(scheduler.interval, 600)
+
+        scheduler.reconfigure({"check_interval": 600, "adaptive_polling": False})
+        scheduler.observe([article_at(self.start)])
+        self.assertEqual(scheduler.interval, 600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import http.client
+import os
+import select
+import tempfile
+import unittest
+from unittest.mock import patch
+import requests
+import main
+from push_listener import PushListener
+from state_manager import ProcessedArticleStore
+
+ARTICLE = {
+    "id": 7,
+    "title": "Binance Will Delist XRP",
+    "category": "DELISTING",
+    "symbols": "XRP",
+    "trading_pairs": ["XRPUSDT"],
+    "created": "2024-10-08 04:10:23.613Z",
+    "link": "https://test.com/news/xrp-delisting",
+}
+
+CONFIG = {
+    "news_monitoring": {"categories": ["DELISTING"], "quote_currencies": ["USDT"]},
+    "passivbot": {},
+}
+
+
+class TestPushListener(unittest.TestCase):
+    def make_listener(self, **kwargs):
+        listener = PushListener(port=0, **kwargs)
+        listener.start()
+        self.addCleanup(listener.close)
+        return listener
+
+    def test_pushed_articles_wake_the_main_loop(self):
+        listener = self.make_listener()
+        self.assertIsNone(listener.drain())
+
+        response = requests.post(listener.address, json={"news": [ARTICLE]})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {"accepted": 1})
+        requests.post(listener.address, json=dict(ARTICLE, id=8))
+
+        readable, _, _ = select.select([listener.fileno()], [], [], 5)
+        self.assertEqual(readable, [listener.fileno()])
+        self.assertEqual([article["id"] for article in listener.drain()["news"]], [7, 8])
+        self.assertIsNone(listener.drain())
+
+    def test_rejected_requests(self):
+        listener = self.make_listener(token="secret")
+        headers = {"Authorization": "Bearer secret"}
+
+        self.assertEqual(requests.post(listener.address, json=ARTICLE).status_code, 401)
+        self.assertEqual(
+            requests.post(listener.address, json=ARTICLE, headers={"Authorization": "Bearer wrong"}).status_code, 401
+        )
+        self.assertEqual(requests.post(listener.address + "x", json=ARTICLE, headers=headers).status_code, 404)
+        response = requests.post(listener.address, json={"title": "no timestamp"}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("created", response.json()["error"])
+        response = requests.post(
+            listener.address, json={key: value for key, value in ARTICLE.items() if key != "symbols"}, headers=headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("symbols", response.json()["error"])
+        self.assertEqual(requests.post(listener.address, data="{", headers=headers).status_code, 400)
+        for field, value in (
+            ("created", 1.5), ("created", [1]), ("created", True),
+            ("category", ["DELISTING"]), ("symbols", 7), ("symbols", [7]), ("trading_pairs", "XRPUSDT"),
+        ):
+            response = requests.post(listener.address, json=dict(ARTICLE, **{field: value}), headers=headers)
+            self.assertEqual(response.status_code, 400, (field, value))
+            self.assertIn(field, response.json()["error"])
+        self.assertIsNone(listener.drain())
+
+        self.assertEqual(requests.post(listener.address, json=[ARTICLE], headers=headers).status_code, 202)
+        self.assertEqual(len(listener.drain()["news"]), 1)
+
+    def test_invalid_content_length(self):
+        listener = self.make_listener()
+        for length in ("-1", "abc"):
+            connection = http.client.HTTPConnection("127.0.0.1", listener.server.server_port, timeout=5)
+            self.addCleanup(connection.close)
+            connection.putrequest("POST", listener.path)
+            connection.putheader("Content-Length", length)
+            connection.endheaders()
+            self.assertEqual(connection.getresponse().status, 400)
+        self.assertIsNone(listener.drain())
+
+    def test_from_config(self):
+        self.assertIsNone(PushListener.from_config({}))
+        listener = PushListener.from_config({"push": {"port": 0, "path": "/hook"}})
+        self.addCleanup(listener.close)
+        self.assertTrue(listener.address.endswith("/hook"))
+
+
+class TestPushedNewsPipeline(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.store = ProcessedArticleStore(os.path.join(temp_dir.name, "processed.db"), legacy_state_file=None)
+        self.addCleanup(self.store.close)
+
+    @patch("main.update_passivbot_configs")
+    def test_pushed_article_is_processed_once(self, mock_update_configs):
+        listener = PushListener(port=0)
+        listener.start()
+        self.addCleanup(listener.close)
+        requests.post(listener.address, json=ARTICLE)
+
+        with patch("main.get_article_store", return_value=self.store):
+            self.assertTrue(main.process_pushed_news(listener.drain(), CONFIG))
+            mock_update_configs.assert_called_once()
+            self.assertIn("XRP", mock_update_configs.call_args.args[2])
+
+            # The reconciliation poll sees the same article and skips it
+            main.process_articles({"news": [ARTICLE]}, CONFIG, self.store)
+            mock_update_configs.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import replay
+
+
+def article(id, title, category, symbols, created):
+    return {
+        "id": id,
+        "title": title,
+        "category": category,
+        "symbols": symbols,
+        "trading_pairs": [f"{symbols}USDT"],
+        "created": created,
+        "link": f"https://test.com/news/{id}",
+    }
+
+
+XRP_DELISTING = article(1, "Binance Will Delist XRP", "DELISTING", "XRP", "2024-10-08 04:10:23.613Z")
+ADA_LISTING = article(2, "Binance Will List ADA", "LISTING", "ADA", "2024-10-08 04:12:00.000Z")
+ETH_DELISTING = article(3, "Binance Will Delist ETH", "DELISTING", "ETH", "2024-10-08 05:30:00.000Z")
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.bot_config_path = os.path.join(self.temp_dir, "bot.json")
+        self.bot_config = {
+            "live": {"approved_coins": ["BTCUSDT", "ETHUSDT", "XRPUSDT", "ADAUSDT"], "ignored_coins": []}
+        }
+        with open(self.bot_config_path, "w") as f:
+            json.dump(self.bot_config, f)
+        self.config = {
+            "news_monitoring": {"categories": ["DELISTING"], "quote_currencies": ["USDT"]},
+            "passivbot": {
+                "trading_quote_currency": "USDT",
+                "symbol_exclusion_strategy": {"remove_from_approved_coins": True, "add_to_ignored_coins": True},
+                "passivbot_config_files": [{"config_file": self.bot_config_path}],
+            },
+        }
+
+    def write(self, name, lines):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w") as f:
+            f.write("\n".join(json.dumps(line) for line in lines))
+        return path
+
+    def test_loose_articles_are_batched_by_interval(self):
+        path = self.write("archive.jsonl", [ETH_DELISTING, XRP_DELISTING, ADA_LISTING])
+
+        batches = replay.load_batches([path], interval=600)
+
+        self.assertEqual([[a["id"] for a in batch] for _, batch in batches], [[1, 2], [3]])
+        self.assertLess(batches[0][0], batches[1][0])
+
+    def test_snapshots_are_replayed_as_recorded(self):
+        os.makedirs(os.path.join(self.temp_dir, "snapshots"))
+        self.write("snapshots/2.json", [{"news": [ETH_DELISTING, XRP_DELISTING]}])
+        self.write("snapshots/1.json", [{"news": [XRP_DELISTING]}])
+        self.write("snapshots/notes.txt", ["ignored"])
+
+        batches = replay.load_batches([os.path.join(self.temp_dir, "snapshots")])
+
+        self.assertEqual([[a["id"] for a in batch] for _, batch in batches], [[1], [3, 1]])
+
+    @patch("passivbot_config_updater.restart_passivbot_instances")
+    def test_replay_reports_exclusions_without_touching_configs(self, mock_restart):
+        batches = replay.load_batches([self.write("archive.jsonl", [XRP_DELISTING, ADA_LISTING, ETH_DELISTING])])
+
+        report = replay.replay(batches, self.config)
+
+        self.assertEqual(report["articles"], 3)
+        self.assertEqual(report["new_articles"], 3)
+        self.assertEqual(report["matching_articles"], 2)
+        self.assertEqual(report["restart_requests"], 2)
+        self.assertEqual(report["restarted_configs"], [self.bot_config_path])
+        changes = report["exclusions"][self.bot_config_path]
+        self.assertEqual(changes["removed_from_approved_coins"], ["ETHUSDT", "XRPUSDT"])
+        self.assertIn("XRPUSDT", changes["added_to_ignored_coins"])
+        self.assertIn("ETHUSDT", changes["added_to_ignored_coins"])
+        mock_restart.assert_not_called()
+        with open(self.bot_config_path) as f:
+            self.assertEqual(json.load(f), self.bot_config)
+
+    @patch("replay.time.sleep")
+    def test_speed_scales_the_recorded_gaps(self, mock_sleep):
+        batches = [(1000, [XRP_DELISTING]), (1600, [ETH_DELISTING])]
+
+        replay.replay(batches, self.config, speed=60)
+
+        mock_sleep.assert_called_once_with(10)
+
+
+if __name__ == "__main__":
+    unittest.main()
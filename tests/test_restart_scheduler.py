@@ -0,0 +1,228 @@
+import subprocess
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from restart_scheduler import RESTART_RETRY_SECONDS, FleetRestartSchedulers, RestartExecutor, RestartJob, RestartScheduler
+from tmux_manager import run_command
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRestartScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.restart = MagicMock(side_effect=lambda config, files: files)
+        self.config = {"passivbot": {}}
+
+    def make_scheduler(self, debounce_seconds=0, min_interval_seconds=0):
+        return RestartScheduler(
+            self.restart,
+            debounce_seconds=debounce_seconds,
+            min_interval_seconds=min_interval_seconds,
+            clock=self.clock,
+        )
+
+    def test_immediate_restart_without_debounce(self):
+        scheduler = self.make_scheduler()
+        scheduler.request(["a.json"])
+        self.assertEqual(scheduler.run_due(self.config), ["a.json"])
+        self.restart.assert_called_once_with(self.config, ["a.json"])
+
+    def test_changes_within_window_are_coalesced(self):
+        scheduler = self.make_scheduler(debounce_seconds=60)
+        scheduler.request(["a.json"])
+        self.clock.now += 30
+        scheduler.request(["b.json", "a.json"])
+        self.assertEqual(scheduler.run_due(self.config), [])
+        self.assertEqual(scheduler.seconds_until_due(), 30)
+
+        self.clock.now += 30
+        self.assertEqual(sorted(scheduler.run_due(self.config)), ["a.json", "b.json"])
+        self.restart.assert_called_once()
+        self.assertEqual(scheduler.stats(), {"pending": 0, "in_flight": 0, "requested": 3, "executed": 1, "failed": 0})
+        self.assertIsNone(scheduler.seconds_until_due())
+
+    def test_minimum_interval_per_instance(self):
+        scheduler = self.make_scheduler(min_interval_seconds=300)
+        scheduler.request(["a.json"])
+        scheduler.run_due(self.config)
+
+        self.clock.now += 100
+        scheduler.request(["a.json", "b.json"])
+        self.assertEqual(scheduler.run_due(self.config), ["b.json"])
+        self.assertEqual(scheduler.stats()["pending"], 1)
+        self.assertEqual(scheduler.seconds_until_due(), 200)
+
+        self.clock.now += 200
+        self.assertEqual(scheduler.run_due(self.config), ["a.json"])
+        self.assertEqual(scheduler.stats(), {"pending": 0, "in_flight": 0, "requested": 3, "executed": 3, "failed": 0})
+
+    def test_failed_restart_is_retried(self):
+        self.restart.side_effect = lambda config, files: []
+        scheduler = self.make_scheduler(min_interval_seconds=30)
+        scheduler.request(["a.json"])
+        self.assertEqual(scheduler.run_due(self.config), [])
+        self.assertEqual(scheduler.stats(), {"pending": 1, "in_flight": 0, "requested": 1, "executed": 0, "failed": 1})
+        self.assertEqual(scheduler.seconds_until_due(), RESTART_RETRY_SECONDS)
+
+        self.clock.now += RESTART_RETRY_SECONDS
+        self.restart.side_effect = lambda config, files: files
+        self.assertEqual(scheduler.run_due(self.config), ["a.json"])
+        self.assertEqual(scheduler.stats(), {"pending": 0, "in_flight": 0, "requested": 1, "executed": 1, "failed": 1})
+
+    def test_from_config(self):
+        scheduler = RestartScheduler.from_config(
+            self.restart,
+            {"passivbot": {"restart_debounce_seconds": 60, "restart_min_interval_seconds": 300}},
+        )
+        self.assertEqual(scheduler.debounce_seconds, 60)
+        self.assertEqual(scheduler.min_interval_seconds, 300)
+
+    def test_restart_handed_to_executor(self):
+        restart = MagicMock(side_effect=lambda config, files, job: files)
+        executor = RestartExecutor(restart)
+        scheduler = RestartScheduler(restart, min_interval_seconds=300, clock=self.clock, executor=executor)
+
+        scheduler.request(["a.json"])
+        self.assertEqual(scheduler.run_due(self.config), ["a.json"])
+        executor.shutdown()
+
+        restart.assert_called_once()
+        self.assertEqual(restart.call_args.args[:2], (self.config, ["a.json"]))
+        self.assertEqual(scheduler.stats()["in_flight"], 0)
+        self.assertEqual(scheduler.last_restart, {"a.json": self.clock.now})
+
+    def test_in_flight_instances_are_not_due(self):
+        release = threading.Event()
+        restart = MagicMock(side_effect=lambda config, files, job: release.wait(5) and files)
+        executor = RestartExecutor(restart)
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(release.set)
+        scheduler = RestartScheduler(restart, clock=self.clock, executor=executor)
+
+        scheduler.request(["a.json"])
+        scheduler.run_due(self.config)
+        # Changed again while its restart is still running
+        scheduler.request(["a.json"])
+        self.assertIsNone(scheduler.seconds_until_due())
+        self.assertEqual(scheduler.run_due(self.config), [])
+
+        scheduler.request(["b.json"])
+        self.assertEqual(scheduler.seconds_until_due(), 0)
+
+    def test_timed_out_restart_goes_back_to_pending(self):
+        restart = lambda config, files, job: run_command("sleep 30", job=job, shell=True) and files
+        executor = RestartExecutor(restart, timeout=0.2)
+        self.addCleanup(executor.shutdown)
+        scheduler = RestartScheduler(restart, clock=self.clock, executor=executor)
+
+        scheduler.request(["a.json"])
+        scheduler.run_due(self.config)
+        while scheduler.stats()["in_flight"]:
+            time.sleep(0.01)
+
+        self.assertEqual(executor.history[-1].status, RestartJob.TIMED_OUT)
+        self.assertEqual(scheduler.stats()["pending"], 1)
+        self.assertEqual(scheduler.stats()["failed"], 1)
+        self.assertEqual(scheduler.seconds_until_due(), RESTART_RETRY_SECONDS)
+
+
+class TestFleetRestartSchedulers(unittest.TestCase):
+    def fleets_config(self, *names):
+        return {"fleets": [{"name": name, "passivbot": {"restart_timeout_seconds": 10}} for name in names]}
+
+    def test_restarts_run_with_their_fleet_config(self):
+        restart = MagicMock(side_effect=lambda config, files, job: files)
+        config = self.fleets_config("a", "b")
+        schedulers = FleetRestartSchedulers(restart, config)
+        self.addCleanup(schedulers.shutdown)
+
+        schedulers["a"].request(["a.json"])
+        schedulers["b"].request(["b.json"])
+        self.assertEqual(schedulers.stats()["pending"], 2)
+        self.assertEqual(schedulers.seconds_until_due(), 0)
+        self.assertEqual(sorted(schedulers.run_due(config)), ["a.json", "b.json"])
+        for scheduler in schedulers.values():
+            scheduler.executor.shutdown()
+
+        restarted = {tuple(call.args[1]): call.args[0]["passivbot"] for call in restart.call_args_list}
+        self.assertEqual(
+            restarted, {("a.json",): config["fleets"][0]["passivbot"], ("b.json",): config["fleets"][1]["passivbot"]}
+        )
+        self.assertEqual(schedulers["a"].executor.timeout, 10)
+
+    def test_reconfigure_adds_and_removes_fleets(self):
+        schedulers = FleetRestartSchedulers(MagicMock(), self.fleets_config("a", "b"))
+        self.addCleanup(schedulers.shutdown)
+        scheduler_a = schedulers["a"]
+
+        schedulers.reconfigure(self.fleets_config("a", "c"))
+        self.assertEqual(sorted(schedulers), ["a", "c"])
+        self.assertIs(schedulers["a"], scheduler_a)
+
+        schedulers.reconfigure({"passivbot": {}})
+        self.assertEqual(list(schedulers), [None])
+
+
+class TestRestartExecutor(unittest.TestCase):
+    def test_polling_is_not_blocked_by_a_slow_restart(self):
+        release = threading.Event()
+        executor = RestartExecutor(lambda config, files, job: release.wait(5) and files)
+        self.addCleanup(executor.shutdown)
+
+        started = time.monotonic()
+        job = executor.submit({}, ["a.json"])
+        self.assertLess(time.monotonic() - started, 0.5)
+
+        while job.status == RestartJob.QUEUED:
+            time.sleep(0.01)
+        self.assertEqual(executor.status()["running"], job.id)
+
+        release.set()
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.status, RestartJob.SUCCEEDED)
+        self.assertEqual(executor.status(), {"running": None, "queued": 0, "finished": {"succeeded": 1}})
+
+    def test_hung_command_is_killed_at_timeout(self):
+        executor = RestartExecutor(
+            lambda config, files, job: run_command("sleep 30", job=job, shell=True) and files,
+            timeout=0.5,
+        )
+        self.addCleanup(executor.shutdown)
+
+        started = time.monotonic()
+        job = executor.submit({}, ["a.json"])
+        self.assertTrue(job.wait(5))
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(job.status, RestartJob.TIMED_OUT)
+
+    def test_cancel_running_restart(self):
+        executor = RestartExecutor(lambda config, files, job: run_command("sleep 30", job=job, shell=True) and files)
+        self.addCleanup(executor.shutdown)
+
+        job = executor.submit({}, ["a.json"])
+        queued = executor.submit({}, ["b.json"])
+        while job.status != RestartJob.RUNNING:
+            time.sleep(0.01)
+        time.sleep(0.2)
+
+        self.assertEqual(executor.cancel(), 2)
+        self.assertTrue(queued.wait(5))
+        self.assertEqual(job.status, RestartJob.CANCELLED)
+        self.assertEqual(queued.status, RestartJob.CANCELLED)
+
+    def test_failed_command(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            run_command("exit 3", shell=True)
+        self.assertEqual(run_command(["echo", "ok"], capture_output=True).stdout, "ok\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
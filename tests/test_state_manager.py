@@ -1,12 +1,18 @@
 import unittest
 import os
-from datetime import datetime, timezone
+import tempfile
+import shutil
+from datetime import datetime, timedelta, timezone
 from state_manager import (
     load_last_processed_timestamp,
     save_last_processed_timestamp,
     parse_datetime,
     get_new_articles,
-    update_last_processed_timestamp
+    update_last_processed_timestamp,
+    parse_created_ms,
+    scan_new_articles,
+    to_epoch_ms,
+    ProcessedArticleStore,
 )
 
 class TestStateManager(unittest.TestCase):
@@ -98,5 +104,105 @@ class TestStateManager(unittest.TestCase):
         loaded_timestamp = load_last_processed_timestamp()
         self.assertEqual(loaded_timestamp, initial_timestamp)
 
+    def test_parse_created_ms_matches_parse_datetime(self):
+        for value in [
+            "2024-10-08 04:10:23.613Z",
+            "2024-02-29 23:59:59.999Z",
+            "2000-01-01 00:00:00.000Z",
+            "1969-12-31 23:59:59.5Z",
+            "2024-10-08 04:10:23.613456Z",
+        ]:
+            self.assertEqual(parse_created_ms(value), to_epoch_ms(parse_datetime(value)), value)
+
+    def test_parse_created_ms_rejects_garbage(self):
+        with self.assertRaises(ValueError):
+            parse_created_ms("2024-13-08 04:10:23.613Z")
+
+    def test_scan_new_articles(self):
+        articles = [
+            {'created': "2024-10-08 03:59:59.999Z"},
+            {'created': "2024-10-08 04:10:23.613Z"},
+            {'created': "2024-10-08 04:00:00.001Z"},
+        ]
+        kept, newest = scan_new_articles(articles, parse_created_ms("2024-10-08 04:00:00.000Z"))
+        self.assertEqual([article for article, _ in kept], articles[1:])
+        self.assertEqual(newest, parse_created_ms("2024-10-08 04:10:23.613Z"))
+        self.assertEqual(scan_new_articles(articles, newest), ([], None))
+
+
+class TestProcessedArticleStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store_path = os.path.join(self.temp_dir, 'processed_articles.db')
+        self.legacy_path = os.path.join(self.temp_dir, 'last_processed_state.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def open_store(self, **kwargs):
+        store = ProcessedArticleStore(self.store_path, legacy_state_file=self.legacy_path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_articles_sharing_watermark_timestamp(self):
+        store = self.open_store()
+        first = {'id': 1, 'created': "2024-10-08 04:00:00.000Z"}
+        second = {'id': 2, 'created': "2024-10-08 04:00:00.000Z"}
+
+        self.assertEqual(store.get_new_articles({'news': [first]}), [first])
+        store.mark_processed([first])
+
+        new_articles = store.get_new_articles({'news': [first, second]})
+        self.assertEqual(new_articles, [second])
+
+    def test_out_of_order_article_is_processed(self):
+        store = self.open_store()
+        latest = {'id': 1, 'created': "2024-10-08 04:10:00.000Z"}
+        late = {'id': 2, 'created': "2024-10-08 04:00:00.000Z"}
+        store.mark_processed([latest])
+
+        self.assertEqual(store.get_new_articles({'news': [latest, late]}), [late])
+
+    def test_processed_articles_survive_restart(self):
+        article = {'title': 'No id', 'created': "2024-10-08 04:00:00.000Z", 'link': 'https://a'}
+        store = self.open_store()
+        store.mark_processed([article])
+        store.close()
+
+        reopened = self.open_store()
+        self.assertEqual(reopened.get_new_articles({'news': [article]}), [])
+        self.assertEqual(reopened.last_processed_timestamp, parse_datetime(article['created']))
+
+    def test_retention_evicts_old_entries(self):
+        store = self.open_store(retention=timedelta(days=1))
+        old = {'id': 1, 'created': "2024-10-01 04:00:00.000Z"}
+        recent = {'id': 2, 'created': "2024-10-08 04:00:00.000Z"}
+        store.mark_processed([old])
+        store.mark_processed([recent])
+
+        self.assertEqual(store.count(), 1)
+        # Evicted articles fall below the floor and still count as processed
+        self.assertEqual(store.get_new_articles({'news': [old, recent]}), [])
+
+    def test_stream_start(self):
+        store = self.open_store(retention=timedelta(days=1))
+        self.assertEqual(store.stream_start(timedelta(hours=1)), store.floor_timestamp)
+
+        store.mark_processed([{'id': 1, 'created': "2024-10-08 04:00:00.000Z"}])
+        self.assertEqual(store.stream_start(timedelta(hours=1)), parse_datetime("2024-10-08 03:00:00.000Z"))
+        # Never below the floor, which already counts as processed
+        self.assertEqual(store.stream_start(timedelta(days=7)), store.floor_timestamp)
+
+    def test_migrates_legacy_state_file(self):
+        save_last_processed_timestamp(parse_datetime("2024-10-08 04:00:00.000Z"), self.legacy_path)
+        store = self.open_store()
+        news = {
+            'news': [
+                {'id': 1, 'created': "2024-10-08 03:59:59.999Z"},
+                {'id': 2, 'created': "2024-10-08 04:00:00.001Z"},
+            ]
+        }
+        self.assertEqual([article['id'] for article in store.get_new_articles(news)], [2])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
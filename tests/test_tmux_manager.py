@@ -0,0 +1,76 @@
+import unittest
+import os
+import subprocess
+import tempfile
+from unittest.mock import patch, MagicMock
+from tmux_manager import load_pane_targets, match_pane_targets, respawn_pane, PaneTarget
+
+EXAMPLE_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "passivbot-tmux-sessions-example.yml")
+
+
+class TestTmuxManager(unittest.TestCase):
+    def test_load_pane_targets_from_example(self):
+        targets = load_pane_targets(EXAMPLE_CONFIG)
+        config_file = os.path.expanduser("~/passivbot/configs/forager/bybit_03.json")
+
+        self.assertEqual(len(targets), 4)
+        target = targets[config_file]
+        self.assertEqual(target.window_name, "passivbot_instances_0")
+        self.assertEqual(target.pane_position, 2)
+        self.assertEqual(
+            target.commands,
+            (
+                "cd ~/passivbot",
+                "source ~/passivbot/venv/bin/activate",
+                "python3 src/passivbot.py configs/forager/bybit_03.json",
+            ),
+        )
+
+    def test_pane_shorthand_and_start_directory(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yml", delete=False) as f:
+            f.write(
+                "session_name: bots\n"
+                "start_directory: /opt/passivbot\n"
+                "windows:\n"
+                "- window_name: main\n"
+                "  panes:\n"
+                "    - python3 src/passivbot.py configs/a.json\n"
+                "    - shell_command: python3 src/passivbot.py /abs/b.json\n"
+            )
+        self.addCleanup(os.remove, f.name)
+
+        targets = load_pane_targets(f.name)
+        self.assertEqual(targets["/opt/passivbot/configs/a.json"].pane_position, 0)
+        self.assertEqual(targets["/abs/b.json"].pane_position, 1)
+
+    def test_match_pane_targets(self):
+        targets = load_pane_targets(EXAMPLE_CONFIG)
+        matched = match_pane_targets(["~/passivbot/configs/forager/bybit_01.json"], targets)
+        self.assertEqual(matched["~/passivbot/configs/forager/bybit_01.json"].pane_position, 0)
+
+        self.assertIsNone(match_pane_targets(["/elsewhere/unknown.json"], targets))
+
+    @patch("tmux_manager.run_command")
+    def test_respawn_pane(self, mock_run):
+        mock_run.return_value = MagicMock(stdout="%3\n%4\n")
+        target = PaneTarget("main", 1, ("cd ~/passivbot", "python3 src/passivbot.py configs/b.json"))
+
+        respawn_pane("bots", target)
+
+        commands = [call.args[0] for call in mock_run.call_args_list]
+        self.assertEqual(commands[0], ["tmux", "list-panes", "-t", "bots:main", "-F", "#{pane_id}"])
+        self.assertEqual(commands[1], ["tmux", "respawn-pane", "-k", "-t", "%4"])
+        self.assertEqual(commands[2], ["tmux", "send-keys", "-t", "%4", "cd ~/passivbot", "Enter"])
+        self.assertEqual(
+            commands[3], ["tmux", "send-keys", "-t", "%4", "python3 src/passivbot.py configs/b.json", "Enter"]
+        )
+
+    @patch("tmux_manager.run_command")
+    def test_respawn_pane_session_missing(self, mock_run):
+        mock_run.side_effect = subprocess.CalledProcessError(1, "tmux")
+        with self.assertRaises(subprocess.CalledProcessError):
+            respawn_pane("bots", PaneTarget("main", 0, ()))
+
+
+if __name__ == "__main__":
+    unittest.main()
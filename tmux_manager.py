@@ -0,0 +1,158 @@
+import os
+import shlex
+import signal
+import subprocess
+from collections import namedtuple
+import yaml
+from logger import logger
+
+# Upper bound for a single process manager command when no restart job sets one
+DEFAULT_COMMAND_TIMEOUT = 120
+
+
+class RestartCancelled(Exception):
+    pass
+
+# A pane of the tmuxp session: where it sits and the commands that start it
+PaneTarget = namedtuple("PaneTarget", ["window_name", "pane_position", "commands"])
+
+
+def _as_command_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [command for command in value if command]
+
+
+def _pane_commands(pane):
+    if pane is None:
+        return []
+    if isinstance(pane, (str, list)):
+        return _as_command_list(pane)
+    return _as_command_list(pane.get("shell_command_before")) + _as_command_list(pane.get("shell_command"))
+
+
+def _working_directory(start_directory, commands):
+    directory = start_directory
+    for command in commands:
+        try:
+            tokens = shlex.split(command)
+        except ValueError:
+            continue
+        if len(tokens) >= 2 and tokens[0] == "cd":
+            target = os.path.expanduser(tokens[1])
+            directory = target if directory is None else os.path.join(directory, target)
+    return directory
+
+
+def _referenced_config_files(commands, directory):
+    config_files = []
+    for command in commands:
+        try:
+            tokens = shlex.split(command)
+        except ValueError:
+            continue
+        for token in tokens:
+            if token.endswith(".json"):
+                path = os.path.expanduser(token)
+                if not os.path.isabs(path) and directory is not None:
+                    path = os.path.join(directory, path)
+                config_files.append(os.path.normpath(path))
+    return config_files
+
+
+def load_pane_targets(tmux_config_file):
+    """Map each PassivBot config file referenced in a tmuxp file to its pane."""
+    with open(os.path.expanduser(tmux_config_file), "r") as f:
+        session = yaml.safe_load(f)
+
+    session_before = _as_command_list(session.get("shell_command_before"))
+    targets = {}
+    for window in session.get("windows", []):
+        window_before = session_before + _as_command_list(window.get("shell_command_before"))
+        start_directory = window.get("start_directory", session.get("start_directory"))
+        if start_directory is not None:
+            start_directory = os.path.expanduser(start_directory)
+        for position, pane in enumerate(window.get("panes", [])):
+            commands = window_before + _pane_commands(pane)
+            directory = _working_directory(start_directory, commands)
+            for config_file in _referenced_config_files(commands, directory):
+                targets[config_file] = PaneTarget(window["window_name"], position, tuple(commands))
+    return targets
+
+
+def match_pane_targets(config_files, targets):
+    """Find the pane of every file in ``config_files``; None if any is missing."""
+    matched = {}
+    for config_file in config_files:
+        path = os.path.normpath(os.path.expanduser(config_file))
+        target = targets.get(path)
+        if target is None:
+            # Fall back to suffix matching for panes whose working directory is unknown
+            candidates = [t for p, t in targets.items() if path.endswith(p) or p.endswith(path)]
+            if len(candidates) != 1:
+                return None
+            target = candidates[0]
+        matched[config_file] = target
+    return matched
+
+
+def kill_process_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_command(args, job=None, shell=False, capture_output=False):
+    """Run a process manager command with a hard timeout.
+
+    The timeout is what is left of ``job``'s deadline, or
+    DEFAULT_COMMAND_TIMEOUT without a job. The command runs in its own process
+    group so that it can be killed as a whole on timeout or when ``job`` is
+    cancelled. Raises CalledProcessError on a non-zero exit status.
+    """
+    if job is not None and job.cancelled.is_set():
+        raise RestartCancelled()
+    timeout = DEFAULT_COMMAND_TIMEOUT if job is None else job.remaining()
+    pipe = subprocess.PIPE if capture_output else None
+    process = subprocess.Popen(
+        args, shell=shell, stdout=pipe, stderr=pipe, text=True, start_new_session=True
+    )
+    if job is not None:
+        job.attach(process)
+    try:
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_group(process)
+            process.communicate()
+            raise
+    finally:
+        if job is not None:
+            job.detach(process)
+    if job is not None and job.cancelled.is_set():
+        raise RestartCancelled()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+
+def pane_id(session_name, target, job=None):
+    output = run_command(
+        ["tmux", "list-panes", "-t", f"{session_name}:{target.window_name}", "-F", "#{pane_id}"],
+        job=job,
+        capture_output=True,
+    ).stdout.split()
+    # Resolve by position rather than index so base-index/pane-base-index do not matter
+    return output[target.pane_position]
+
+
+def respawn_pane(session_name, target, job=None):
+    """Restart a single pane: kill its process and replay its tmuxp commands."""
+    target_pane = pane_id(session_name, target, job)
+    run_command(["tmux", "respawn-pane", "-k", "-t", target_pane], job=job)
+    for command in target.commands:
+        run_command(["tmux", "send-keys", "-t", target_pane, command, "Enter"], job=job)
+    logger.info(f"Restarted pane {target.pane_position} of window {target.window_name}")